@@ -1,11 +1,36 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from app.core.config import ADMIN_ID, ADMIN_PASSWORD
+from typing import List, Literal, Optional
+from bson import ObjectId
+from datetime import date, datetime
+from itertools import islice
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from app.core.config import ADMIN_ID, ADMIN_PASSWORD, BULK_BATCH_SIZE, DEFAULTER_THRESHOLD
+from app.db import database
 from app.db.database import (
     pending_students, approved_students, rejected_students,
-    pending_teachers, approved_teachers, rejected_teachers
+    pending_teachers, approved_teachers, rejected_teachers, subjects, access_profile,
+    defaulter_reports, defaulter_rows,
+)
+from app.core.outbox import queue_emails
+from app.db.versions import bump, get_version
+from app.core.profile_cache import profile_cache
+from app.core.subject_catalog import subject_catalog, subject_key
+from app.core.session_tokens import issue_token, require_admin
+from app.core import bulk_export, defaulters, roster_import
+from app.schemas.student import StudentRegister
+from app.schemas.teacher import TeacherRegister
+from app.schemas.admin import Record, RecordPage, DefaulterReport, DefaulterPage
+from app.core.email_templates import (
+    student_approved_email, student_rejected_email,
+    teacher_approved_email, teacher_rejected_email
 )
-from app.core.email_utils import send_email
 
 router = APIRouter()
 
@@ -14,135 +39,527 @@ class AdminLogin(BaseModel):
     password: str
     
 @router.post("/admin/login")
-def admin_login(data: AdminLogin):
+async def admin_login(data: AdminLogin):
     if data.user_id != ADMIN_ID or data.password != ADMIN_PASSWORD:
         raise HTTPException(status_code=401, detail="Invalid admin credentials")
-    return {"message": "Admin login successful"}
-
-@router.post("/admin/approve/student/{roll_no}")
-def approve_student(roll_no: str):
-    student = pending_students.find_one({"roll_no": roll_no})
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
-    pending_students.delete_one({"roll_no": roll_no})
-    approved_students.insert_one(student)
-    name = student["full_name"]
-    email = student["email"]
-    subject = "Your account has been approved! 🎉"
-    message = f"""
-    Hi {name},
-    Congratulations! Your student account has been approved on our College Attendance Management System.
-    You can now log in and:
-    ✅ Mark your attendance using OTP
-    ✅ View your attendance history
-    ✅ Stay updated with class activities
-    If you have any questions, feel free to reach out to our support team.
-    Welcome aboard!
-    - College Attendance Team
-    """
+    return {"message": "Admin login successful", "token": issue_token("admin", ADMIN_ID, "Admin")}
+
+# lists
+@router.get("/admin/list/pending/students", response_model=List[Record], dependencies=[Depends(access_profile("report"))])
+async def list_pending_students():
+    return await pending_students.find({}, {"_id": 0}).to_list(length=None)
+
+@router.get("/admin/list/pending/teachers", response_model=List[Record], dependencies=[Depends(access_profile("report"))])
+async def list_pending_teachers():
+    return await pending_teachers.find({}, {"_id": 0}).to_list(length=None)
+
+@router.get("/admin/list/approved/students", response_model=List[Record], dependencies=[Depends(access_profile("report"))])
+async def list_approved_students():
+    return await approved_students.find({}, {"_id": 0}).to_list(length=None)
+
+@router.get("/admin/list/approved/teachers", response_model=List[Record], dependencies=[Depends(access_profile("report"))])
+async def list_approved_teachers():
+    return await approved_teachers.find({}, {"_id": 0}).to_list(length=None)
+
+@router.get("/admin/list/rejected/students", response_model=List[Record], dependencies=[Depends(access_profile("report"))])
+async def list_rejected_students():
+    return await rejected_students.find({}, {"_id": 0}).to_list(length=None)
+
+@router.get("/admin/list/rejected/teachers", response_model=List[Record], dependencies=[Depends(access_profile("report"))])
+async def list_rejected_teachers():
+    return await rejected_teachers.find({}, {"_id": 0}).to_list(length=None)
+
+
+# paginated lists
+PAGE_COLLECTIONS = {
+    "pending_students": pending_students,
+    "approved_students": approved_students,
+    "rejected_students": rejected_students,
+    "pending_teachers": pending_teachers,
+    "approved_teachers": approved_teachers,
+    "rejected_teachers": rejected_teachers,
+}
+# dob is the login credential for students and teachers, so pages never return it
+CREDENTIAL_FIELDS = {"dob"}
+PAGE_FIELDS = {
+    "students": set(StudentRegister.model_fields) - CREDENTIAL_FIELDS,
+    "teachers": set(TeacherRegister.model_fields) - CREDENTIAL_FIELDS,
+}
+PAGE_FILTERS = {
+    "students": ("department", "semester", "section"),
+    "teachers": ("subject",),
+}
+
+
+@router.get("/admin/page/{status}/{kind}", response_model=RecordPage,
+            dependencies=[Depends(access_profile("report")), Depends(require_admin)])
+async def list_page(
+    request: Request,
+    response: Response,
+    status: Literal["pending", "approved", "rejected"],
+    kind: Literal["students", "teachers"],
+    limit: int = Query(50, ge=1, le=500),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    department: Optional[str] = None,
+    semester: Optional[int] = None,
+    section: Optional[str] = None,
+    subject: Optional[str] = None,
+):
+    name = f"{status}_{kind}"
+    collection = PAGE_COLLECTIONS[name]
+
+    # The version is read before the data, so a write racing this request can
+    # only make the ETag older than the body, never newer.
+    version = await get_version(name)
+    params = sorted(request.query_params.multi_items())
+    etag = 'W/"%s"' % hashlib.sha1(repr((name, version, params)).encode()).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    values = {"department": department, "semester": semester, "section": section, "subject": subject}
+    query = {}
+    for field, value in values.items():
+        if value is None:
+            continue
+        if field not in PAGE_FILTERS[kind]:
+            raise HTTPException(status_code=400, detail=f"Filter '{field}' is not supported for {kind}")
+        query[field] = value.strip().upper() if field in ("department", "section") else value
+
+    projection = {f: 0 for f in CREDENTIAL_FIELDS}
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in PAGE_FIELDS[kind]]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        projection = {f: 1 for f in requested}
+
+    page_query = dict(query)
+    if after:
+        if not ObjectId.is_valid(after):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        page_query["_id"] = {"$gt": ObjectId(after)}
+
+    docs = await collection.find(page_query, projection).sort("_id", 1).limit(limit + 1).to_list(length=None)
+    next_cursor = str(docs[limit - 1]["_id"]) if len(docs) > limit else None
+    items = []
+    for doc in docs[:limit]:
+        doc.pop("_id")
+        items.append(doc)
 
-    send_email(email, subject, message)
-    return {"message": "Student approved"}
-
-@router.post("/admin/reject/student/{roll_no}")
-def reject_student(roll_no: str):
-    student = pending_students.find_one({"roll_no": roll_no})
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
-    pending_students.delete_one({"roll_no": roll_no})
-    rejected_students.insert_one(student)
-    name = student["full_name"]
-    email = student["email"]
-    subject = "Update on Your Student Account Registration"
-    message = f"""
-    Hi {name},
-    Thank you for registering on our College Attendance Management System.
-    After reviewing your application, we regret to inform you that your student account has not been approved at this time.
-    If you believe this decision was made in error or if you’d like to provide additional details for reconsideration, please feel free to contact our support team.
-
-    We appreciate your interest and understanding.
-
-    Welcome aboard!
-    - College Attendance Team
+    response.headers.update(headers)
+    return {
+        "items": items,
+        "next_cursor": next_cursor,
+        "total": await collection.count_documents(query),
+    }
+
+
+# bulk decisions
+class BulkDecisionRequest(BaseModel):
+    ids: Optional[List[str]] = None  # roll numbers or employee IDs
+    department: Optional[str] = None
+    semester: Optional[int] = None
+    section: Optional[str] = None
+    subject: Optional[str] = None
+
+
+BULK_KINDS = {
+    "student": {
+        "key": "roll_no",
+        "pending_name": "pending_students",
+        "approved_name": "approved_students",
+        "rejected_name": "rejected_students",
+        "pending": pending_students,
+        "approved": approved_students,
+        "rejected": rejected_students,
+        "filters": ("department", "semester", "section"),
+        "emails": {"approved": student_approved_email, "rejected": student_rejected_email},
+    },
+    "teacher": {
+        "key": "employee_id",
+        "pending_name": "pending_teachers",
+        "approved_name": "approved_teachers",
+        "rejected_name": "rejected_teachers",
+        "pending": pending_teachers,
+        "approved": approved_teachers,
+        "rejected": rejected_teachers,
+        "filters": ("subject",),
+        "emails": {"approved": teacher_approved_email, "rejected": teacher_rejected_email},
+    },
+}
+
+
+def _bulk_query(kind, data: BulkDecisionRequest):
+    conf = BULK_KINDS[kind]
+    query = {}
+    if data.ids:
+        ids = [i.strip() for i in data.ids]
+        if kind == "teacher":
+            ids = [i.upper() for i in ids]
+        query[conf["key"]] = {"$in": ids}
+    for field in conf["filters"]:
+        value = getattr(data, field)
+        if value is not None:
+            query[field] = value
+    if not query:
+        raise HTTPException(status_code=400, detail="Provide ids or at least one filter")
+    return query
+
+
+async def _require_transactions():
+    if not await database.supports_transactions():
+        raise HTTPException(
+            status_code=503,
+            detail="This needs MongoDB transactions, which the database server does not support (run it as a replica set)",
+        )
+
+
+async def _bulk_move(kind, outcome, data: BulkDecisionRequest):
+    """Move matching pending documents to the approved/rejected collection.
+
+    Every batch is moved inside a transaction (replica set required) together
+    with its notification emails, so a crash never leaves a batch half-moved.
     """
+    conf = BULK_KINDS[kind]
+    key = conf["key"]
+    pending = conf["pending"]
+    target = conf[outcome]
+    make_email = conf["emails"][outcome]
+    query = _bulk_query(kind, data)
+    await _require_transactions()
+
+    results = []
+    last_id = None
+    while True:
+        batch_query = dict(query)
+        if last_id is not None:
+            batch_query["_id"] = {"$gt": last_id}
+
+        async def move_batch(session):
+            docs = await pending.find(batch_query, session=session).sort("_id", 1).limit(BULK_BATCH_SIZE).to_list(length=None)
+            if not docs:
+                return [], None
+            batch_results = []
+            skip = set()
+            if outcome == "approved":
+                existing = await target.find(
+                    {key: {"$in": [d[key] for d in docs]}}, {key: 1}, session=session
+                ).to_list(length=None)
+                skip = {e[key] for e in existing}
+            to_move = []
+            for d in docs:
+                if d[key] not in skip:
+                    to_move.append(d)
+                    if outcome == "approved":
+                        skip.add(d[key])  # later pending duplicates of the same ID
+            if to_move:
+                await target.insert_many(to_move, session=session)
+                await pending.delete_many({"_id": {"$in": [d["_id"] for d in to_move]}}, session=session)
+                await queue_emails([(d["email"], *make_email(d["full_name"])) for d in to_move], session=session)
+                await bump(conf["pending_name"], conf[outcome + "_name"], session=session)
+                profile_cache.invalidate(kind, *(str(d[key]).upper() for d in to_move))
+            moved = {id(d) for d in to_move}
+            for d in docs:
+                batch_results.append({key: d[key], "status": outcome if id(d) in moved else "already_approved"})
+            return batch_results, docs[-1]["_id"]
+
+        async with await database.client.start_session() as session:
+            batch_results, batch_last_id = await session.with_transaction(move_batch)
+        if batch_last_id is None:
+            break
+        results.extend(batch_results)
+        last_id = batch_last_id
+
+    if data.ids:
+        seen = {r[key] for r in results}
+        results.extend({key: i, "status": "not_found"} for i in query[key]["$in"] if i not in seen)
+
+    counts = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    return {"counts": counts, "results": results}
+
+
+@router.post("/admin/bulk/approve/students", dependencies=[Depends(require_admin)])
+async def bulk_approve_students(data: BulkDecisionRequest):
+    return await _bulk_move("student", "approved", data)
 
-    send_email(email, subject, message)
-    return {"message": "Student rejected"}
-
-# same for teacher
-@router.post("/admin/approve/teacher/{employee_id}")
-def approve_teacher(employee_id: str):
-    emp_id = employee_id.upper()
-    teacher = pending_teachers.find_one({"employee_id": emp_id})
-    if not teacher:
-        raise HTTPException(status_code=404, detail="Teacher not found")
-    pending_teachers.delete_one({"employee_id": emp_id})
-    approved_teachers.insert_one(teacher)
-    name = teacher["full_name"]
-    email = teacher["email"]
-    subject = "Your Teacher Account Has Been Approved!"
-    message = f"""
-    Dear {name},
-    Congratulations! Your teacher account has been approved on our College Attendance Management System.
-    You can now log in and:
-    ✅ Mark your attendance using OTP
-    ✅ View your attendance history
-    ✅ Stay updated with class activities
-    If you have any questions, feel free to reach out to our support team.
-    Welcome aboard!
-    - College Attendance Team
+@router.post("/admin/bulk/reject/students", dependencies=[Depends(require_admin)])
+async def bulk_reject_students(data: BulkDecisionRequest):
+    return await _bulk_move("student", "rejected", data)
+
+@router.post("/admin/bulk/approve/teachers", dependencies=[Depends(require_admin)])
+async def bulk_approve_teachers(data: BulkDecisionRequest):
+    return await _bulk_move("teacher", "approved", data)
+
+@router.post("/admin/bulk/reject/teachers", dependencies=[Depends(require_admin)])
+async def bulk_reject_teachers(data: BulkDecisionRequest):
+    return await _bulk_move("teacher", "rejected", data)
+
+
+async def _decide(kind, outcome, key_value):
+    """Approve or reject one registration, in the same transaction as a bulk decision."""
+    result = await _bulk_move(kind, outcome, BulkDecisionRequest(ids=[key_value]))
+    label = kind.capitalize()
+    if outcome in result["counts"]:
+        return {"message": f"{label} {outcome}"}
+    if "already_approved" in result["counts"]:
+        raise HTTPException(status_code=409, detail=f"{label} already approved")
+    raise HTTPException(status_code=404, detail=f"{label} not found")
+
+@router.post("/admin/approve/student/{roll_no}", dependencies=[Depends(require_admin)])
+async def approve_student(roll_no: str):
+    return await _decide("student", "approved", roll_no)
+
+@router.post("/admin/reject/student/{roll_no}", dependencies=[Depends(require_admin)])
+async def reject_student(roll_no: str):
+    return await _decide("student", "rejected", roll_no)
+
+@router.post("/admin/approve/teacher/{employee_id}", dependencies=[Depends(require_admin)])
+async def approve_teacher(employee_id: str):
+    return await _decide("teacher", "approved", employee_id)
+
+@router.post("/admin/reject/teacher/{employee_id}", dependencies=[Depends(require_admin)])
+async def reject_teacher(employee_id: str):
+    return await _decide("teacher", "rejected", employee_id)
+
+
+# roster import
+IMPORT_MODELS = {"student": StudentRegister, "teacher": TeacherRegister}
+
+
+async def _import_batch(kind, docs, auto_approve, dry_run):
+    """Store the rows of one batch that are not registered yet; returns (stored, skipped rows).
+
+    Existing IDs are found with one $in query per collection. With auto_approve
+    the batch goes straight to the approved collection together with its
+    approval emails, in one transaction like the bulk decisions above.
     """
+    conf = BULK_KINDS[kind]
+    key = conf["key"]
+    target = "approved" if auto_approve else "pending"
+
+    async def store(session=None):
+        ids = [doc[key] for _, doc in docs]
+        existing = {}
+        for status in ("approved", "pending", "rejected"):
+            async for doc in conf[status].find({key: {"$in": ids}}, {key: 1}, session=session):
+                existing.setdefault(doc[key], status)
+        new = [doc for _, doc in docs if doc[key] not in existing]
+        skipped = [{"row": n, key: doc[key], "status": f"already_{existing[doc[key]]}"}
+                   for n, doc in docs if doc[key] in existing]
+        if new and not dry_run:
+            await conf[target].insert_many(new, session=session)
+            if auto_approve:
+                make_email = conf["emails"]["approved"]
+                await queue_emails([(d["email"], *make_email(d["full_name"])) for d in new], session=session)
+            await bump(conf[target + "_name"], session=session)
+        return new, skipped
 
-    send_email(email, subject, message)
-    return {"message": "Teacher approved"}
-
-@router.post("/admin/reject/teacher/{employee_id}")
-def reject_teacher(employee_id: str):
-    emp_id = employee_id.upper()
-    teacher = pending_teachers.find_one({"employee_id": emp_id})
-    if not teacher:
-        raise HTTPException(status_code=404, detail="Teacher not found")
-    pending_teachers.delete_one({"employee_id": emp_id})
-    rejected_teachers.insert_one(teacher)
-    name = teacher["full_name"]
-    email = teacher["email"]
-    subject = "Update on Your Teacher Account Registration"
-    message = f"""
-    Dear {name},
-    Thank you for registering on our College Attendance Management System.
-    After reviewing your application, we regret to inform you that your teacher account has not been approved at this time.
-    If you believe this decision was made in error or you would like to provide additional information, please feel free to contact our support team.
-
-    We appreciate your interest in our system.
-
-    Best regards,  
-    - College Attendance Team
+    if auto_approve and not dry_run:
+        async with await database.client.start_session() as session:
+            new, skipped = await session.with_transaction(store)
+        profile_cache.invalidate(kind, *(str(d[key]).upper() for d in new))
+    else:
+        new, skipped = await store()
+    return len(new), skipped
+
+
+@router.post("/admin/import/{kind}", dependencies=[Depends(require_admin)])
+async def import_roster(kind: Literal["students", "teachers"], file: UploadFile = File(...),
+                        auto_approve: bool = False, dry_run: bool = False):
+    """Register everyone in a CSV/XLSX roster, as pending (or approved with auto_approve).
+
+    Rows are read and validated BULK_BATCH_SIZE at a time. A row is skipped if
+    it fails validation, repeats an ID seen earlier in the file, or the ID is
+    already pending, approved or rejected; the response lists every skipped
+    row. dry_run reports the same without storing anything. Needs the token
+    from /admin/login.
     """
+    kind = kind[:-1]
+    key = BULK_KINDS[kind]["key"]
+    fmt = roster_import.roster_format(file.filename)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Upload a .csv or .xlsx file")
+    if fmt not in roster_import.formats():
+        raise HTTPException(status_code=400, detail="XLSX rosters are not supported on this server; upload a CSV")
+    if auto_approve and not dry_run:
+        await _require_transactions()
 
-    send_email(email, subject, message)
-    return {"message": "Teacher rejected"}
+    rows = roster_import.read_rows(file.file, fmt)
+    seen = set()
+    skipped = []
+    total = imported = 0
+    while True:
+        try:
+            batch = await asyncio.to_thread(lambda: list(islice(rows, BULK_BATCH_SIZE)))
+        except Exception as exc:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Could not read the roster after {total} data rows: {exc}. "
+                       f"{imported} of them were {'importable' if dry_run else 'imported'}.",
+            )
+        if not batch:
+            break
+        total += len(batch)
 
-# lists
-@router.get("/admin/list/pending/students")
-def list_pending_students():
-    return list(pending_students.find({}, {"_id": 0}))
+        docs, invalid = roster_import.validate(IMPORT_MODELS[kind], batch)
+        skipped.extend(invalid)
+        fresh = []
+        for number, doc in docs:
+            if kind == "teacher":
+                doc[key] = doc[key].upper()  # logins look teachers up by the upper-cased ID
+            if doc[key] in seen:
+                skipped.append({"row": number, key: doc[key], "status": "duplicate_in_file"})
+                continue
+            seen.add(doc[key])
+            fresh.append((number, doc))
+        if fresh:
+            stored, existing = await _import_batch(kind, fresh, auto_approve, dry_run)
+            imported += stored
+            skipped.extend(existing)
 
-@router.get("/admin/list/pending/teachers")
-def list_pending_teachers():
-    return list(pending_teachers.find({}, {"_id": 0}))
+    counts = {"imported": imported}
+    for row in skipped:
+        counts[row["status"]] = counts.get(row["status"], 0) + 1
+    skipped.sort(key=lambda r: r["row"])
+    return {"rows": total, "auto_approve": auto_approve, "dry_run": dry_run, "counts": counts, "skipped": skipped}
 
-@router.get("/admin/list/approved/students")
-def list_approved_students():
-    return list(approved_students.find({}, {"_id": 0}))
 
-@router.get("/admin/list/approved/teachers")
-def list_approved_teachers():
-    return list(approved_teachers.find({}, {"_id": 0}))
+class SubjectRequest(BaseModel):
+    name: str
+    department: Optional[str] = None
+    semester: Optional[int] = None
 
-@router.get("/admin/list/rejected/students")
-def list_rejected_students():
-    return list(rejected_students.find({}, {"_id": 0}))
 
-@router.get("/admin/list/rejected/teachers")
-def list_rejected_teachers():
-    return list(rejected_teachers.find({}, {"_id": 0}))
+@router.get("/admin/subjects", response_model=List[Record], dependencies=[Depends(require_admin)])
+async def list_subjects():
+    return await subjects.find({}, {"_id": 0}).sort([("key", 1), ("department", 1), ("semester", 1)]).to_list(length=None)
+
+@router.post("/admin/subjects", dependencies=[Depends(require_admin)])
+async def add_subject(data: SubjectRequest):
+    name = " ".join(data.name.split())
+    if not name:
+        raise HTTPException(status_code=400, detail="Subject name is required")
+    department = data.department.strip().upper() if data.department else None
+    scope = {"key": subject_key(name), "department": department, "semester": data.semester}
+    result = await subjects.update_one(scope, {"$setOnInsert": {"name": name}}, upsert=True)
+    if result.upserted_id is None:
+        raise HTTPException(status_code=409, detail="Subject already exists")
+    await bump("subjects")
+    await subject_catalog.refresh()  # other workers pick it up on their next poll
+    return {"message": "Subject added"}
+
+@router.delete("/admin/subjects/{name}", dependencies=[Depends(require_admin)])
+async def remove_subject(name: str, department: Optional[str] = None, semester: Optional[int] = None):
+    department = department.strip().upper() if department else None
+    result = await subjects.delete_one({"key": subject_key(name), "department": department, "semester": semester})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Subject not found")
+    await bump("subjects")
+    await subject_catalog.refresh()
+    return {"message": "Subject removed"}
+
+
+# defaulter reports
+class DefaulterReportRequest(BaseModel):
+    from_date: Optional[date] = None  # IST days; both open-ended by default
+    to_date: Optional[date] = None
+    label: Optional[str] = None  # e.g. "2025 odd semester"
+
+
+@router.post("/admin/reports/defaulters", response_model=DefaulterReport,
+             dependencies=[Depends(access_profile("report")), Depends(require_admin)])
+async def create_defaulter_report(data: DefaulterReportRequest):
+    if data.from_date and data.to_date and data.from_date > data.to_date:
+        raise HTTPException(status_code=400, detail="from_date is after to_date")
+    report = await defaulters.build_report(data.from_date, data.to_date, data.label)
+    if report is None:
+        raise HTTPException(status_code=409, detail="A defaulter report is already being built, try again when it is ready")
+    return defaulters.public(report)
+
+@router.get("/admin/reports/defaulters", response_model=List[DefaulterReport],
+            dependencies=[Depends(access_profile("report")), Depends(require_admin)])
+async def list_defaulter_reports(limit: int = Query(20, ge=1, le=100)):
+    docs = await defaulter_reports.find({}).sort("created_at", -1).limit(limit).to_list(length=None)
+    return [defaulters.public(d) for d in docs]
+
+@router.get("/admin/reports/defaulters/{report_id}", response_model=DefaulterPage,
+            dependencies=[Depends(access_profile("report")), Depends(require_admin)])
+async def defaulter_report_page(
+    report_id: str,
+    response: Response,
+    threshold: float = Query(DEFAULTER_THRESHOLD, ge=0, le=100),
+    department: Optional[str] = None,
+    semester: Optional[int] = None,
+    section: Optional[str] = None,
+    subject: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+):
+    """Rows of a snapshot ("latest" for the newest) below `threshold` percent,
+    in department, semester, section, roll number, subject order."""
+    report = await defaulters.find_report(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    query = {"report_id": report["_id"], "percentage": {"$lt": threshold}}
+    for field, value in (("department", department), ("semester", semester), ("section", section)):
+        if value is not None:
+            query[field] = value.strip().upper() if field in ("department", "section") else value
+    if subject:
+        canonical = subject_catalog.canonical(subject)
+        if not canonical:
+            raise HTTPException(status_code=400, detail="Invalid subject")
+        query["subject"] = canonical
+
+    page_query = dict(query)
+    if after:
+        if not ObjectId.is_valid(after):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        page_query["_id"] = {"$gt": ObjectId(after)}
+
+    docs = await defaulter_rows.find(page_query).sort("_id", 1).limit(limit + 1).to_list(length=None)
+    next_cursor = str(docs[limit - 1]["_id"]) if len(docs) > limit else None
+
+    # a snapshot never changes once it is ready; "latest" moves with each build
+    response.headers["Cache-Control"] = "private, no-cache" if report_id == "latest" else "private, max-age=3600"
+    return {
+        "report": defaulters.public(report),
+        "threshold": threshold,
+        "items": docs[:limit],
+        "next_cursor": next_cursor,
+        "total": await defaulter_rows.count_documents(query),
+    }
+
+
+# bulk export
+@router.get("/admin/export/attendance", dependencies=[Depends(access_profile("report")), Depends(require_admin)])
+async def export_attendance_dataset(format: Optional[Literal["parquet", "csv"]] = None,
+                                    from_date: Optional[date] = None, to_date: Optional[date] = None):
+    """Partitioned export of all marks as a zip; Parquet when pyarrow is installed.
+
+    Needs the token from /admin/login.
+
+    For the full history, scripts.export_attendance writes the same files to a
+    directory without going through a request.
+    """
+    if format and format not in bulk_export.formats():
+        raise HTTPException(status_code=400, detail=f"Format '{format}' is not available on this server")
+    workdir = tempfile.mkdtemp(prefix="attendance_export_")
+    try:
+        manifest = await bulk_export.export_attendance(os.path.join(workdir, "attendance"), format, from_date, to_date)
+        archive = await asyncio.to_thread(
+            bulk_export.zip_dataset, os.path.join(workdir, "attendance"), os.path.join(workdir, "attendance.zip"))
+    except BaseException:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+    filename = f"attendance_{manifest['format']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return FileResponse(
+        archive, media_type="application/zip", filename=filename,
+        headers={"X-Export-Rows": str(manifest["rows"])},
+        background=BackgroundTask(shutil.rmtree, workdir, ignore_errors=True),
+    )
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from datetime import date
 from app.db.database import approved_students, approved_teachers
+from app.core.session_tokens import issue_token
 
 router = APIRouter()
 
@@ -14,15 +15,19 @@ class TeacherLoginRequest(BaseModel):
     dob: date
 
 @router.post("/login/student")
-def login_student(data: StudentLoginRequest):
-    student = approved_students.find_one({"roll_no": data.roll_no})
+async def login_student(data: StudentLoginRequest):
+    student = await approved_students.find_one({"roll_no": data.roll_no})
     if not student or str(student["dob"]) != str(data.dob):
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    return {"message": "Login successful", "roll_no": data.roll_no}
+    token = issue_token("student", student["roll_no"].upper(), student["full_name"],
+                        department=student.get("department"), semester=student.get("semester"),
+                        section=student.get("section"))
+    return {"message": "Login successful", "roll_no": data.roll_no, "token": token}
 
 @router.post("/login/teacher")
-def login_teacher(data: TeacherLoginRequest):
-    teacher = approved_teachers.find_one({"employee_id": data.employee_id.upper()})
+async def login_teacher(data: TeacherLoginRequest):
+    teacher = await approved_teachers.find_one({"employee_id": data.employee_id.upper()})
     if not teacher or str(teacher["dob"]) != str(data.dob):
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    return {"message": "Login successful","employee_id": data.employee_id.upper()}
+    token = issue_token("teacher", teacher["employee_id"], teacher["full_name"])
+    return {"message": "Login successful","employee_id": data.employee_id.upper(), "token": token}
@@ -2,21 +2,24 @@ from fastapi import APIRouter
 from app.schemas.student import StudentRegister
 from app.schemas.teacher import TeacherRegister
 from app.db.database import pending_students, pending_teachers
+from app.db.versions import bump
 
 router = APIRouter()
 
 
 @router.post("/register/student")
-def register_student(student: StudentRegister):
+async def register_student(student: StudentRegister):
     student = student.dict()
     student['dob'] = student['dob'].isoformat()  # convert date to string
-    pending_students.insert_one(student)
+    await pending_students.insert_one(student)
+    await bump("pending_students")
     return {"message": "Registration request submitted"}
 
 
 @router.post("/register/teacher")
-def register_teacher(teacher: TeacherRegister):
+async def register_teacher(teacher: TeacherRegister):
     teacher = teacher.dict()
     teacher['dob'] = teacher['dob'].isoformat()  # convert to 'YYYY-MM-DD' string
-    pending_teachers.insert_one(teacher)
+    await pending_teachers.insert_one(teacher)
+    await bump("pending_teachers")
     return {"message": "Registration request submitted"}
@@ -1,29 +1,32 @@
 # app/api/student.py
-from fastapi import APIRouter, HTTPException
-from datetime import datetime
-from app.db.database import otps, attendance, approved_students
-from app.core.config import SUBJECTS
+from fastapi import APIRouter, Depends, HTTPException, Request
+from datetime import datetime, timedelta
+from app.db.database import approved_students, attendance_summary, session_summary, access_profile
+from app.db import attendance_store
+from app.core.otp_cache import otp_cache
+from app.core.summaries import record_mark
+from app.core.metrics import stage_duration
+from app.core.logging_utils import log_event
+from app.core.rate_limit import rate_limiter, admission, client_ip
+from app.core.session_tokens import session_claims, check_caller, authorize
+from app.core.profile_cache import profile_cache
+from app.core.live_feed import notify_mark
+from app.core.subject_catalog import subject_catalog
+from app.core.geofence import haversine_distance, RADIUS_M
+from app.schemas.student import AttendanceMark, OtpWindow, SubjectAttendance, StudentProfile, BatchMarkResponse
+from app.core.offline_marks import submit_marks
+from app.core.config import OFFLINE_BATCH_MAX_MARKS
+from app.utils.time_utils import format_ist
 from pydantic import BaseModel
 from fastapi.responses import StreamingResponse
 from io import StringIO
 import csv
 import pytz
-import math
-from typing import Optional
-
-def haversine_distance(lat1, lon1, lat2, lon2):
-    R = 6371000  # meters
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-    a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dlambda/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+import logging
+from typing import List, Optional
 
 router = APIRouter()
-
-IST = pytz.timezone('Asia/Kolkata')
+logger = logging.getLogger(__name__)
 
 class MarkAttendanceRequest(BaseModel):
     roll_no: str
@@ -34,27 +37,45 @@ class MarkAttendanceRequest(BaseModel):
     lng: Optional[float]
 
 
-@router.post("/student/markAttendance")
-def mark_attendance(req: MarkAttendanceRequest):
+async def _student_and_marks(roll_no, session_id, visitor_id, since):
+    """Fetch the student plus both duplicate checks in a single aggregation."""
+    pipeline = [
+        {"$match": {"roll_no": roll_no}},
+        {"$limit": 1},
+        {"$project": {"_id": 0, "full_name": 1}},
+    ] + attendance_store.mark_check_lookups(session_id, roll_no, visitor_id, since)
+    docs = await approved_students.aggregate(pipeline).to_list(length=1)
+    return docs[0] if docs else None
+
+
+@router.post("/student/markAttendance", dependencies=[Depends(access_profile("hot-write")), Depends(admission)])
+async def mark_attendance(req: MarkAttendanceRequest, request: Request, claims=Depends(session_claims)):
     roll_no = req.roll_no.upper()
     otp = req.otp
     subject = req.subject.strip().lower()
     visitor_id = req.visitorId
 
-    SUBJECTS_LOWER = [s.lower() for s in SUBJECTS]
-    if subject not in SUBJECTS_LOWER:
+    # refused before any database work
+    await rate_limiter.check(ip=client_ip(request), visitor=visitor_id, roll_no=roll_no)
+    check_caller(claims, "student", roll_no)
+
+    if not subject_catalog.canonical(subject):
         raise HTTPException(status_code=400, detail="Invalid subject")
 
-    student = approved_students.find_one({"roll_no": roll_no})
+    now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
+    fifty_min_ago = now_utc - timedelta(minutes=50)
+
+    # The OTP lookup is almost always served from the cache, so the student
+    # and both duplicate checks cost a single aggregation round trip.
+    otp_doc = await otp_cache.get(otp)
+    student = await _student_and_marks(roll_no, otp_doc["_id"] if otp_doc else None, visitor_id, fifty_min_ago)
+
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
-    
-    otp_doc = otps.find_one({"otp": otp})
+
     if not otp_doc:
         raise HTTPException(status_code=404, detail="Invalid OTP")
 
-    now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
-
     start_time = otp_doc["start_time"]
     end_time = otp_doc["end_time"]
 
@@ -69,8 +90,7 @@ def mark_attendance(req: MarkAttendanceRequest):
     if otp_doc["subject"].strip().lower() != subject:
         raise HTTPException(status_code=400, detail="Subject does not match OTP")
 
-    already_marked = attendance.find_one({"roll_no": roll_no, "otp": otp})
-    if already_marked:
+    if student["already_marked"]:
         raise HTTPException(status_code=400, detail="Attendance already marked")
 
     # ✅ location validation
@@ -83,90 +103,111 @@ def mark_attendance(req: MarkAttendanceRequest):
 
     teacher_lat = location["lat"]
     teacher_lng = location["lng"]
-    print("Student location:", req.lat, req.lng)
-    print("Teacher location:", teacher_lat, teacher_lng)
 
-    distance = haversine_distance(req.lat, req.lng, teacher_lat, teacher_lng)
-    if distance > 100:
-        raise HTTPException(status_code=400, detail=f"Too far from teacher's location ({round(distance)} m > 100 m)")
+    with stage_duration.time("haversine"):
+        distance = haversine_distance(req.lat, req.lng, teacher_lat, teacher_lng)
+    log_event(
+        logger, "mark_attendance.location",
+        roll_no=roll_no, student_lat=req.lat, student_lng=req.lng,
+        teacher_lat=teacher_lat, teacher_lng=teacher_lng, distance_m=round(distance, 1),
+    )
+    if distance > RADIUS_M:
+        raise HTTPException(status_code=400, detail=f"Too far from teacher's location ({round(distance)} m > {RADIUS_M} m)")
 
     # ✅ recent device check
-    from datetime import timedelta
-    fifty_min_ago = now_utc - timedelta(minutes=50)
-    recent = attendance.find_one({
-        "roll_no": roll_no,
-        "visitor_id": visitor_id,
-        "marked_at": {"$gte": fifty_min_ago}
-    })
-    if recent:
+    if student["recent"]:
         raise HTTPException(status_code=400, detail="Attendance already marked from this device recently (within 50 minutes)")
 
-    attendance.insert_one({
-        "roll_no": roll_no,
-        "student_name": student["full_name"],
-        "subject": subject,
-        "otp": otp,
-        "visitor_id": visitor_id,
-        "marked_at": now_utc,
-        "lat": req.lat,
-        "lng": req.lng
-    })
+    # the store rejects a concurrent double submit for the same session
+    inserted = await attendance_store.insert_mark(
+        otp_doc, roll_no, student["full_name"], subject, visitor_id, now_utc, req.lat, req.lng
+    )
+    if not inserted:
+        raise HTTPException(status_code=400, detail="Attendance already marked")
+
+    await record_mark(roll_no, subject, otp_doc, now_utc)
+    notify_mark(otp_doc["_id"], roll_no, student["full_name"], now_utc)
 
     return {"message": "Attendance marked successfully"}
 
 
-@router.get("/student/view-attendance/{roll_no}")
-def view_attendance(roll_no: str, subject: str = None):
+class QueuedMark(BaseModel):
+    roll_no: str
+    otp: str
+    subject: str
+    visitorId: str
+    lat: Optional[float]
+    lng: Optional[float]
+    marked_at: datetime  # when the mark was taken on the device (naive values are UTC)
+
+
+class MarkBatchRequest(BaseModel):
+    marks: List[QueuedMark]
+
+
+@router.post("/student/markAttendance/batch", response_model=BatchMarkResponse,
+             dependencies=[Depends(access_profile("hot-write")), Depends(admission)])
+async def mark_attendance_batch(req: MarkBatchRequest, request: Request, claims=Depends(session_claims)):
+    """Submit marks queued while offline; each gets its own result instead of an error.
+
+    Sent by a student's device for its own marks, or with a teacher's token
+    by a device that collected marks for the teacher's sessions.
+    """
+    if len(req.marks) > OFFLINE_BATCH_MAX_MARKS:
+        raise HTTPException(status_code=400, detail=f"At most {OFFLINE_BATCH_MAX_MARKS} marks per batch")
+    await rate_limiter.check(ip=client_ip(request))
+
+    marks = [{
+        "roll_no": m.roll_no.upper(),
+        "otp": m.otp,
+        "subject": m.subject.strip().lower(),
+        "visitor_id": m.visitorId,
+        "lat": m.lat,
+        "lng": m.lng,
+        "marked_at": (m.marked_at if m.marked_at.tzinfo else m.marked_at.replace(tzinfo=pytz.utc)).astimezone(pytz.utc),
+    } for m in req.marks]
+
+    collector = None
+    if claims is not None and claims.get("role") == "teacher":
+        collector = claims["sub"]
+    else:
+        for roll_no in sorted({m["roll_no"] for m in marks}):
+            check_caller(claims, "student", roll_no)
+            await rate_limiter.check(roll_no=roll_no)
+    return await submit_marks(marks, collector)
+
+
+@router.get("/student/view-attendance/{roll_no}", response_model=List[AttendanceMark], dependencies=[Depends(access_profile("interactive-read"))])
+async def view_attendance(roll_no: str, subject: str = None, claims=Depends(session_claims)):
     roll_no = roll_no.upper()
-    query = {"roll_no": roll_no}
+    check_caller(claims, "student", roll_no)
 
     if subject:
         subject = subject.strip().lower()
-        SUBJECTS_LOWER = [s.lower() for s in SUBJECTS]
-        if subject not in SUBJECTS_LOWER:
+        if not subject_catalog.canonical(subject):
             raise HTTPException(status_code=400, detail="Invalid subject")
-        query["subject"] = subject
-
-    records = list(attendance.find(query))
-
-    result = []
-    for r in records:
-        marked_at = r.get("marked_at")
-        if marked_at and marked_at.tzinfo is None:
-            marked_at = marked_at.replace(tzinfo=pytz.utc)
-        marked_at_ist = marked_at.astimezone(IST).strftime("%Y-%m-%d %H:%M:%S") if marked_at else None
 
-        result.append({
-            "subject": r["subject"],
-            "marked_at": marked_at_ist
-        })
+    # marked_at comes back already formatted as IST text
+    return await attendance_store.student_marks(roll_no, subject, ist=True).to_list(length=None)
 
-    return result
-
-@router.get("/student/check-otp/{otp}")
-def check_otp(otp: str):
-    otp_doc = otps.find_one({"otp": otp})
+@router.get("/student/check-otp/{otp}", response_model=OtpWindow, dependencies=[Depends(access_profile("hot-write")), Depends(admission)])
+async def check_otp(otp: str, request: Request):
+    await rate_limiter.check(ip=client_ip(request))
+    otp_doc = await otp_cache.get(otp)
     if not otp_doc:
         raise HTTPException(status_code=404, detail="Invalid OTP")
 
-    start_time = otp_doc["start_time"]
-    end_time = otp_doc["end_time"]
-
-    if start_time.tzinfo is None:
-        start_time = start_time.replace(tzinfo=pytz.utc)
-    if end_time.tzinfo is None:
-        end_time = end_time.replace(tzinfo=pytz.utc)
-
     return {
         "subject": otp_doc["subject"],
-        "start_time": start_time.astimezone(IST).strftime("%Y-%m-%d %H:%M:%S"),
-        "end_time": end_time.astimezone(IST).strftime("%Y-%m-%d %H:%M:%S")
+        "start_time": format_ist(otp_doc["start_time"]),
+        "end_time": format_ist(otp_doc["end_time"])
     }
 
-@router.get("/student/export-attendance/{roll_no}")
-async def export_attendance_csv(roll_no: str):
+@router.get("/student/export-attendance/{roll_no}", dependencies=[Depends(access_profile("report"))])
+async def export_attendance_csv(roll_no: str, claims=Depends(session_claims)):
     roll_no = roll_no.upper()
-    records = list(attendance.find({"roll_no": roll_no}))
+    check_caller(claims, "student", roll_no)
+    records = await attendance_store.student_marks(roll_no, ist=True).to_list(length=None)
 
     if not records:
         raise HTTPException(status_code=404, detail="No attendance records found.")
@@ -174,15 +215,7 @@ async def export_attendance_csv(roll_no: str):
     csv_file = StringIO()
     writer = csv.writer(csv_file)
     writer.writerow(["Subject", "Marked At (IST)"])
-
-    for rec in records:
-        subject = rec.get("subject", "")
-        marked_at = rec.get("marked_at")
-        if marked_at and marked_at.tzinfo is None:
-            marked_at = marked_at.replace(tzinfo=pytz.utc)
-        marked_at_ist = marked_at.astimezone(IST).strftime("%Y-%m-%d %H:%M:%S") if marked_at else ""
-
-        writer.writerow([subject, marked_at_ist])
+    writer.writerows((rec.get("subject", ""), rec.get("marked_at") or "") for rec in records)
 
     csv_file.seek(0)
 
@@ -193,10 +226,50 @@ async def export_attendance_csv(roll_no: str):
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
-@router.get("/student/profile/{roll_no}")
-def get_student_profile(roll_no: str):
+@router.get("/student/summary/{roll_no}", response_model=List[SubjectAttendance], dependencies=[Depends(access_profile("interactive-read"))])
+async def get_attendance_summary(roll_no: str, claims=Depends(session_claims)):
+    """Attended vs held per subject, from the maintained counters."""
+    roll_no = roll_no.upper()
+    student = await authorize(claims, "student", roll_no)
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    if student.get("department") is None or student.get("semester") is None:
+        student = await profile_cache.get("student", roll_no) or student  # token issued before these claims
+    department = (student.get("department") or "").strip().upper() or None
+    section = (student.get("section") or "").strip().upper() or None
+
+    attended = {}
+    async for row in attendance_summary.find({"roll_no": roll_no}):
+        attended[row["subject"]] = row["attended"]
+
+    # only sessions of the student's own department and semester count; those
+    # created without a section count for every section
+    held = {}
+    async for row in session_summary.find({
+        "department": department,
+        "semester": student.get("semester"),
+        "subject": {"$in": subject_catalog.keys()},
+        "section": {"$in": [section, None]},
+    }):
+        held[row["subject"]] = held.get(row["subject"], 0) + row["held"]
+
+    result = []
+    for subject in sorted(set(attended) | set(held)):
+        attended_count = attended.get(subject, 0)
+        held_count = held.get(subject, 0)
+        result.append({
+            "subject": subject_catalog.canonical(subject) or subject,  # counters are keyed lower-case
+            "attended": attended_count,
+            "held": held_count,
+            "percentage": round(100 * attended_count / held_count, 2) if held_count else None
+        })
+    return result
+
+@router.get("/student/profile/{roll_no}", response_model=StudentProfile, dependencies=[Depends(access_profile("interactive-read"))])
+async def get_student_profile(roll_no: str, claims=Depends(session_claims)):
     roll_no = roll_no.upper()
-    student = approved_students.find_one({"roll_no": roll_no})
+    check_caller(claims, "student", roll_no)
+    student = await profile_cache.get("student", roll_no)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     
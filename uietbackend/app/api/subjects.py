@@ -1,9 +1,19 @@
 # app/api/subjects.py
-from fastapi import APIRouter
-from app.core.config import SUBJECTS
+import hashlib
+from typing import Optional
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import JSONResponse
+from app.core.config import SUBJECTS_CACHE_MAX_AGE
+from app.core.subject_catalog import subject_catalog
 
 router = APIRouter()
 
 @router.get("/subjects")
-def get_subjects():
-    return SUBJECTS
+async def get_subjects(request: Request, department: Optional[str] = None, semester: Optional[int] = None):
+    """Subject names, optionally for one department/semester, served from the in-memory catalogue."""
+    etag = 'W/"%s"' % hashlib.sha1(repr((subject_catalog.etag, department, semester)).encode()).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={SUBJECTS_CACHE_MAX_AGE}"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(subject_catalog.names(department, semester), headers=headers)
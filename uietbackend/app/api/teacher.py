@@ -1,13 +1,29 @@
 # app/api/teacher.py
-from fastapi import APIRouter, HTTPException
-from datetime import datetime, timedelta
-from app.db.database import otps, attendance, approved_teachers, approved_students
-from app.core.config import SUBJECTS
-from app.utils.otp_utils import generate_otp
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from datetime import date, datetime, timedelta
+from typing import List, Literal, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from app.db.database import otps, session_summary, access_profile
+from app.db import attendance_store
+from app.core.subject_catalog import subject_catalog
+from app.core.otp_sessions import reserve_code, with_archive
+from app.core.otp_cache import otp_cache
+from app.core.summaries import record_session
+from app.core.session_tokens import session_claims, check_caller, authorize
+from app.core.profile_cache import profile_cache
+from app.core.live_feed import live_feed
+from app.core.config import LIVE_FEED_HEARTBEAT_SECONDS, TEACHER_VIEW_DEFAULT_DAYS
+from app.utils.time_utils import IST, ist_date_range, ist_string, format_ist
+from app.schemas.teacher import (
+    GeneratedOtp, SessionMark, SessionPage, SummaryPage, SessionTotals, TeacherProfile,
+)
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from io import StringIO
+import asyncio
 import csv
+import json
 import pytz
 
 class GenerateOtpRequest(BaseModel):
@@ -16,118 +32,373 @@ class GenerateOtpRequest(BaseModel):
     duration_minutes: int
     lat: float
     lng: float
+    # required since sessions are attributed to a class: older clients that
+    # omit them get a 422 and must send the class they are teaching
+    department: str
+    semester: int
+    section: Optional[str] = None  # None: the whole semester
 
 router = APIRouter()
 
-# Timezone definitions
-IST = pytz.timezone('Asia/Kolkata')
-
-@router.post("/teacher/generate-otp")
-def generate_otp_route(data: GenerateOtpRequest):
-    if data.subject not in SUBJECTS:
+@router.post("/teacher/generate-otp", response_model=GeneratedOtp, dependencies=[Depends(access_profile("hot-write"))])
+async def generate_otp_route(data: GenerateOtpRequest, claims=Depends(session_claims)):
+    subject = subject_catalog.canonical(data.subject)
+    if not subject:
         raise HTTPException(status_code=400, detail="Invalid subject")
+    if not data.department.strip():
+        raise HTTPException(status_code=400, detail="Department is required")
     
-    teacher = approved_teachers.find_one({"employee_id": data.employee_id.upper()})
+    teacher = await authorize(claims, "teacher", data.employee_id.upper())
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
 
-    otp = generate_otp()
-
     # Store UTC in DB
     now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
     end_time_utc = now_utc + timedelta(minutes=data.duration_minutes)
 
-    otps.insert_one({
+    session_id = ObjectId()  # doubles as the session ID stored on attendance records
+    otp = await reserve_code(session_id, end_time_utc)
+    if otp is None:
+        raise HTTPException(status_code=503, detail="Could not allocate a unique OTP, please retry")
+
+    otp_doc = {
+        "_id": session_id,
         "otp": otp,
-        "subject": data.subject,
+        "subject": subject,
         "teacher_id": data.employee_id.upper(),
         "start_time": now_utc,
         "end_time": end_time_utc,
-        "location": {"lat": data.lat, "lng": data.lng}
-    })
+        "location": {"lat": data.lat, "lng": data.lng},
+        "section": data.section.strip().upper() if data.section else None,
+        "department": data.department.strip().upper(),
+        "semester": data.semester
+    }
+    await otps.insert_one(otp_doc)
+    await attendance_store.create_session(otp_doc)
+    otp_cache.put(otp_doc)
+    await record_session(otp_doc)
 
-    # Convert to IST for response
-    end_time_ist = end_time_utc.astimezone(IST)
     return {
         "otp": otp,
-        "subject": data.subject,
-        "valid_till": end_time_ist.strftime("%Y-%m-%d %H:%M:%S"),
+        "session_id": str(otp_doc["_id"]),
+        "subject": subject,
+        "valid_till": format_ist(end_time_utc),
     }
 
-@router.get("/teacher/view-attendance/{employee_id}")
-def view_attendance(employee_id: str):
-    teacher = approved_teachers.find_one({"employee_id": employee_id.upper()})
-    if not teacher:
-        raise HTTPException(status_code=404, detail="Teacher not found")
+def _canonical_subject(subject):
+    canonical = subject_catalog.canonical(subject)
+    if not canonical:
+        raise HTTPException(status_code=400, detail="Invalid subject")
+    return canonical
+
+
+def _recent_window(from_date, to_date):
+    """from_date/to_date, or the last TEACHER_VIEW_DEFAULT_DAYS IST days when neither is given and it is set."""
+    if from_date is None and to_date is None and TEACHER_VIEW_DEFAULT_DAYS > 0:
+        from_date = datetime.now(IST).date() - timedelta(days=TEACHER_VIEW_DEFAULT_DAYS - 1)
+    return from_date, to_date
+
+
+def _session_match(employee_id, subject=None, from_date=None, to_date=None):
+    match = {"teacher_id": employee_id}
+    if subject:
+        match["subject"] = _canonical_subject(subject)
+    start_range = ist_date_range(from_date, to_date)
+    if start_range:
+        match["start_time"] = start_range
+    return match
+
+
+def _after_session(match, after):
+    """Narrow `match` to sessions older than the (start_time, _id) cursor `after`."""
+    if after:
+        start_time, session_id = _decode_cursor(after)
+        match["$or"] = [
+            {"start_time": {"$lt": start_time}},
+            {"start_time": start_time, "_id": {"$lt": session_id}},
+        ]
+    return match
 
-    # Fetch all OTPs generated by this teacher
-    otps_list = list(otps.find({"teacher_id": employee_id.upper()}))
-    otp_codes = [o["otp"] for o in otps_list]
-
-    # Find attendance records matching these OTPs
-    records = list(attendance.find({"otp": {"$in": otp_codes}}))
-
-    # Convert marked_at to IST for display
-    result = []
-    for r in records:
-        marked_at_utc = r.get("marked_at")
-        if marked_at_utc and marked_at_utc.tzinfo is None:
-            marked_at_utc = marked_at_utc.replace(tzinfo=pytz.utc)
-        marked_at_ist = marked_at_utc.astimezone(IST).strftime("%Y-%m-%d %H:%M:%S") if marked_at_utc else None
-
-        result.append({
-            "student_name": r.get("student_name"),
-            "roll_no": r.get("roll_no"),
-            "subject": r.get("subject"),
-            "marked_at": marked_at_ist
-        })
-
-    return result
-
-@router.get("/teacher/export-attendance/{employee_id}")
-def export_attendance(employee_id: str):
-    teacher = approved_teachers.find_one({"employee_id": employee_id.upper()})
+
+@router.get("/teacher/view-attendance/{employee_id}", response_model=List[SessionMark], dependencies=[Depends(access_profile("interactive-read"))])
+async def view_attendance(employee_id: str, response: Response, subject: Optional[str] = None,
+                          from_date: Optional[date] = None, to_date: Optional[date] = None,
+                          limit: int = Query(50, ge=1, le=200), after: Optional[str] = None,
+                          claims=Depends(session_claims)):
+    """Marks of the newest `limit` sessions in from_date..to_date (the whole
+    history unless TEACHER_VIEW_DEFAULT_DAYS is set).
+
+    The cursor for the next, older page is in the X-Next-Cursor header.
+    """
+    teacher = await authorize(claims, "teacher", employee_id.upper())
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
 
-    # Find OTPs generated by this teacher
-    otps_list = list(otps.find({"teacher_id": employee_id.upper()}))
-    otp_codes = [otp["otp"] for otp in otps_list]
+    # One page of this teacher's sessions, keyset on (start_time, _id) as in list_sessions
+    from_date, to_date = _recent_window(from_date, to_date)
+    match = _after_session(_session_match(employee_id.upper(), subject, from_date, to_date), after)
+    newest_first = [{"$sort": {"start_time": -1, "_id": -1}}, {"$limit": limit + 1}]
+    sessions = await otps.aggregate(
+        with_archive(match, *newest_first) + newest_first + [{"$project": {"_id": 1, "start_time": 1}}]
+    ).to_list(length=None)
+    if len(sessions) > limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor(sessions[limit - 1])
+    session_ids = [s["_id"] for s in sessions[:limit]]
+
+    # Attendance records carry the session ID, so codes reused by other
+    # teachers or in other sessions can no longer leak in; marked_at comes
+    # back already formatted as IST text
+    return await attendance_store.session_marks(session_ids, ist=True).to_list(length=None)
+
+
+def _encode_cursor(doc):
+    start_time = doc["start_time"]
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=pytz.utc)
+    return f"{int(start_time.timestamp() * 1000)}_{doc['_id']}"
+
+
+def _decode_cursor(cursor):
+    try:
+        millis, session_id = cursor.split("_", 1)
+        start_time = datetime.fromtimestamp(int(millis) / 1000, tz=pytz.utc)
+        return start_time, ObjectId(session_id)
+    except (ValueError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/teacher/sessions/{employee_id}", response_model=SessionPage, dependencies=[Depends(access_profile("interactive-read"))])
+async def list_sessions(employee_id: str, subject: Optional[str] = None,
+                        from_date: Optional[date] = None, to_date: Optional[date] = None,
+                        limit: int = Query(20, ge=1, le=100), after: Optional[str] = None,
+                        claims=Depends(session_claims)):
+    """Newest-first sessions in the window with their present counts."""
+    check_caller(claims, "teacher", employee_id.upper())
+    match = _after_session(_session_match(employee_id.upper(), subject, from_date, to_date), after)
+
+    newest_first = [{"$sort": {"start_time": -1, "_id": -1}}, {"$limit": limit + 1}]
+    pipeline = with_archive(match, *newest_first) + newest_first + attendance_store.present_count_stages() + [
+        {"$project": {
+            "_id": 0,
+            "session_id": {"$toString": "$_id"},
+            "otp": 1,
+            "subject": 1,
+            "start_time": ist_string("$start_time"),
+            "end_time": ist_string("$end_time"),
+            "present": 1,
+            # raw values for the next-page cursor
+            "cursor": {"start_time": "$start_time", "_id": "$_id"},
+        }},
+    ]
+    docs = await otps.aggregate(pipeline).to_list(length=None)
+    next_cursor = _encode_cursor(docs[limit - 1]["cursor"]) if len(docs) > limit else None
+    return {"items": docs[:limit], "next_cursor": next_cursor}
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-    # Find attendance records matching these OTPs
-    records = list(attendance.find({"otp": {"$in": otp_codes}}))
 
-    # Prepare CSV in memory
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Student Name", "Roll Number", "Subject", "Date/Time (IST)"])
+def _live_mark(mark):
+    return {"roll_no": mark["roll_no"], "student_name": mark.get("student_name"), "marked_at": format_ist(mark["marked_at"])}
 
-    for record in records:
-        student = approved_students.find_one({"roll_no": record["roll_no"]})
-        name = student["full_name"] if student else "Unknown"
-        roll_no = record["roll_no"]
-        subject = record["subject"]
 
-        marked_at_utc = record.get("marked_at")
-        if marked_at_utc and marked_at_utc.tzinfo is None:
-            marked_at_utc = marked_at_utc.replace(tzinfo=pytz.utc)
-        dt_ist = marked_at_utc.astimezone(IST).strftime("%Y-%m-%d %H:%M:%S") if marked_at_utc else "N/A"
+async def _live_events(session_id, closes_at):
+    subscription = live_feed.subscribe(session_id)
+    try:
+        while True:
+            # subscribed before the snapshot is read, so nothing falls in between;
+            # marks that show up in both are dropped by roll number
+            seen = set()
+            marks = []
+            async for mark in attendance_store.session_marks([session_id]):
+                if mark["roll_no"] not in seen:
+                    seen.add(mark["roll_no"])
+                    marks.append(_live_mark(mark))
+            subscription.lagged = False
+            yield _sse("snapshot", {"count": len(seen), "marks": marks})
 
-        writer.writerow([name, roll_no, subject, dt_ist])
+            while not subscription.lagged:
+                remaining = (closes_at - datetime.now(pytz.utc)).total_seconds()
+                if remaining <= 0:
+                    yield _sse("end", {"count": len(seen)})
+                    return
+                try:
+                    mark = await asyncio.wait_for(subscription.queue.get(), min(LIVE_FEED_HEARTBEAT_SECONDS, remaining))
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if mark["roll_no"] in seen:
+                    continue
+                seen.add(mark["roll_no"])
+                yield _sse("mark", {**_live_mark(mark), "count": len(seen)})
 
-    output.seek(0)
+            # the client fell behind and marks were dropped: start over from a snapshot
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+    finally:
+        live_feed.unsubscribe(subscription)
+
+
+@router.get("/teacher/sessions/{employee_id}/{session_id}/live", dependencies=[Depends(access_profile("interactive-read"))])
+async def live_attendance(employee_id: str, session_id: str, claims=Depends(session_claims)):
+    """Server-Sent Events for one session: a snapshot, then each new mark with the running count.
+
+    Ends with an "end" event shortly after the session closes. EventSource
+    cannot send headers, so pass the token as ?access_token=.
+    """
+    employee_id = employee_id.upper()
+    check_caller(claims, "teacher", employee_id)
+    if not ObjectId.is_valid(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    session = await otps.find_one({"_id": ObjectId(session_id), "teacher_id": employee_id}, {"end_time": 1})
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    end_time = session["end_time"]
+    if end_time.tzinfo is None:
+        end_time = end_time.replace(tzinfo=pytz.utc)
+    # a few seconds of grace for marks accepted right at the end
+    closes_at = end_time + timedelta(seconds=5)
+    return StreamingResponse(
+        _live_events(session["_id"], closes_at),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/teacher/attendance-summary/{employee_id}", response_model=SummaryPage, dependencies=[Depends(access_profile("interactive-read"))])
+async def attendance_summary(employee_id: str, group_by: Literal["date", "subject"] = "date",
+                             subject: Optional[str] = None,
+                             from_date: Optional[date] = None, to_date: Optional[date] = None,
+                             limit: int = Query(31, ge=1, le=366), after: Optional[str] = None,
+                             claims=Depends(session_claims)):
+    """Sessions held and marks received, grouped by IST date (and subject) or by subject.
+
+    Covers from_date..to_date (the whole history unless
+    TEACHER_VIEW_DEFAULT_DAYS is set). Pages are keyset on the group key, and
+    the sessions are cut down to the page before they are joined and grouped:
+    by date, a page of `limit` groups spans at most `limit` days, so only
+    those days are read.
+    """
+    check_caller(claims, "teacher", employee_id.upper())
+    from_date, to_date = _recent_window(from_date, to_date)
+    page_from, page_to = from_date, to_date
+    after_date = after_subject = None
+    if group_by == "date":
+        if after:
+            after_date, _, after_subject = after.partition("|")
+            try:
+                page_to = date.fromisoformat(after_date)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        page_to = page_to or datetime.now(IST).date()
+        page_from = max(filter(None, (from_date, page_to - timedelta(days=limit - 1))))
+    match = _session_match(employee_id.upper(), subject, page_from, page_to)
+
+    if group_by == "date":
+        key = {
+            "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$start_time", "timezone": "Asia/Kolkata"}},
+            "subject": "$subject",
+        }
+        sort = {"_id.date": -1, "_id.subject": 1}
+    else:
+        key = {"subject": "$subject"}
+        sort = {"_id.subject": 1}
+        if after:
+            match["subject"] = {**({"$eq": match["subject"]} if "subject" in match else {}), "$gt": after}
+
+    pipeline = with_archive(match) + attendance_store.present_count_stages() + [
+        {"$group": {"_id": key, "sessions": {"$sum": 1}, "present": {"$sum": "$present"}}},
+        {"$sort": sort},
+    ]
+    if after_date:
+        # keyset on the group key, in the same order as the sort above
+        pipeline.append({"$match": {"$or": [
+            {"_id.date": {"$lt": after_date}},
+            {"_id.date": after_date, "_id.subject": {"$gt": after_subject}},
+        ]}})
+    pipeline.append({"$limit": limit + 1})
+
+    docs = await otps.aggregate(pipeline).to_list(length=None)
+    items = [{**doc["_id"], "sessions": doc["sessions"], "present": doc["present"]} for doc in docs[:limit]]
+    next_cursor = None
+    if len(docs) > limit:
+        last = items[-1]
+        next_cursor = f"{last['date']}|{last['subject']}" if group_by == "date" else last["subject"]
+    elif group_by == "date" and page_from != from_date:
+        # fewer than `limit` groups in these days; carry on from the day before
+        # them if this teacher has older sessions in the window
+        older = _session_match(employee_id.upper(), subject, from_date, page_from - timedelta(days=1))
+        if await otps.aggregate(with_archive(older, {"$limit": 1}) + [{"$limit": 1}]).to_list(length=None):
+            next_cursor = f"{(page_from - timedelta(days=1)).isoformat()}|"
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def _export_pipeline(employee_id, subject=None, marked_range=None):
+    match = {"teacher_id": employee_id}
+    if subject:
+        match["subject"] = subject
+    if marked_range:
+        match["start_time"] = marked_range
+    # names are joined on the server instead of one find_one per row
+    return with_archive(match) + [{"$sort": {"start_time": 1}}] + attendance_store.session_rows_stages(ist=True)
+
+
+async def _csv_rows(cursor, header, batch_rows=500):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    rows = 0
+    async for record in cursor:
+        writer.writerow([record["student_name"], record["roll_no"], record["subject"], record.get("marked_at") or "N/A"])
+        rows += 1
+        if rows % batch_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+@router.get("/teacher/export-attendance/{employee_id}", dependencies=[Depends(access_profile("report"))])
+async def export_attendance(employee_id: str, subject: Optional[str] = None,
+                            from_date: Optional[date] = None, to_date: Optional[date] = None,
+                            claims=Depends(session_claims)):
+    teacher = await authorize(claims, "teacher", employee_id.upper())
+    if not teacher:
+        raise HTTPException(status_code=404, detail="Teacher not found")
+
+    if subject:
+        subject = _canonical_subject(subject)
+
+    # Stream rows as the cursor yields them so memory stays flat
+    cursor = otps.aggregate(
+        _export_pipeline(employee_id.upper(), subject, ist_date_range(from_date, to_date)),
+        allowDiskUse=True,
+        batchSize=500,
+    )
 
     filename = f"attendance_{employee_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
     return StreamingResponse(
-        output,
+        _csv_rows(cursor, ["Student Name", "Roll Number", "Subject", "Date/Time (IST)"]),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
-@router.get("/teacher/profile/{employee_id}")
-def get_teacher_profile(employee_id: str):
+@router.get("/teacher/summary/{employee_id}", response_model=List[SessionTotals], dependencies=[Depends(access_profile("interactive-read"))])
+async def get_session_summary(employee_id: str, claims=Depends(session_claims)):
+    """Sessions held and marks received per (department, semester, subject, section), from the maintained counters."""
+    check_caller(claims, "teacher", employee_id.upper())
+    rows = await session_summary.find(
+        {"teacher_id": employee_id.upper()}, {"_id": 0, "teacher_id": 0}
+    ).to_list(length=None)
+    return rows
+
+@router.get("/teacher/profile/{employee_id}", response_model=TeacherProfile, dependencies=[Depends(access_profile("interactive-read"))])
+async def get_teacher_profile(employee_id: str, claims=Depends(session_claims)):
     employee_id = employee_id.upper()
-    teacher = approved_teachers.find_one({"employee_id": employee_id})
+    check_caller(claims, "teacher", employee_id)
+    teacher = await profile_cache.get("teacher", employee_id)
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher  not found")
     
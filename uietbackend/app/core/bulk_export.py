@@ -0,0 +1,196 @@
+# app/core/bulk_export.py
+import asyncio
+import csv
+import gzip
+import os
+import time
+import zipfile
+from urllib.parse import quote
+from app.core.config import EXPORT_CURSOR_BATCH, EXPORT_ROW_GROUP_ROWS, EXPORT_PARQUET_COMPRESSION
+from app.core.otp_sessions import with_archive
+from app.core.subject_catalog import subject_key
+from app.db import attendance_store
+from app.db.database import otps, approved_students
+from app.utils.time_utils import ist_date_range
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional (pip install pyarrow); without it exports are CSV
+    pa = pq = None
+
+# Full attendance history for analytics: one row per mark, joined with its
+# session (otps and otps_archive) and the student. Files are partitioned
+# Hive-style as semester=<n>/subject=<key>/part-0.<ext>; the partition values
+# live in the path only, as Hive-partitioned readers expect. Timestamps are
+# UTC (typed in Parquet, ISO 8601 with Z in CSV), never preformatted IST.
+# Marks without a session_id (see scripts.backfill_session_ids) are not exported.
+#
+# Semester and department are the ones the session was held for, so a mark
+# stays in the semester it was taken in after the student moves on. Sessions
+# from before generate-otp recorded them fall back to the student's CURRENT
+# approved_students record, as do student_name and section (the student's own
+# section; session_section is the one the session was held for): for those
+# rows, history of a student who has since changed semester is filed under
+# the new one.
+
+COLUMNS = [
+    "session_id", "teacher_id", "session_section", "session_start", "session_end",
+    "roll_no", "student_name", "department", "section", "marked_at", "lat", "lng",
+]
+TIMESTAMP_COLUMNS = ("session_start", "session_end", "marked_at")
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+if pa is not None:
+    SCHEMA = pa.schema([
+        ("session_id", pa.string()),
+        ("teacher_id", pa.string()),
+        ("session_section", pa.string()),
+        ("session_start", pa.timestamp("ms", tz="UTC")),
+        ("session_end", pa.timestamp("ms", tz="UTC")),
+        ("roll_no", pa.string()),
+        ("student_name", pa.string()),
+        ("department", pa.string()),
+        ("section", pa.string()),
+        ("marked_at", pa.timestamp("ms", tz="UTC")),
+        ("lat", pa.float64()),
+        ("lng", pa.float64()),
+    ])
+
+
+def formats():
+    return ["parquet", "csv"] if pa is not None else ["csv"]
+
+
+class _ParquetPartitions:
+    extension = "parquet"
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self._writers = {}
+
+    def write(self, partition, columns):
+        writer = self._writers.get(partition)
+        if writer is None:
+            path = os.path.join(self.out_dir, partition, f"part-0.{self.extension}")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            writer = self._writers[partition] = pq.ParquetWriter(path, SCHEMA, compression=EXPORT_PARQUET_COMPRESSION)
+        # pymongo returns naive UTC datetimes, which Arrow stores as-is under tz=UTC
+        writer.write_table(pa.Table.from_pydict(columns, schema=SCHEMA))
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+
+
+class _CsvPartitions:
+    extension = "csv.gz"
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self._files = {}
+
+    def write(self, partition, columns):
+        entry = self._files.get(partition)
+        if entry is None:
+            path = os.path.join(self.out_dir, partition, f"part-0.{self.extension}")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handle = gzip.open(path, "wt", newline="")
+            entry = self._files[partition] = (handle, csv.writer(handle))
+            entry[1].writerow(COLUMNS)
+        for name in TIMESTAMP_COLUMNS:
+            columns[name] = [v.isoformat(timespec="milliseconds") + "Z" if v else "" for v in columns[name]]
+        entry[1].writerows(zip(*(columns[name] for name in COLUMNS)))
+
+    def close(self):
+        for handle, _ in self._files.values():
+            handle.close()
+
+
+def _partition(semester, subject):
+    semester = NULL_PARTITION if semester is None else str(semester)
+    return f"semester={semester}/subject={quote(subject_key(subject or ''), safe='') or NULL_PARTITION}"
+
+
+async def export_attendance(out_dir, fmt=None, from_date=None, to_date=None):
+    """Write every mark of sessions started in from_date..to_date (IST days, both
+    optional) under out_dir; returns a manifest of the files written."""
+    fmt = fmt or formats()[0]
+    if fmt not in formats():
+        raise RuntimeError(f"Export format {fmt!r} is not available" + (" (pip install pyarrow)" if fmt == "parquet" else ""))
+    started = time.perf_counter()
+    writer = _ParquetPartitions(out_dir) if fmt == "parquet" else _CsvPartitions(out_dir)
+
+    students = {}
+    async for doc in approved_students.find({}, {"_id": 0, "roll_no": 1, "full_name": 1, "department": 1,
+                                                 "semester": 1, "section": 1}):
+        students[doc["roll_no"]] = doc
+
+    start_range = ist_date_range(from_date, to_date)
+    cursor = otps.aggregate(
+        with_archive({"start_time": start_range} if start_range else {}, {"$project": {
+            "teacher_id": 1, "subject": 1, "section": 1, "department": 1, "semester": 1,
+            "start_time": 1, "end_time": 1,
+        }}) + attendance_store.session_mark_stages(),
+        allowDiskUse=True,
+        batchSize=EXPORT_CURSOR_BATCH,
+    )
+
+    partitions = {}  # (semester, subject) -> partition path
+    buffers = {}  # partition path -> {column: [values]}
+    counts = {}
+    try:
+        while True:
+            batch = await cursor.to_list(length=EXPORT_CURSOR_BATCH)
+            if not batch:
+                break
+            for doc in batch:
+                student = students.get(doc["roll_no"], {})
+                semester = doc.get("semester")
+                department = doc.get("department")
+                if semester is None or department is None:  # session from before these were recorded
+                    semester, department = student.get("semester"), student.get("department")
+                key = (semester, doc.get("subject"))
+                partition = partitions.get(key)
+                if partition is None:
+                    partition = partitions[key] = _partition(*key)
+                columns = buffers.get(partition)
+                if columns is None:
+                    columns = buffers[partition] = {name: [] for name in COLUMNS}
+                columns["session_id"].append(str(doc["_id"]))
+                columns["teacher_id"].append(doc.get("teacher_id"))
+                columns["session_section"].append(doc.get("section"))
+                columns["session_start"].append(doc.get("start_time"))
+                columns["session_end"].append(doc.get("end_time"))
+                columns["roll_no"].append(doc["roll_no"])
+                columns["student_name"].append(student.get("full_name"))
+                columns["department"].append(department)
+                columns["section"].append(student.get("section"))
+                columns["marked_at"].append(doc.get("marked_at"))
+                columns["lat"].append(doc.get("lat"))
+                columns["lng"].append(doc.get("lng"))
+                if len(columns["roll_no"]) == EXPORT_ROW_GROUP_ROWS:
+                    await asyncio.to_thread(writer.write, partition, buffers.pop(partition))
+                    counts[partition] = counts.get(partition, 0) + EXPORT_ROW_GROUP_ROWS
+        for partition, columns in buffers.items():
+            await asyncio.to_thread(writer.write, partition, columns)
+            counts[partition] = counts.get(partition, 0) + len(columns["roll_no"])
+    finally:
+        await asyncio.to_thread(writer.close)
+
+    return {
+        "format": fmt,
+        "rows": sum(counts.values()),
+        "files": [{"path": f"{p}/part-0.{writer.extension}", "rows": n} for p, n in sorted(counts.items())],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def zip_dataset(out_dir, archive_path):
+    """Zip an exported directory without recompressing (the files already are)."""
+    with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for root, _, files in os.walk(out_dir):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                archive.write(path, os.path.relpath(path, out_dir))
+    return archive_path
@@ -4,15 +4,138 @@ from dotenv import load_dotenv
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "uietattendance")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() == "true"
+
+# Access profiles (see app/db/database.py): each route uses one, and each profile
+# has its own client and pool. Off: every profile shares the default client.
+MONGO_ACCESS_PROFILES = os.getenv("MONGO_ACCESS_PROFILES", "true").lower() == "true"
+# hot-write: markAttendance and friends. w=1 with journaling acknowledges once the
+# primary has the mark on disk; "majority" also survives a failover, at extra latency
+MONGO_HOT_WRITE_POOL_SIZE = int(os.getenv("MONGO_HOT_WRITE_POOL_SIZE", "50"))
+MONGO_HOT_WRITE_TIMEOUT_MS = int(os.getenv("MONGO_HOT_WRITE_TIMEOUT_MS", "2000"))
+MONGO_HOT_WRITE_W = os.getenv("MONGO_HOT_WRITE_W", "1")
+MONGO_HOT_WRITE_JOURNAL = os.getenv("MONGO_HOT_WRITE_JOURNAL", "true").lower() == "true"
+# interactive-read: dashboards a user is waiting on; reads stay on the primary while
+# it is up so a student sees the mark they just made
+MONGO_INTERACTIVE_POOL_SIZE = int(os.getenv("MONGO_INTERACTIVE_POOL_SIZE", "30"))
+MONGO_INTERACTIVE_TIMEOUT_MS = int(os.getenv("MONGO_INTERACTIVE_TIMEOUT_MS", "5000"))
+MONGO_INTERACTIVE_READ_PREFERENCE = os.getenv("MONGO_INTERACTIVE_READ_PREFERENCE", "primaryPreferred")
+# report: admin lists and exports; may be served by a secondary (or MONGO_REPORT_URI,
+# e.g. an analytics node) up to MONGO_REPORT_MAX_STALENESS_SECONDS behind
+MONGO_REPORT_URI = os.getenv("MONGO_REPORT_URI")
+MONGO_REPORT_POOL_SIZE = int(os.getenv("MONGO_REPORT_POOL_SIZE", "10"))
+MONGO_REPORT_TIMEOUT_MS = int(os.getenv("MONGO_REPORT_TIMEOUT_MS", "60000"))
+MONGO_REPORT_READ_PREFERENCE = os.getenv("MONGO_REPORT_READ_PREFERENCE", "secondaryPreferred")
+MONGO_REPORT_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_REPORT_MAX_STALENESS_SECONDS", "120"))
 ADMIN_ID = os.getenv("ADMIN_ID")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD")
 SMTP_SERVER = os.getenv("SMTP_SERVER")
-SMTP_PORT = int(os.getenv("SMTP_PORT"))
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
 URL = os.getenv("url")
+# all: HTTP + background workers; api: HTTP only; readonly: HTTP, writes refused;
+# worker: background workers only (python -m app.server --role worker)
+APP_ROLE = os.getenv("APP_ROLE", "all").lower()
+# connections opened per worker before it starts accepting requests
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "10"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+
+OTP_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("OTP_CACHE_NEGATIVE_TTL_SECONDS", "2"))
+OTP_CACHE_MAX_ENTRIES = int(os.getenv("OTP_CACHE_MAX_ENTRIES", "10000"))
+
+OTP_RESERVE_ATTEMPTS = int(os.getenv("OTP_RESERVE_ATTEMPTS", "10"))
+OTP_ARCHIVE_ENABLED = os.getenv("OTP_ARCHIVE_ENABLED", "true").lower() == "true"
+OTP_ARCHIVE_AFTER_HOURS = float(os.getenv("OTP_ARCHIVE_AFTER_HOURS", "24"))
+OTP_ARCHIVE_INTERVAL_SECONDS = float(os.getenv("OTP_ARCHIVE_INTERVAL_SECONDS", "600"))
+OTP_ARCHIVE_BATCH_SIZE = int(os.getenv("OTP_ARCHIVE_BATCH_SIZE", "500"))
+# 0 keeps archived sessions forever; reports need them to resolve old attendance
+OTP_ARCHIVE_RETENTION_DAYS = int(os.getenv("OTP_ARCHIVE_RETENTION_DAYS", "0"))
+
+# "rows": one attendance document per mark; "buckets": one attendance_buckets
+# document per session (run scripts.migrate_attendance_layout before switching)
+ATTENDANCE_LAYOUT = os.getenv("ATTENDANCE_LAYOUT", "rows").lower()
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# "local" keeps buckets per worker; "mongo" shares them through the rate_limits collection
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local").lower()
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "50000"))
+# requests per minute and burst size per key; a whole class may share one campus IP
+RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", "600"))
+RATE_LIMIT_IP_BURST = int(os.getenv("RATE_LIMIT_IP_BURST", "200"))
+RATE_LIMIT_VISITOR_PER_MINUTE = float(os.getenv("RATE_LIMIT_VISITOR_PER_MINUTE", "10"))
+RATE_LIMIT_VISITOR_BURST = int(os.getenv("RATE_LIMIT_VISITOR_BURST", "5"))
+RATE_LIMIT_ROLL_NO_PER_MINUTE = float(os.getenv("RATE_LIMIT_ROLL_NO_PER_MINUTE", "10"))
+RATE_LIMIT_ROLL_NO_BURST = int(os.getenv("RATE_LIMIT_ROLL_NO_BURST", "5"))
+# take the client IP from X-Forwarded-For (only behind a proxy that sets it)
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+# per-worker cap on concurrently handled student requests; excess waits briefly, then gets 503
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "200"))
+ADMISSION_QUEUE_SECONDS = float(os.getenv("ADMISSION_QUEUE_SECONDS", "1"))
+
+# batch submission of marks queued offline (/student/markAttendance/batch): marks per
+# request, how old a queued mark may be, and how far ahead of the server clock it may claim to be
+OFFLINE_BATCH_MAX_MARKS = int(os.getenv("OFFLINE_BATCH_MAX_MARKS", "200"))
+OFFLINE_MARK_MAX_AGE_HOURS = float(os.getenv("OFFLINE_MARK_MAX_AGE_HOURS", "24"))
+OFFLINE_MARK_CLOCK_SKEW_SECONDS = float(os.getenv("OFFLINE_MARK_CLOCK_SKEW_SECONDS", "120"))
+
+# HMAC key for login tokens; must be the same on every worker, and is required
+# to serve HTTP. Tokens are not revocable, so they are short-lived: an expired
+# token is a 401 and the client logs in again.
+AUTH_SECRET = os.getenv("AUTH_SECRET")
+AUTH_TOKEN_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", str(30 * 60)))
+# false while old clients without tokens are still around: they fall back to a lookup
+AUTH_REQUIRE_TOKEN = os.getenv("AUTH_REQUIRE_TOKEN", "false").lower() == "true"
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "5000"))
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300"))
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+
+# attendance percentage below which a student is a defaulter (per subject)
+DEFAULTER_THRESHOLD = float(os.getenv("DEFAULTER_THRESHOLD", "75"))
+# bulk attendance export (app/core/bulk_export.py): documents per cursor batch,
+# rows per Parquet row group / CSV flush, and the Parquet codec
+EXPORT_CURSOR_BATCH = int(os.getenv("EXPORT_CURSOR_BATCH", "10000"))
+EXPORT_ROW_GROUP_ROWS = int(os.getenv("EXPORT_ROW_GROUP_ROWS", "100000"))
+EXPORT_PARQUET_COMPRESSION = os.getenv("EXPORT_PARQUET_COMPRESSION", "zstd")
+
+# teacher attendance views asked for without from_date/to_date cover the last
+# this many IST days; 0 (the default) keeps the whole history, one page at a time
+TEACHER_VIEW_DEFAULT_DAYS = int(os.getenv("TEACHER_VIEW_DEFAULT_DAYS", "0"))
 
+# defaulter report snapshots kept; older ones are deleted after each build (0 keeps all)
+DEFAULTER_REPORTS_KEPT = int(os.getenv("DEFAULTER_REPORTS_KEPT", "12"))
+# one build runs at a time; a "building" report older than this is taken to
+# belong to a crashed worker and is marked failed so a new build can start
+DEFAULTER_BUILD_TIMEOUT_MINUTES = float(os.getenv("DEFAULTER_BUILD_TIMEOUT_MINUTES", "60"))
 
+OUTBOX_WORKER_ENABLED = os.getenv("OUTBOX_WORKER_ENABLED", "true").lower() == "true"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "2"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+OUTBOX_IDLE_CLOSE_SECONDS = float(os.getenv("OUTBOX_IDLE_CLOSE_SECONDS", "60"))
+
+# "local": marks reach feeds of the worker that stored them only (single worker);
+# "changestream": every worker tails the attendance change stream (replica set)
+LIVE_FEED_BACKEND = os.getenv("LIVE_FEED_BACKEND", "local").lower()
+LIVE_FEED_HEARTBEAT_SECONDS = float(os.getenv("LIVE_FEED_HEARTBEAT_SECONDS", "15"))
+LIVE_FEED_QUEUE_SIZE = int(os.getenv("LIVE_FEED_QUEUE_SIZE", "500"))
+
+# how often each worker checks the subjects version for changes
+SUBJECTS_RELOAD_SECONDS = float(os.getenv("SUBJECTS_RELOAD_SECONDS", "30"))
+SUBJECTS_CACHE_MAX_AGE = int(os.getenv("SUBJECTS_CACHE_MAX_AGE", "60"))
+
+# Seeds the subjects collection when it is empty, and serves until it is loaded
 SUBJECTS = [
     "EMT", "VLSI", "DSA", "CE",
     "DSP", "Analog Electronics",
@@ -21,3 +144,33 @@ SUBJECTS = [
 ]
 
 
+def serves_http(role=None):
+    return (role or APP_ROLE) in ("all", "api", "readonly")
+
+
+def runs_background(role=None):
+    return (role or APP_ROLE) in ("all", "worker")
+
+
+def missing_settings(role=None):
+    """Settings this process role needs but which are unset.
+
+    Checked at startup rather than on import, so scripts and processes that
+    never send mail or take logins do not need those settings.
+    """
+    role = role or APP_ROLE
+    required = {"MONGO_URI": MONGO_URI}
+    if serves_http(role):
+        required.update(ADMIN_ID=ADMIN_ID, ADMIN_PASSWORD=ADMIN_PASSWORD, AUTH_SECRET=AUTH_SECRET)
+    if runs_background(role) and OUTBOX_WORKER_ENABLED:
+        required.update(SMTP_SERVER=SMTP_SERVER, SMTP_USER=SMTP_USER, SMTP_PASSWORD=SMTP_PASSWORD)
+    return [name for name, value in required.items() if not value]
+
+
+def validate_config(role=None):
+    role = role or APP_ROLE
+    if role not in ("all", "api", "readonly", "worker"):
+        raise RuntimeError(f"Unknown APP_ROLE {role!r}")
+    missing = missing_settings(role)
+    if missing:
+        raise RuntimeError(f"Missing settings for role {role!r}: {', '.join(missing)}")
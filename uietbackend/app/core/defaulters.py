@@ -0,0 +1,193 @@
+# app/core/defaulters.py
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from app.core.config import (
+    BULK_BATCH_SIZE, DEFAULTER_THRESHOLD, DEFAULTER_REPORTS_KEPT, DEFAULTER_BUILD_TIMEOUT_MINUTES,
+)
+from app.core.logging_utils import log_event
+from app.core.otp_sessions import with_archive
+from app.core.subject_catalog import subject_catalog, subject_key
+from app.db import attendance_store
+from app.db.database import otps, approved_students, defaulter_reports, defaulter_rows
+from app.utils.time_utils import ist_date_range
+
+logger = logging.getLogger(__name__)
+
+# A defaulter report is a dated snapshot of every approved student's attendance
+# percentage in every subject of their department and semester that was held
+# for their department, semester and section. defaulter_reports holds one document per build; its rows
+# go to defaulter_rows in (department, semester, section, roll_no, subject)
+# order, so _id order is display order and pages are keyset on _id.
+#
+# A build is three queries - sessions held per (department, semester, subject,
+# section), marks per
+# (roll_no, subject) and the approved students - joined in memory. Each is a
+# single grouped pass over its collection, so a term of marks costs one scan,
+# not one query per student.
+
+
+async def _sessions_held(start_range):
+    # sessions from before generate-otp required a department and semester
+    # cannot be attributed to a class, so they are left out
+    held = {}
+    match = {"department": {"$ne": None}, "semester": {"$ne": None}}
+    if start_range:
+        match["start_time"] = start_range
+    async for row in otps.aggregate(with_archive(match) + [
+        {"$group": {
+            "_id": {
+                "department": {"$toUpper": "$department"},  # older sessions kept it as typed
+                "semester": "$semester",
+                "subject": {"$toLower": "$subject"},
+                "section": {"$ifNull": ["$section", None]},
+            },
+            "held": {"$sum": 1},
+        }},
+    ], allowDiskUse=True):
+        group = row["_id"]
+        key = (group["department"], group["semester"], group["subject"], group["section"])
+        held[key] = held.get(key, 0) + row["held"]
+    return held
+
+
+async def _marks_attended(marked_range):
+    attended = {}
+    async for row in attendance_store.student_subject_totals(marked_range=marked_range):
+        attended[(row["_id"]["roll_no"], row["_id"]["subject"])] = row["attended"]
+    return attended
+
+
+async def _students():
+    docs = await approved_students.find(
+        {}, {"_id": 0, "roll_no": 1, "full_name": 1, "department": 1, "semester": 1, "section": 1},
+    ).to_list(length=None)
+    for doc in docs:
+        doc["department"] = (doc.get("department") or "").strip().upper() or None
+        doc["section"] = (doc.get("section") or "").strip().upper() or None
+    docs.sort(key=lambda d: (d.get("department") or "", d.get("semester") or 0, d["section"] or "", d["roll_no"]))
+    return docs
+
+
+def report_rows(report_id, students, held, attended):
+    """One row per student and subject that was held for the student's class.
+
+    `held` maps (department, semester, subject key, section) to a session
+    count; a section of None is a session held for the whole semester.
+    """
+    subjects_for = {}
+    for student in students:
+        group = (student.get("department"), student.get("semester"))
+        if group not in subjects_for:
+            subjects_for[group] = sorted((subject_key(n), n) for n in subject_catalog.names(*group))
+        for key, name in subjects_for[group]:
+            # sessions created without a section count for every section
+            held_count = held.get((*group, key, student["section"]), 0) + held.get((*group, key, None), 0)
+            if not held_count:
+                continue
+            attended_count = attended.get((student["roll_no"], key), 0)
+            yield {
+                "report_id": report_id,
+                "department": student.get("department"),
+                "semester": student.get("semester"),
+                "section": student["section"],
+                "roll_no": student["roll_no"],
+                "student_name": student.get("full_name"),
+                "subject": name,
+                "attended": attended_count,
+                "held": held_count,
+                "percentage": round(100 * attended_count / held_count, 2),
+            }
+
+
+async def _insert_rows(rows):
+    count = defaulters = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        count += 1
+        defaulters += row["percentage"] < DEFAULTER_THRESHOLD
+        if len(batch) == BULK_BATCH_SIZE:
+            await defaulter_rows.insert_many(batch)
+            batch = []
+    if batch:
+        await defaulter_rows.insert_many(batch)
+    return count, defaulters
+
+
+async def build_report(from_date=None, to_date=None, label=None):
+    """Compute and store a snapshot for sessions and marks in from_date..to_date (IST days).
+
+    Returns None without building anything while another build is running
+    (on any worker): a build reads the whole term, so requests do not pile up.
+    """
+    started = time.perf_counter()
+    date_range = ist_date_range(from_date, to_date)
+    report = {
+        "_id": ObjectId(),
+        "label": label,
+        "from_date": from_date.isoformat() if from_date else None,
+        "to_date": to_date.isoformat() if to_date else None,
+        "created_at": datetime.now(timezone.utc),
+        "status": "building",
+    }
+    stale = report["created_at"] - timedelta(minutes=DEFAULTER_BUILD_TIMEOUT_MINUTES)
+    await defaulter_reports.update_many({"status": "building", "created_at": {"$lt": stale}},
+                                        {"$set": {"status": "failed"}})
+    try:
+        # the partial unique index on status admits one "building" report
+        await defaulter_reports.insert_one(report)
+    except DuplicateKeyError:
+        return None
+    try:
+        held = await _sessions_held(date_range)
+        attended = await _marks_attended(date_range)
+        students = await _students()
+        count, defaulters = await _insert_rows(report_rows(report["_id"], students, held, attended))
+    except Exception:
+        await defaulter_reports.update_one({"_id": report["_id"]}, {"$set": {"status": "failed"}})
+        await defaulter_rows.delete_many({"report_id": report["_id"]})
+        raise
+
+    report.update({
+        "status": "ready",
+        "students": len(students),
+        "rows": count,
+        "threshold": DEFAULTER_THRESHOLD,
+        "defaulters": defaulters,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+    await defaulter_reports.replace_one({"_id": report["_id"]}, report)
+    await _prune()
+    log_event(logger, "defaulter_report", sample_rate=1, report_id=str(report["_id"]),
+              students=len(students), rows=count, defaulters=defaulters, elapsed_ms=report["elapsed_ms"])
+    return report
+
+
+async def _prune():
+    """Drop all but the newest DEFAULTER_REPORTS_KEPT snapshots (0 keeps them all)."""
+    if DEFAULTER_REPORTS_KEPT <= 0:
+        return
+    old = await defaulter_reports.find({}, {"_id": 1}).sort("created_at", -1).skip(DEFAULTER_REPORTS_KEPT).to_list(length=None)
+    if old:
+        ids = [doc["_id"] for doc in old]
+        await defaulter_rows.delete_many({"report_id": {"$in": ids}})
+        await defaulter_reports.delete_many({"_id": {"$in": ids}})
+
+
+async def find_report(report_id):
+    """A ready report by ID, or the newest one for "latest"; None if there is none."""
+    if report_id == "latest":
+        return await defaulter_reports.find_one({"status": "ready"}, sort=[("created_at", -1)])
+    if not ObjectId.is_valid(report_id):
+        return None
+    return await defaulter_reports.find_one({"_id": ObjectId(report_id), "status": "ready"})
+
+
+def public(report):
+    """A report document as returned by the API."""
+    report = dict(report)
+    report["report_id"] = str(report.pop("_id"))
+    return report
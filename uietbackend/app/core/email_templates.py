@@ -0,0 +1,64 @@
+# app/core/email_templates.py
+
+def student_approved_email(name):
+    subject = "Your account has been approved! 🎉"
+    message = f"""
+    Hi {name},
+    Congratulations! Your student account has been approved on our College Attendance Management System.
+    You can now log in and:
+    ✅ Mark your attendance using OTP
+    ✅ View your attendance history
+    ✅ Stay updated with class activities
+    If you have any questions, feel free to reach out to our support team.
+    Welcome aboard!
+    - College Attendance Team
+    """
+    return subject, message
+
+
+def student_rejected_email(name):
+    subject = "Update on Your Student Account Registration"
+    message = f"""
+    Hi {name},
+    Thank you for registering on our College Attendance Management System.
+    After reviewing your application, we regret to inform you that your student account has not been approved at this time.
+    If you believe this decision was made in error or if you’d like to provide additional details for reconsideration, please feel free to contact our support team.
+
+    We appreciate your interest and understanding.
+
+    Welcome aboard!
+    - College Attendance Team
+    """
+    return subject, message
+
+
+def teacher_approved_email(name):
+    subject = "Your Teacher Account Has Been Approved!"
+    message = f"""
+    Dear {name},
+    Congratulations! Your teacher account has been approved on our College Attendance Management System.
+    You can now log in and:
+    ✅ Mark your attendance using OTP
+    ✅ View your attendance history
+    ✅ Stay updated with class activities
+    If you have any questions, feel free to reach out to our support team.
+    Welcome aboard!
+    - College Attendance Team
+    """
+    return subject, message
+
+
+def teacher_rejected_email(name):
+    subject = "Update on Your Teacher Account Registration"
+    message = f"""
+    Dear {name},
+    Thank you for registering on our College Attendance Management System.
+    After reviewing your application, we regret to inform you that your teacher account has not been approved at this time.
+    If you believe this decision was made in error or you would like to provide additional information, please feel free to contact our support team.
+
+    We appreciate your interest in our system.
+
+    Best regards,  
+    - College Attendance Team
+    """
+    return subject, message
@@ -1,14 +1,78 @@
 import smtplib
+import time
 from email.mime.text import MIMEText
-from app.core.config import SMTP_SERVER, SMTP_PORT, SMTP_USER, SMTP_PASSWORD
+from app.core.metrics import smtp_duration
+from app.core.config import SMTP_SERVER, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_USE_TLS, SMTP_TIMEOUT_SECONDS
 
-def send_email(to_email: str, subject: str, message: str):
+
+def build_message(to_email: str, subject: str, message: str):
     msg = MIMEText(message)
     msg["Subject"] = subject
     msg["From"] = SMTP_USER
     msg["To"] = to_email
+    return msg
+
+
+class SmtpConnection:
+    """One authenticated SMTP session reused across many messages."""
+
+    def __init__(self, host=SMTP_SERVER, port=SMTP_PORT, user=SMTP_USER, password=SMTP_PASSWORD,
+                 use_tls=SMTP_USE_TLS, timeout=SMTP_TIMEOUT_SECONDS):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._server = None
+
+    @property
+    def is_open(self):
+        return self._server is not None
+
+    def open(self):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.use_tls:
+                    server.starttls()
+                if self.user and self.password:
+                    server.login(self.user, self.password)
+            except Exception:
+                server.close()
+                raise
+            outcome = "ok"
+        finally:
+            smtp_duration.observe("connect", outcome, value=time.perf_counter() - started)
+        self._server = server
+
+    def send(self, to_email: str, subject: str, message: str):
+        if self._server is None:
+            self.open()
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            self._server.send_message(build_message(to_email, subject, message))
+            outcome = "ok"
+        finally:
+            smtp_duration.observe("send", outcome, value=time.perf_counter() - started)
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            self._server.close()
+        self._server = None
+
+
+def send_email(to_email: str, subject: str, message: str):
+    connection = SmtpConnection()
+    try:
+        connection.send(to_email, subject, message)
+    finally:
+        connection.close()
 
-    with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-        server.starttls()
-        server.login(SMTP_USER, SMTP_PASSWORD)
-        server.send_message(msg)
@@ -0,0 +1,34 @@
+# app/core/geofence.py
+import math
+
+try:
+    import numpy as np
+except ImportError:  # optional (pip install numpy); without it batches use the scalar formula
+    np = None
+
+EARTH_RADIUS_M = 6371000
+RADIUS_M = 100  # how far from the teacher's location a mark is accepted
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dlambda/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return EARTH_RADIUS_M * c
+
+
+def haversine_distances(lat1, lon1, lat2, lon2):
+    """Distances in metres between pairs of points given as four equal-length
+    sequences, computed in one vectorized pass when numpy is available."""
+    if np is None:
+        return [haversine_distance(*point) for point in zip(lat1, lon1, lat2, lon2)]
+    phi1 = np.radians(np.asarray(lat1, dtype=float))
+    phi2 = np.radians(np.asarray(lat2, dtype=float))
+    dphi = phi2 - phi1
+    dlambda = np.radians(np.asarray(lon2, dtype=float) - np.asarray(lon1, dtype=float))
+    a = np.sin(dphi/2)**2 + np.cos(phi1)*np.cos(phi2)*np.sin(dlambda/2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return (EARTH_RADIUS_M * c).tolist()
@@ -0,0 +1,156 @@
+# app/core/live_feed.py
+import asyncio
+import logging
+from app.core import metrics
+from app.core.config import LIVE_FEED_BACKEND, LIVE_FEED_QUEUE_SIZE
+from app.core.profile_cache import profile_cache
+from app.db import attendance_store, database
+
+logger = logging.getLogger(__name__)
+
+subscribers_gauge = metrics.Gauge("live_feed_subscribers", "Open live attendance feeds in this worker")
+published = metrics.Counter("live_feed_events_total", "Marks delivered to the live feed hub by source", ("source",))
+
+
+class Subscription:
+    def __init__(self, session_id, max_queue=LIVE_FEED_QUEUE_SIZE):
+        self.session_id = session_id
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.lagged = False  # set when the queue overflowed; the feed restarts from a snapshot
+
+
+class LiveFeed:
+    """In-process pub/sub of attendance marks keyed by session ID.
+
+    Publishing is a non-blocking put into each subscriber's bounded queue,
+    so a slow client can never hold up markAttendance; one that falls too
+    far behind is flagged and resynchronised from a fresh snapshot.
+    """
+
+    def __init__(self):
+        self._subscribers = {}  # session_id -> set of Subscription
+
+    def subscribe(self, session_id):
+        subscription = Subscription(session_id)
+        self._subscribers.setdefault(session_id, set()).add(subscription)
+        subscribers_gauge.inc()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscribers = self._subscribers.get(subscription.session_id)
+        if subscribers and subscription in subscribers:
+            subscribers.discard(subscription)
+            subscribers_gauge.dec()
+            if not subscribers:
+                del self._subscribers[subscription.session_id]
+
+    def publish(self, session_id, mark):
+        for subscription in self._subscribers.get(session_id, ()):
+            try:
+                subscription.queue.put_nowait(mark)
+            except asyncio.QueueFull:
+                subscription.lagged = True
+
+
+live_feed = LiveFeed()
+
+
+def notify_mark(session_id, roll_no, student_name, marked_at):
+    """Called by markAttendance after the mark is stored.
+
+    With the change-stream backend the relay delivers marks from every
+    worker, including this one, so publishing here would duplicate them.
+    """
+    if LIVE_FEED_BACKEND != "changestream":
+        live_feed.publish(session_id, {"roll_no": roll_no, "student_name": student_name, "marked_at": marked_at})
+        published.inc("local")
+
+
+class ChangeStreamRelay:
+    """Tails the attendance change stream and republishes new marks into this worker's hub.
+
+    Needs a replica set. The resume token is kept across reconnects so a
+    dropped stream does not lose marks.
+    """
+
+    def __init__(self, hub, retry_seconds=2):
+        self.hub = hub
+        self.retry_seconds = retry_seconds
+        self._task = None
+        self._resume_token = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self._tail()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Attendance change stream failed; resuming")
+                await asyncio.sleep(self.retry_seconds)
+
+    async def _tail(self):
+        buckets = attendance_store.LAYOUT == "buckets"
+        collection = database.db["attendance_buckets" if buckets else "attendance"]
+        operations = ["insert", "update"] if buckets else ["insert"]
+        pipeline = [{"$match": {"operationType": {"$in": operations}}}]
+        async with collection.watch(pipeline, resume_after=self._resume_token) as stream:
+            async for change in stream:
+                self._resume_token = stream.resume_token
+                if buckets:
+                    await self._relay_bucket(change)
+                else:
+                    doc = change["fullDocument"]
+                    if doc.get("session_id") is not None:
+                        self._publish(doc["session_id"], doc["roll_no"], doc.get("student_name"), doc["marked_at"])
+
+    async def _relay_bucket(self, change):
+        session_id = change["documentKey"]["_id"]
+        if change["operationType"] == "insert":
+            marks = change["fullDocument"].get("marks", [])
+        else:
+            # "marks.<n>" for a $push; a rewrite of the whole array repeats old marks,
+            # which the feed drops as already seen
+            marks = []
+            for field, value in change["updateDescription"]["updatedFields"].items():
+                if field == "marks":
+                    marks.extend(value)
+                elif field.startswith("marks."):
+                    marks.append(value)
+        for mark in marks:
+            profile = await profile_cache.get("student", mark["r"])
+            self._publish(session_id, mark["r"], profile["full_name"] if profile else None, mark["t"])
+
+    def _publish(self, session_id, roll_no, student_name, marked_at):
+        self.hub.publish(session_id, {"roll_no": roll_no, "student_name": student_name, "marked_at": marked_at})
+        published.inc("changestream")
+
+
+change_stream_relay = None
+
+
+def start_change_stream_relay(**options):
+    global change_stream_relay
+    change_stream_relay = ChangeStreamRelay(live_feed, **options)
+    change_stream_relay.start()
+    return change_stream_relay
+
+
+async def stop_change_stream_relay():
+    global change_stream_relay
+    if change_stream_relay is not None:
+        await change_stream_relay.stop()
+        change_stream_relay = None
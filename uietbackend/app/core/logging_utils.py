@@ -0,0 +1,13 @@
+# app/core/logging_utils.py
+import json
+import logging
+import random
+from app.core.config import LOG_SAMPLE_RATE
+
+
+def log_event(logger, event, sample_rate=LOG_SAMPLE_RATE, level=logging.INFO, **fields):
+    """Log one JSON line for `event`, keeping only a sample_rate fraction of calls."""
+    if sample_rate < 1 and random.random() >= sample_rate:
+        return
+    if logger.isEnabledFor(level):
+        logger.log(level, json.dumps({"event": event, **fields}, default=str))
@@ -0,0 +1,185 @@
+# app/core/metrics.py
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_registry = []
+_collectors = []
+_lock = threading.Lock()  # pymongo events arrive on executor threads
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with _lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def set(self, *label_values, value):
+        """For values counted elsewhere and copied in by a collector."""
+        with _lock:
+            self._values[label_values] = value
+
+    def samples(self):
+        for values, value in self._values.items():
+            yield self.name, self.labels, values, value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [bucket counts..., sum, count]
+        _registry.append(self)
+
+    def observe(self, *label_values, value):
+        with _lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(*label_values, value=time.perf_counter() - started)
+
+    def samples(self):
+        labels = self.labels + ("le",)
+        for values, state in self._values.items():
+            for bound, count in zip(self.buckets, state):
+                yield self.name + "_bucket", labels, values + (repr(float(bound)),), count
+            yield self.name + "_bucket", labels, values + ("+Inf",), state[-1]
+            yield self.name + "_sum", self.labels, values, state[-2]
+            yield self.name + "_count", self.labels, values, state[-1]
+
+
+def add_collector(fn):
+    """Register a callable run just before rendering, to refresh gauges."""
+    _collectors.append(fn)
+    return fn
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    for collect in _collectors:
+        collect()
+    lines = []
+    with _lock:
+        for metric in _registry:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, label_names, label_values, value in metric.samples():
+                lines.append(f"{name}{_format_labels(label_names, label_values)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# HTTP
+http_requests = Counter("http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+http_request_duration = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+# not labelled by route: the route is only matched after the request is counted in
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being handled")
+request_db_time = Histogram("http_request_db_seconds", "Time spent in MongoDB commands per request", ("route",))
+request_round_trips = Histogram(
+    "http_request_db_round_trips", "MongoDB commands per request", ("route",),
+    buckets=(0, 1, 2, 3, 4, 5, 8, 13, 21, 50),
+)
+
+# MongoDB
+mongo_commands = Counter("mongo_commands_total", "MongoDB commands sent", ("command", "outcome", "profile"))
+mongo_command_duration = Histogram("mongo_command_duration_seconds", "MongoDB command latency", ("command", "profile"))
+
+# SMTP
+smtp_duration = Histogram("smtp_operation_duration_seconds", "SMTP connect and send latency", ("operation", "outcome"))
+
+# code paths inside handlers
+stage_duration = Histogram("app_stage_duration_seconds", "Time spent in selected in-process stages", ("stage",))
+threadpool_busy = Gauge("anyio_threadpool_busy_threads", "Threads borrowed from the AnyIO default thread pool")
+
+
+class RequestStats:
+    __slots__ = ("round_trips", "db_seconds")
+
+    def __init__(self):
+        self.round_trips = 0
+        self.db_seconds = 0.0
+
+
+# Motor copies the context into its executor threads, so command events can
+# be attributed to the request that issued them.
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+class CommandMetrics(monitoring.CommandListener):
+    def __init__(self, profile="default"):
+        self.profile = profile  # the database access profile whose client this listens on
+        self._pending = {}
+
+    def started(self, event):
+        self._pending[(event.connection_id, event.request_id)] = current_request.get()
+
+    def _finish(self, event, outcome):
+        stats = self._pending.pop((event.connection_id, event.request_id), None)
+        seconds = event.duration_micros / 1e6
+        mongo_commands.inc(event.command_name, outcome, self.profile)
+        mongo_command_duration.observe(event.command_name, self.profile, value=seconds)
+        if stats is not None:
+            stats.round_trips += 1
+            stats.db_seconds += seconds
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+
+command_metrics = CommandMetrics()
+
+
+@add_collector
+def _collect_threadpool():
+    try:
+        from anyio.to_thread import current_default_thread_limiter
+        threadpool_busy.set(value=current_default_thread_limiter().borrowed_tokens)
+    except RuntimeError:  # no running event loop
+        pass
@@ -0,0 +1,163 @@
+# app/core/offline_marks.py
+import logging
+from datetime import datetime, timedelta
+import pytz
+from app.core.config import OFFLINE_MARK_MAX_AGE_HOURS, OFFLINE_MARK_CLOCK_SKEW_SECONDS
+from app.core.geofence import haversine_distances, RADIUS_M
+from app.core.live_feed import notify_mark
+from app.core.logging_utils import log_event
+from app.core.metrics import stage_duration
+from app.core.otp_sessions import with_archive
+from app.core.subject_catalog import subject_catalog
+from app.core.summaries import record_marks
+from app.db import attendance_store
+from app.db.database import approved_students, otps
+
+logger = logging.getLogger(__name__)
+
+# Marks queued while offline, submitted later in one request: by the student's
+# own device, or by a teacher's device that collected them for the whole room.
+# Each mark is checked the way markAttendance checks a live one, but as of the
+# time it was taken (its marked_at) rather than the time it arrives: the OTP
+# must name a session open at that moment. Sessions, students and existing
+# marks are read with one query each for the whole batch, the geofence is one
+# vectorized pass, and the accepted marks are stored with one bulk insert.
+
+DEVICE_WINDOW = timedelta(minutes=50)  # one mark per student and device, as in markAttendance
+
+
+def _as_utc(value):
+    if value.tzinfo is None:
+        return value.replace(tzinfo=pytz.utc)
+    return value.astimezone(pytz.utc)
+
+
+def _session_at(sessions, marked_at):
+    """The session among those holding one code that was open at marked_at.
+
+    This is what bounds backdating: a queued mark is only accepted for a
+    session with start_time <= marked_at <= end_time, so a client can place
+    a mark anywhere inside the session's own window but never before it
+    opened or after it closed (OFFLINE_MARK_MAX_AGE_HOURS only limits how
+    long a mark may sit in the queue).
+    """
+    open_then = [s for s in sessions if _as_utc(s["start_time"]) <= marked_at <= _as_utc(s["end_time"])]
+    return max(open_then, key=lambda s: _as_utc(s["start_time"])) if open_then else None
+
+
+async def submit_marks(marks, collector=None):
+    """Check and store a batch of queued marks; returns one result per mark, in order.
+
+    `marks` are dicts of roll_no, otp, subject, visitor_id, lat, lng and
+    marked_at (aware UTC). With `collector` (a teacher's employee ID) every
+    session must be that teacher's, and the same-device check is skipped
+    since one device submits for the whole room.
+    """
+    now = datetime.now(pytz.utc)
+    oldest = now - timedelta(hours=OFFLINE_MARK_MAX_AGE_HOURS)
+    newest = now + timedelta(seconds=OFFLINE_MARK_CLOCK_SKEW_SECONDS)
+    results = [{"index": i, "roll_no": m["roll_no"]} for i, m in enumerate(marks)]
+    pending = []
+    for i, mark in enumerate(marks):
+        if not oldest <= mark["marked_at"] <= newest:
+            results[i]["status"] = "invalid_timestamp"
+        elif not subject_catalog.canonical(mark["subject"]):
+            results[i]["status"] = "invalid_subject"
+        else:
+            pending.append(i)
+
+    if pending:
+        times = [marks[i]["marked_at"] for i in pending]
+        roll_nos = sorted({marks[i]["roll_no"] for i in pending})
+        students = {}
+        async for doc in approved_students.find({"roll_no": {"$in": roll_nos}}, {"_id": 0, "roll_no": 1, "full_name": 1}):
+            students[doc["roll_no"]] = doc["full_name"]
+        sessions = {}
+        async for doc in otps.aggregate(with_archive(
+            {"otp": {"$in": sorted({marks[i]["otp"] for i in pending})},
+             "start_time": {"$lte": max(times)}, "end_time": {"$gte": min(times)}},
+            {"$project": {"otp": 1, "subject": 1, "teacher_id": 1, "department": 1, "semester": 1,
+                          "section": 1, "start_time": 1, "end_time": 1, "location": 1}},
+        )):
+            sessions.setdefault(doc["otp"], []).append(doc)
+        existing = await attendance_store.marks_between(
+            roll_nos, min(times) - DEVICE_WINDOW, max(times) + DEVICE_WINDOW).to_list(length=None)
+    else:
+        students = sessions = {}
+        existing = []
+
+    marked = {(m.get("session_id"), m["roll_no"]) for m in existing}
+    located = []  # (index, session) of marks that only need the geofence
+    for i in pending:
+        mark = marks[i]
+        session = _session_at(sessions.get(mark["otp"], []), mark["marked_at"])
+        if mark["roll_no"] not in students:
+            status = "student_not_found"
+        elif session is None:
+            status = "invalid_otp"
+        elif collector is not None and session["teacher_id"] != collector:
+            status = "not_your_session"
+        elif session["subject"].strip().lower() != mark["subject"]:
+            status = "subject_mismatch"
+        elif (session["_id"], mark["roll_no"]) in marked:
+            status = "already_marked"
+        elif mark["lat"] is None or mark["lng"] is None:
+            status = "location_required"
+        elif not session.get("location") or "lat" not in session["location"] or "lng" not in session["location"]:
+            status = "location_unavailable"
+        else:
+            results[i]["session_id"] = str(session["_id"])
+            located.append((i, session))
+            continue
+        results[i]["status"] = status
+
+    with stage_duration.time("haversine_batch"):
+        distances = haversine_distances(
+            [marks[i]["lat"] for i, _ in located], [marks[i]["lng"] for i, _ in located],
+            [s["location"]["lat"] for _, s in located], [s["location"]["lng"] for _, s in located],
+        )
+
+    # oldest first, so of two marks for one session (or too close together
+    # from one device) the first one that passes the geofence wins
+    accepted = []
+    in_batch = set()
+    device_marks = {}
+    for m in existing:
+        device_marks.setdefault((m["roll_no"], m.get("visitor_id")), []).append((m.get("session_id"), _as_utc(m["marked_at"])))
+    for (i, session), distance in sorted(zip(located, distances), key=lambda item: marks[item[0][0]]["marked_at"]):
+        mark = marks[i]
+        results[i]["distance_m"] = round(distance, 1)
+        if distance > RADIUS_M:
+            results[i]["status"] = "too_far"
+            continue
+        if (session["_id"], mark["roll_no"]) in in_batch:
+            results[i]["status"] = "duplicate_in_batch"
+            continue
+        if collector is None:
+            device = device_marks.setdefault((mark["roll_no"], mark["visitor_id"]), [])
+            if any(sid != session["_id"] and abs(t - mark["marked_at"]) < DEVICE_WINDOW for sid, t in device):
+                results[i]["status"] = "recent_device"
+                continue
+            device.append((session["_id"], mark["marked_at"]))
+        in_batch.add((session["_id"], mark["roll_no"]))
+        accepted.append((i, session))
+
+    stored = await attendance_store.insert_marks([
+        (session, marks[i]["roll_no"], students[marks[i]["roll_no"]], marks[i]["subject"], marks[i]["visitor_id"],
+         marks[i]["marked_at"], marks[i]["lat"], marks[i]["lng"])
+        for i, session in accepted
+    ])
+    new = []
+    for (i, session), ok in zip(accepted, stored):
+        results[i]["status"] = "marked" if ok else "already_marked"
+        if ok:
+            new.append((i, session))
+    await record_marks([(marks[i]["roll_no"], marks[i]["subject"], session, marks[i]["marked_at"]) for i, session in new])
+    for i, session in new:
+        notify_mark(session["_id"], marks[i]["roll_no"], students[marks[i]["roll_no"]], marks[i]["marked_at"])
+
+    counts = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    log_event(logger, "offline_batch", collector=collector, marks=len(marks), **counts)
+    return {"counts": counts, "results": results}
@@ -0,0 +1,113 @@
+# app/core/otp_cache.py
+import asyncio
+import time
+from datetime import datetime
+import pytz
+from app.core.config import OTP_CACHE_NEGATIVE_TTL_SECONDS, OTP_CACHE_MAX_ENTRIES
+from app.db.database import otps
+
+
+def _as_utc(value):
+    if value.tzinfo is None:
+        return value.replace(tzinfo=pytz.utc)
+    return value
+
+
+class OtpCache:
+    """Read-through cache of OTP sessions keyed by code.
+
+    Active sessions are kept until their end_time. Unknown or expired codes
+    are cached as misses for a few seconds only, so a flood of guessed codes
+    costs one query per code per window instead of one per request.
+
+    Each worker keeps its own copy. That stays correct with several workers
+    because OTP documents are never modified after insert, so a cached active
+    session can only go stale by expiring, which the entry does on its own.
+    The one cross-worker gap is a code cached as unknown just before another
+    worker generated it; the short negative TTL bounds that window.
+    """
+
+    def __init__(self, negative_ttl=OTP_CACHE_NEGATIVE_TTL_SECONDS, max_entries=OTP_CACHE_MAX_ENTRIES):
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries = {}  # otp -> (doc or None, monotonic expiry)
+        self._inflight = {}
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def _store(self, otp, doc):
+        now = time.monotonic()
+        remaining = 0
+        if doc is not None:
+            now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
+            remaining = (_as_utc(doc["end_time"]) - now_utc).total_seconds()
+        if remaining > 0:
+            expires_at = now + remaining
+        else:
+            expires_at = now + self.negative_ttl
+        if len(self._entries) >= self.max_entries:
+            self._evict(now)
+        self._entries[otp] = (doc, expires_at)
+
+    def _evict(self, now):
+        for otp, (_, expires_at) in list(self._entries.items()):
+            if expires_at <= now:
+                del self._entries[otp]
+        while len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def put(self, doc):
+        """Cache a session as soon as it is created."""
+        self._store(doc["otp"], doc)
+
+    async def get(self, otp):
+        entry = self._entries.get(otp)
+        if entry is not None:
+            doc, expires_at = entry
+            if expires_at > time.monotonic():
+                if doc is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                return doc
+            del self._entries[otp]
+
+        self.misses += 1
+        # concurrent misses for the same code share one query
+        pending = self._inflight.get(otp)
+        if pending is None:
+            pending = asyncio.ensure_future(self._load(otp))
+            self._inflight[otp] = pending
+        return await asyncio.shield(pending)
+
+    async def _load(self, otp):
+        try:
+            doc = await otps.find_one({"otp": otp}, sort=[("end_time", -1)])
+            self._store(otp, doc)
+            return doc
+        finally:
+            del self._inflight[otp]
+
+    async def warm(self):
+        """Load every currently active session; returns how many were cached."""
+        now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
+        count = 0
+        async for doc in otps.find({"end_time": {"$gt": now_utc}}).limit(self.max_entries):
+            self._store(doc["otp"], doc)
+            count += 1
+        return count
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+        }
+
+    def clear(self):
+        self._entries.clear()
+
+
+otp_cache = OtpCache()
@@ -0,0 +1,169 @@
+# app/core/otp_sessions.py
+import asyncio
+import logging
+from datetime import datetime, timedelta
+import pytz
+from pymongo import UpdateMany
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.core.config import (
+    OTP_RESERVE_ATTEMPTS, OTP_ARCHIVE_AFTER_HOURS, OTP_ARCHIVE_INTERVAL_SECONDS, OTP_ARCHIVE_BATCH_SIZE
+)
+from app.db.database import otps, otps_archive, active_otp_codes, attendance
+from app.db.versions import bump, get_version
+from app.utils.otp_utils import generate_otp
+
+logger = logging.getLogger(__name__)
+
+
+async def reserve_code(session_id, end_time, attempts=OTP_RESERVE_ATTEMPTS):
+    """Pick a code no other active session holds.
+
+    active_otp_codes is keyed by the code itself, so the unique _id makes the
+    reservation atomic across workers. Rows expire through a TTL index on
+    expires_at; the TTL monitor only runs about once a minute, so a lapsed
+    reservation that is still present may be taken over.
+    """
+    now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
+    for _ in range(attempts):
+        code = generate_otp()
+        reservation = {"_id": code, "session_id": session_id, "expires_at": end_time}
+        try:
+            await active_otp_codes.insert_one(reservation)
+            return code
+        except DuplicateKeyError:
+            taken = await active_otp_codes.find_one_and_replace(
+                {"_id": code, "expires_at": {"$lte": now_utc}}, reservation
+            )
+            if taken is not None:
+                return code
+    return None
+
+
+def with_archive(match, *stages):
+    """Pipeline prefix reading sessions from both otps and otps_archive.
+
+    `stages` (e.g. a sort and limit) run on each side before the union, so
+    both sides can use their indexes; repeat them after the union if the
+    combined result needs them too.
+    """
+    side = [{"$match": match}, *stages]
+    return side + [{"$unionWith": {"coll": "otps_archive", "pipeline": side}}]
+
+
+async def backfill_session_ids(batch_size=500):
+    """Stamp session_id on attendance records written before sessions had IDs.
+
+    A record belongs to the session with the same code whose validity window
+    contains its marked_at time. Only records without a session_id are
+    touched, so it is safe to re-run. Returns the number of records updated.
+    """
+    updated = 0
+    ops = []
+    async for session in otps.aggregate(with_archive({}, {"$project": {"otp": 1, "start_time": 1, "end_time": 1}})):
+        ops.append(UpdateMany(
+            {
+                "otp": session["otp"],
+                "session_id": {"$exists": False},
+                "marked_at": {"$gte": session["start_time"], "$lte": session["end_time"]},
+            },
+            {"$set": {"session_id": session["_id"]}},
+        ))
+        if len(ops) >= batch_size:
+            updated += (await attendance.bulk_write(ops, ordered=False)).modified_count
+            ops = []
+    if ops:
+        updated += (await attendance.bulk_write(ops, ordered=False)).modified_count
+    return updated
+
+
+async def backfill_session_ids_once():
+    """backfill_session_ids on the first start after upgrading, then never again.
+
+    Teacher views find marks by session_id only, so records from before
+    session IDs stay invisible until this has run. Completion is recorded as
+    a version bump of "attendance_session_ids".
+    """
+    if await get_version("attendance_session_ids"):
+        return
+    try:
+        updated = await backfill_session_ids()
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("Session ID backfill failed; run scripts.backfill_session_ids")
+        return
+    await bump("attendance_session_ids")
+    logger.info("Stamped session_id on %d older attendance records", updated)
+
+
+class OtpArchiver:
+    """Periodically moves long-expired sessions from otps to otps_archive.
+
+    Copy-then-delete is idempotent: a run interrupted between the two steps
+    leaves documents in both collections, and the next run skips the
+    duplicate inserts and finishes the delete.
+    """
+
+    def __init__(self, archive_after_hours=OTP_ARCHIVE_AFTER_HOURS,
+                 interval_seconds=OTP_ARCHIVE_INTERVAL_SECONDS, batch_size=OTP_ARCHIVE_BATCH_SIZE):
+        self.archive_after = timedelta(hours=archive_after_hours)
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                moved = await self.archive_once()
+                if moved:
+                    logger.info("Archived %d expired OTP sessions", moved)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("OTP archive pass failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def archive_once(self):
+        cutoff = datetime.utcnow().replace(tzinfo=pytz.utc) - self.archive_after
+        moved = 0
+        while True:
+            docs = await otps.find({"end_time": {"$lt": cutoff}}).sort("end_time", 1).limit(self.batch_size).to_list(length=None)
+            if not docs:
+                return moved
+            try:
+                await otps_archive.insert_many(docs, ordered=False)
+            except BulkWriteError as exc:
+                if any(error["code"] != 11000 for error in exc.details["writeErrors"]):
+                    raise
+            await otps.delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+            moved += len(docs)
+
+
+otp_archiver = None
+
+
+def start_otp_archiver(**options):
+    global otp_archiver
+    otp_archiver = OtpArchiver(**options)
+    otp_archiver.start()
+    return otp_archiver
+
+
+async def stop_otp_archiver():
+    global otp_archiver
+    if otp_archiver is not None:
+        await otp_archiver.stop()
+        otp_archiver = None
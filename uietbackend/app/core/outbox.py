@@ -0,0 +1,254 @@
+# app/core/outbox.py
+import asyncio
+import logging
+import smtplib
+from datetime import datetime, timedelta
+import pytz
+from bson import ObjectId
+from app.core.config import (
+    OUTBOX_BATCH_SIZE, OUTBOX_POLL_SECONDS, OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_BACKOFF_SECONDS, OUTBOX_LEASE_SECONDS, OUTBOX_IDLE_CLOSE_SECONDS
+)
+from app.core.email_utils import SmtpConnection
+from app.db.database import email_outbox
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxWorker:
+    """Drains the email_outbox collection in the background.
+
+    Messages are claimed in batches with a lease, so several workers can run
+    side by side and a crashed worker's claims are picked up again once the
+    lease runs out; the lease is renewed while a batch is being sent, however
+    long that takes. A batch is sent over one SMTP connection, which is kept
+    open between batches and closed after a quiet period. Failed messages are
+    retried with exponential backoff until OUTBOX_MAX_ATTEMPTS, except ones the
+    server rejected outright (5xx on the recipient or the message), which fail
+    at once.
+    """
+
+    def __init__(self, connection_factory=SmtpConnection, batch_size=OUTBOX_BATCH_SIZE,
+                 poll_seconds=OUTBOX_POLL_SECONDS, max_attempts=OUTBOX_MAX_ATTEMPTS,
+                 backoff_seconds=OUTBOX_BACKOFF_SECONDS, lease_seconds=OUTBOX_LEASE_SECONDS,
+                 idle_close_seconds=OUTBOX_IDLE_CLOSE_SECONDS):
+        self.connection = connection_factory()
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.idle_close_seconds = idle_close_seconds
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._idle_since = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.connection.close)
+
+    def wake(self):
+        """Skip the poll delay, e.g. right after queueing a message."""
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                sent = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email outbox pass failed")
+                sent = 0
+            if sent:
+                continue
+            await self._close_if_idle()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _claim_batch(self):
+        """Lease up to batch_size due messages in three round trips, whatever the batch size.
+
+        Candidates are read first and then claimed with one update_many that
+        re-checks they are still due and tags them with a fresh lease ID, so a
+        message another worker claimed in between is not taken twice.
+        """
+        now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
+        due = {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now_utc}},
+            {"status": "sending", "locked_until": {"$lt": now_utc}},
+        ]}
+        candidates = await email_outbox.find(due, {"_id": 1}).sort("next_attempt_at", 1).limit(self.batch_size).to_list(length=None)
+        if not candidates:
+            return None, []
+        ids = [doc["_id"] for doc in candidates]
+        lease_id = ObjectId()
+        await email_outbox.update_many(
+            {"$and": [{"_id": {"$in": ids}}, due]},
+            {"$set": {"status": "sending", "lease_id": lease_id,
+                      "locked_until": now_utc + timedelta(seconds=self.lease_seconds)}},
+        )
+        batch = await email_outbox.find({"_id": {"$in": ids}, "lease_id": lease_id}).sort("next_attempt_at", 1).to_list(length=None)
+        return lease_id, batch
+
+    async def _renew_lease(self, lease_id, ids):
+        """Keep extending a batch's lease while it is sent; cancelled once the batch is done."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            locked_until = datetime.utcnow().replace(tzinfo=pytz.utc) + timedelta(seconds=self.lease_seconds)
+            try:
+                await email_outbox.update_many({"_id": {"$in": ids}, "lease_id": lease_id, "status": "sending"},
+                                               {"$set": {"locked_until": locked_until}})
+            except Exception:
+                logger.exception("Could not renew the email outbox lease")
+
+    def _send_batch(self, batch):
+        """Runs in a worker thread; returns {_id: (error or None, permanent)}."""
+        results = {}
+        for doc in batch:
+            try:
+                self._send_one(doc)
+                results[doc["_id"]] = (None, False)
+            except (smtplib.SMTPException, OSError) as exc:
+                results[doc["_id"]] = (repr(exc), _rejected(exc))
+        return results
+
+    def _send_one(self, doc):
+        try:
+            self.connection.send(doc["to"], doc["subject"], doc["message"])
+        except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+            # the connection is gone (e.g. the server dropped it while idle);
+            # reconnect once. Any other SMTP error came over a working
+            # connection and is about this message.
+            self.connection.close()
+            self.connection.send(doc["to"], doc["subject"], doc["message"])
+
+    async def drain_once(self):
+        """Send one batch; returns the number of messages delivered."""
+        lease_id, batch = await self._claim_batch()
+        if not batch:
+            return 0
+        self._idle_since = None
+        renewal = asyncio.create_task(self._renew_lease(lease_id, [doc["_id"] for doc in batch]))
+        try:
+            results = await asyncio.to_thread(self._send_batch, batch)
+        finally:
+            renewal.cancel()
+
+        now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
+        sent = 0
+        for doc in batch:
+            error, rejected = results[doc["_id"]]
+            if error is None:
+                sent += 1
+                update = {"$set": {"status": "sent", "sent_at": now_utc}}
+            else:
+                attempts = doc.get("attempts", 0) + 1
+                if rejected:
+                    status = "failed"
+                    logger.error("Email to %s was rejected: %s", doc["to"], error)
+                elif attempts >= self.max_attempts:
+                    status = "failed"
+                    logger.error("Giving up on email to %s after %d attempts: %s", doc["to"], attempts, error)
+                else:
+                    status = "pending"
+                delay = self.backoff_seconds * 2 ** (attempts - 1)
+                update = {
+                    "$set": {
+                        "status": status,
+                        "attempts": attempts,
+                        "last_error": error,
+                        "next_attempt_at": now_utc + timedelta(seconds=delay),
+                    },
+                }
+            update["$unset"] = {"locked_until": "", "lease_id": ""}
+            await email_outbox.update_one({"_id": doc["_id"]}, update)
+        return sent
+
+    async def _close_if_idle(self):
+        if not self.connection.is_open:
+            return
+        loop = asyncio.get_running_loop()
+        if self._idle_since is None:
+            self._idle_since = loop.time()
+        elif loop.time() - self._idle_since >= self.idle_close_seconds:
+            await asyncio.to_thread(self.connection.close)
+            self._idle_since = None
+
+
+def _rejected(exc):
+    """True for a permanent (5xx) refusal of the message itself, which retrying will not change.
+
+    Authentication and sender errors are 5xx too, but they are about our
+    account, so those messages are retried like any other failure.
+    """
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        # 4xx refusals (mailbox busy, greylisting) are worth retrying
+        return all(code >= 500 for code, _ in exc.recipients.values())
+    return isinstance(exc, smtplib.SMTPDataError) and exc.smtp_code >= 500
+
+
+def _outbox_doc(to_email, subject, message, now_utc):
+    return {
+        "to": to_email,
+        "subject": subject,
+        "message": message,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now_utc,
+        "created_at": now_utc,
+    }
+
+
+async def queue_email(to_email: str, subject: str, message: str, session=None):
+    """Store a message in the outbox; the outbox worker delivers it."""
+    now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
+    await email_outbox.insert_one(_outbox_doc(to_email, subject, message, now_utc), session=session)
+    wake_outbox_worker()
+
+
+async def queue_emails(messages, session=None):
+    """Queue many (to_email, subject, message) tuples with one insert."""
+    if not messages:
+        return
+    now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
+    await email_outbox.insert_many(
+        [_outbox_doc(to_email, subject, message, now_utc) for to_email, subject, message in messages],
+        session=session,
+    )
+    wake_outbox_worker()
+
+
+outbox_worker = None
+
+
+def start_outbox_worker(**options):
+    global outbox_worker
+    outbox_worker = OutboxWorker(**options)
+    outbox_worker.start()
+    return outbox_worker
+
+
+async def stop_outbox_worker():
+    global outbox_worker
+    if outbox_worker is not None:
+        await outbox_worker.stop()
+        outbox_worker = None
+
+
+def wake_outbox_worker():
+    if outbox_worker is not None:
+        outbox_worker.wake()
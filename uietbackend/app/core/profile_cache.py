@@ -0,0 +1,53 @@
+# app/core/profile_cache.py
+import time
+from collections import OrderedDict
+from app.core.config import PROFILE_CACHE_MAX_ENTRIES, PROFILE_CACHE_TTL_SECONDS
+from app.db.database import approved_students, approved_teachers
+
+PROFILE_FIELDS = {
+    "student": (approved_students, "roll_no", {"_id": 0, "full_name": 1, "email": 1, "department": 1,
+                                               "semester": 1, "section": 1, "roll_no": 1}),
+    "teacher": (approved_teachers, "employee_id", {"_id": 0, "full_name": 1, "email": 1, "employee_id": 1}),
+}
+
+
+class ProfileCache:
+    """LRU cache of approved student and teacher profiles.
+
+    Only found profiles are cached, so someone approved on another worker is
+    visible at once. Entries expire after ttl seconds, which bounds how long
+    an edit made elsewhere can go unseen; approve/reject on this worker
+    invalidates immediately.
+    """
+
+    def __init__(self, max_entries=PROFILE_CACHE_MAX_ENTRIES, ttl=PROFILE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (kind, id) -> (profile, monotonic expiry)
+
+    async def get(self, kind, key):
+        entry = self._entries.get((kind, key))
+        if entry is not None:
+            profile, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end((kind, key))
+                return profile
+            del self._entries[(kind, key)]
+
+        collection, field, projection = PROFILE_FIELDS[kind]
+        profile = await collection.find_one({field: key}, projection)
+        if profile is not None:
+            self._entries[(kind, key)] = (profile, time.monotonic() + self.ttl)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return profile
+
+    def invalidate(self, kind, *keys):
+        for key in keys:
+            self._entries.pop((kind, key), None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+profile_cache = ProfileCache()
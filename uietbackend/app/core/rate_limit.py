@@ -0,0 +1,158 @@
+# app/core/rate_limit.py
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from app.core import metrics
+from app.core.config import (
+    RATE_LIMIT_ENABLED, RATE_LIMIT_BACKEND, RATE_LIMIT_MAX_KEYS, RATE_LIMIT_TRUST_FORWARDED,
+    RATE_LIMIT_IP_PER_MINUTE, RATE_LIMIT_IP_BURST,
+    RATE_LIMIT_VISITOR_PER_MINUTE, RATE_LIMIT_VISITOR_BURST,
+    RATE_LIMIT_ROLL_NO_PER_MINUTE, RATE_LIMIT_ROLL_NO_BURST,
+    ADMISSION_MAX_CONCURRENT, ADMISSION_QUEUE_SECONDS,
+)
+from app.db.database import rate_limits
+
+rate_limited = metrics.Counter("rate_limited_total", "Requests rejected with 429 by limiter rule", ("rule",))
+admission_rejected = metrics.Counter("admission_rejected_total", "Requests shed with 503 by the concurrency cap")
+admission_in_flight = metrics.Gauge("admission_in_flight", "Requests holding an admission slot")
+
+
+class LocalBackend:
+    """Token buckets in this worker's memory.
+
+    Keys are evicted least recently used past max_keys; an evicted key simply
+    starts again with a full bucket.
+    """
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, monotonic time of last update)
+
+    async def take(self, key, rate, burst):
+        """Take one token; returns 0 if allowed, else seconds until one is available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class MongoBackend:
+    """Token buckets in the rate_limits collection, shared by every worker.
+
+    Each take is one find_one_and_update with an update pipeline, using the
+    server clock so workers do not need synchronised clocks. Idle buckets
+    expire through the TTL index once they would have refilled anyway.
+    """
+
+    async def take(self, key, rate, burst):
+        refill = timedelta(seconds=burst / rate)
+        elapsed_s = {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updated", "$$NOW"]}]}, 1000]}
+        doc = await rate_limits.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {
+                    "tokens": {"$min": [burst, {"$add": [{"$ifNull": ["$tokens", burst]}, {"$multiply": [elapsed_s, rate]}]}]},
+                    "updated": "$$NOW",
+                }},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {
+                    "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expires_at": {"$add": ["$$NOW", int(refill.total_seconds() * 1000)]},
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return 0.0 if doc["allowed"] else (1 - doc["tokens"]) / rate
+
+
+class RateLimiter:
+    """Per-key token buckets checked before a handler touches the database."""
+
+    def __init__(self, backend, rules, enabled=RATE_LIMIT_ENABLED):
+        self.backend = backend
+        self.rules = rules  # rule name -> (tokens per second, burst)
+        self.enabled = enabled
+
+    async def check(self, **keys):
+        """Raise 429 if any of the given rule=key pairs is over its limit."""
+        if not self.enabled:
+            return
+        retry_after = 0.0
+        limited_by = None
+        for rule, key in keys.items():
+            if not key:
+                continue
+            rate, burst = self.rules[rule]
+            wait = await self.backend.take(f"{rule}:{key}", rate, burst)
+            if wait > retry_after:
+                retry_after, limited_by = wait, rule
+        if limited_by:
+            rate_limited.inc(limited_by)
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, please slow down",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+
+def client_ip(request):
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+
+class AdmissionControl:
+    """Caps concurrently handled requests in this worker.
+
+    Requests over the cap wait up to queue_seconds for a slot and are then
+    shed with 503 and Retry-After, so an overload turns into fast rejections
+    instead of every request timing out behind a saturated connection pool.
+    """
+
+    def __init__(self, max_concurrent=ADMISSION_MAX_CONCURRENT, queue_seconds=ADMISSION_QUEUE_SECONDS):
+        self.queue_seconds = queue_seconds
+        self._slots = asyncio.Semaphore(max_concurrent)
+
+    async def __call__(self):
+        """FastAPI dependency holding a slot for the duration of the request."""
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_seconds)
+        except asyncio.TimeoutError:
+            admission_rejected.inc()
+            raise HTTPException(
+                status_code=503,
+                detail="Server busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        admission_in_flight.inc()
+        try:
+            yield
+        finally:
+            admission_in_flight.dec()
+            self._slots.release()
+
+
+rate_limiter = RateLimiter(
+    MongoBackend() if RATE_LIMIT_BACKEND == "mongo" else LocalBackend(),
+    {
+        "ip": (RATE_LIMIT_IP_PER_MINUTE / 60, RATE_LIMIT_IP_BURST),
+        "visitor": (RATE_LIMIT_VISITOR_PER_MINUTE / 60, RATE_LIMIT_VISITOR_BURST),
+        "roll_no": (RATE_LIMIT_ROLL_NO_PER_MINUTE / 60, RATE_LIMIT_ROLL_NO_BURST),
+    },
+)
+admission = AdmissionControl()
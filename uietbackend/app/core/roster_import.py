@@ -0,0 +1,87 @@
+# app/core/roster_import.py
+import codecs
+import csv
+from datetime import date, datetime
+from pydantic import ValidationError
+
+try:
+    import openpyxl
+except ImportError:  # optional (pip install openpyxl); without it only CSV rosters are accepted
+    openpyxl = None
+
+# Roster files have a header row naming the registration fields (case and
+# spacing are ignored, so "Roll No" works for roll_no). Rows are read lazily,
+# so a large upload is never held in memory as a whole.
+
+
+def formats():
+    return ["csv", "xlsx"] if openpyxl is not None else ["csv"]
+
+
+def roster_format(filename):
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    return extension if extension in ("csv", "xlsx") else None
+
+
+def _header(name):
+    return "_".join(str(name or "").strip().lower().split())
+
+
+def _cell(value):
+    """Spreadsheet cell as the string the registration form would have sent."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # phone and roll numbers typed into a numeric cell
+    value = str(value).strip()
+    return value or None
+
+
+def _csv_rows(file):
+    reader = csv.reader(codecs.iterdecode(file, "utf-8-sig"))
+    header = [_header(h) for h in next(reader, [])]
+    for line in reader:
+        yield dict(zip(header, line))
+
+
+def _xlsx_rows(file):
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [_header(h) for h in next(rows, ())]
+        for values in rows:
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def read_rows(file, fmt):
+    """(row number, {field: value}) for each non-empty data row; row 1 is the header."""
+    rows = _xlsx_rows(file) if fmt == "xlsx" else _csv_rows(file)
+    for number, row in enumerate(rows, start=2):
+        row = {field: _cell(value) for field, value in row.items() if field}
+        row = {field: value for field, value in row.items() if value is not None}
+        if row:
+            yield number, row
+
+
+def validate(model, rows):
+    """Split a batch of rows into (documents ready to store, rejected rows)."""
+    docs, errors = [], []
+    for number, row in rows:
+        try:
+            doc = model.model_validate(row).model_dump()
+        except ValidationError as exc:
+            errors.append({
+                "row": number,
+                "status": "invalid",
+                "errors": [{"field": ".".join(str(p) for p in e["loc"]), "message": e["msg"]} for e in exc.errors()],
+            })
+            continue
+        doc["dob"] = doc["dob"].isoformat()  # stored as 'YYYY-MM-DD', as by /register
+        docs.append((number, doc))
+    return docs, errors
@@ -0,0 +1,116 @@
+# app/core/session_tokens.py
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, Query
+from app.core.config import AUTH_SECRET, AUTH_TOKEN_TTL_SECONDS, AUTH_REQUIRE_TOKEN
+from app.core.profile_cache import profile_cache, PROFILE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Tokens are "<payload>.<signature>", both base64url: the payload is the JSON
+# claims and the signature an HMAC-SHA256 of the encoded payload. Handlers
+# trust the claims once the signature and expiry check out, so a logged-in
+# request needs no database lookup to know who is calling.
+
+if AUTH_SECRET:
+    _key = AUTH_SECRET.encode()
+else:
+    # only scripts get here: validate_config refuses to serve HTTP without AUTH_SECRET
+    _key = secrets.token_bytes(32)
+    logger.warning("AUTH_SECRET is not set; tokens are signed with a per-process key and only valid in this process")
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload):
+    return _b64encode(hmac.new(_key, payload.encode(), hashlib.sha256).digest())
+
+
+def issue_token(role, subject, name, **claims):
+    now = int(time.time())
+    body = {"role": role, "sub": subject, "name": name, "iat": now, "exp": now + AUTH_TOKEN_TTL_SECONDS, **claims}
+    payload = _b64encode(json.dumps(body, separators=(",", ":"), sort_keys=True).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_token(token):
+    """Claims of a valid, unexpired token, else None."""
+    payload, _, signature = token.partition(".")
+    if not signature or not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if claims.get("exp", 0) < time.time():
+        return None
+    return claims
+
+
+async def session_claims(authorization: Optional[str] = Header(None),
+                         access_token: Optional[str] = Query(None, include_in_schema=False)):
+    """Dependency: the caller's token claims, or None when there is no usable token.
+
+    The token comes from the Authorization header, or from ?access_token= for
+    clients that cannot set headers (EventSource). With AUTH_REQUIRE_TOKEN a
+    missing or invalid token is a 401. Otherwise it is ignored and handlers
+    fall back to looking the caller up.
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        token = access_token
+    claims = verify_token(token.strip()) if token else None
+    if claims is None and AUTH_REQUIRE_TOKEN:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or expired token" if token else "Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return claims
+
+
+def check_caller(claims, kind, key):
+    """True if the token belongs to student/teacher `key`, False if there is no usable token.
+
+    A token for someone else is a 403; no token is a 401 with AUTH_REQUIRE_TOKEN.
+    """
+    if claims is not None and claims.get("role") == kind:
+        if claims["sub"] != key:
+            raise HTTPException(status_code=403, detail="Token does not match this account")
+        return True
+    if AUTH_REQUIRE_TOKEN:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return False
+
+
+async def require_admin(claims=Depends(session_claims)):
+    """Dependency for admin-only routes: an admin token is required, whatever AUTH_REQUIRE_TOKEN says."""
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    if claims.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin token required")
+    return claims
+
+
+async def authorize(claims, kind, key):
+    """Identity of the student/teacher `key`, or None if not approved.
+
+    Answered from the token when there is one, else from the profile cache.
+    """
+    if check_caller(claims, kind, key):
+        _, field, _ = PROFILE_FIELDS[kind]
+        return {field: claims["sub"], "full_name": claims["name"], "department": claims.get("department"),
+                "semester": claims.get("semester"), "section": claims.get("section")}
+    return await profile_cache.get(kind, key)
@@ -0,0 +1,130 @@
+# app/core/subject_catalog.py
+import asyncio
+import hashlib
+import logging
+from pymongo.errors import BulkWriteError
+from app.core.config import SUBJECTS, SUBJECTS_RELOAD_SECONDS
+from app.db.database import subjects
+from app.db.versions import bump, get_version
+
+logger = logging.getLogger(__name__)
+
+
+def subject_key(name):
+    return " ".join(name.split()).lower()
+
+
+class SubjectCatalog:
+    """In-memory copy of the subjects collection.
+
+    Each subject document is {name, key, department, semester}; a missing
+    department or semester means the subject applies to all of them. Lookups
+    are dict hits on the normalised key. Every worker polls the "subjects"
+    entry in collection_versions and reloads when it moves, so an edit made
+    through the admin endpoints reaches all workers within one poll interval.
+    """
+
+    def __init__(self, names=SUBJECTS):
+        self.version = None  # not loaded from the database yet
+        self._install([{"name": n, "key": subject_key(n), "department": None, "semester": None} for n in names])
+
+    def _install(self, docs):
+        docs = sorted(docs, key=lambda d: d["key"])
+        by_key = {}
+        for doc in docs:
+            by_key.setdefault(doc["key"], doc["name"])
+        self._docs = docs
+        self._by_key = by_key
+        self.etag = 'W/"%s"' % hashlib.sha1(repr([
+            (d["name"], d.get("department"), d.get("semester")) for d in docs
+        ]).encode()).hexdigest()
+
+    def canonical(self, name):
+        """Display name of a subject given in any case/spacing, or None if unknown."""
+        return self._by_key.get(subject_key(name))
+
+    def keys(self):
+        return list(self._by_key)
+
+    def names(self, department=None, semester=None):
+        result = []
+        department = department.strip().upper() if department else None
+        for doc in self._docs:
+            if department is not None and (doc.get("department") or department).upper() != department:
+                continue
+            if semester is not None and doc.get("semester") not in (None, semester):
+                continue
+            if doc["name"] not in result:
+                result.append(doc["name"])
+        return result
+
+    async def refresh(self):
+        """Reload if the stored version moved; returns True if it did."""
+        version = await get_version("subjects")
+        if version == self.version:
+            return False
+        docs = await subjects.find({}, {"_id": 0, "name": 1, "key": 1, "department": 1, "semester": 1}).to_list(length=None)
+        if not docs and self.version is None:
+            docs = await self._seed()
+            version = await get_version("subjects")
+        self._install(docs)
+        self.version = version
+        return True
+
+    async def _seed(self):
+        docs = [{"name": n, "key": subject_key(n), "department": None, "semester": None} for n in SUBJECTS]
+        try:
+            await subjects.insert_many([dict(d) for d in docs], ordered=False)
+            await bump("subjects")
+        except BulkWriteError:
+            pass  # another worker seeded first
+        return docs
+
+
+class SubjectReloader:
+    def __init__(self, catalog, interval_seconds=SUBJECTS_RELOAD_SECONDS):
+        self.catalog = catalog
+        self.interval_seconds = interval_seconds
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                if await self.catalog.refresh():
+                    logger.info("Reloaded subject catalogue (version %s)", self.catalog.version)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Subject catalogue reload failed")
+
+
+subject_catalog = SubjectCatalog()
+subject_reloader = None
+
+
+def start_subject_reloader(**options):
+    global subject_reloader
+    subject_reloader = SubjectReloader(subject_catalog, **options)
+    subject_reloader.start()
+    return subject_reloader
+
+
+async def stop_subject_reloader():
+    global subject_reloader
+    if subject_reloader is not None:
+        await subject_reloader.stop()
+        subject_reloader = None
@@ -0,0 +1,101 @@
+# app/core/summaries.py
+import asyncio
+from pymongo import UpdateOne
+from app.db.database import attendance_summary, session_summary, otps
+from app.db import attendance_store
+from app.core.otp_sessions import with_archive
+
+# attendance_summary: one document per (roll_no, subject) with an attended count.
+# session_summary: one document per (teacher_id, department, semester, subject,
+# section) with the number of sessions held and marks received, so a subject name
+# shared by two departments or semesters is counted once for each. Both are updated with $inc as events happen
+# and can be rebuilt from the raw collections with rebuild_summaries().
+
+
+def _session_key(otp_doc):
+    return {
+        "teacher_id": otp_doc["teacher_id"],
+        "department": otp_doc.get("department"),
+        "semester": otp_doc.get("semester"),
+        "subject": otp_doc["subject"].strip().lower(),
+        "section": otp_doc.get("section"),
+    }
+
+
+async def record_session(otp_doc):
+    await session_summary.update_one(_session_key(otp_doc), {"$inc": {"held": 1, "marks": 0}}, upsert=True)
+
+
+async def record_mark(roll_no, subject, otp_doc, marked_at):
+    # independent counters: both writes go out at once, so the mark costs one round trip
+    await asyncio.gather(
+        attendance_summary.update_one(
+            {"roll_no": roll_no, "subject": subject},
+            {"$inc": {"attended": 1}, "$max": {"last_marked_at": marked_at}},
+            upsert=True,
+        ),
+        session_summary.update_one(_session_key(otp_doc), {"$inc": {"marks": 1}}, upsert=True),
+    )
+
+
+async def record_marks(marks):
+    """record_mark for a batch of (roll_no, subject, otp_doc, marked_at), as two bulk writes."""
+    attended = {}
+    session_marks = {}  # session_summary key -> (key document, marks in this batch)
+    for roll_no, subject, otp_doc, marked_at in marks:
+        count, last = attended.get((roll_no, subject), (0, marked_at))
+        attended[(roll_no, subject)] = (count + 1, max(last, marked_at))
+        key = _session_key(otp_doc)
+        group = tuple(key.values())
+        session_marks[group] = (key, session_marks.get(group, (key, 0))[1] + 1)
+    if not attended:
+        return
+    await asyncio.gather(
+        attendance_summary.bulk_write([
+            UpdateOne({"roll_no": roll_no, "subject": subject},
+                      {"$inc": {"attended": count}, "$max": {"last_marked_at": last}}, upsert=True)
+            for (roll_no, subject), (count, last) in attended.items()
+        ], ordered=False),
+        session_summary.bulk_write([
+            UpdateOne(key, {"$inc": {"marks": count}}, upsert=True) for key, count in session_marks.values()
+        ], ordered=False),
+    )
+
+
+async def rebuild_summaries():
+    """Recompute both summaries from the stored marks and all sessions ($out keeps existing indexes)."""
+    await attendance_store.student_subject_totals(
+        {"$project": {
+            "_id": 0,
+            "roll_no": "$_id.roll_no",
+            "subject": "$_id.subject",
+            "attended": 1,
+            "last_marked_at": 1,
+        }},
+        {"$out": "attendance_summary"},
+    ).to_list(length=None)
+
+    await otps.aggregate(with_archive({}) + attendance_store.present_count_stages() + [
+        {"$group": {
+            "_id": {
+                "teacher_id": "$teacher_id",
+                "department": {"$ifNull": ["$department", None]},
+                "semester": {"$ifNull": ["$semester", None]},
+                "subject": {"$toLower": "$subject"},
+                "section": {"$ifNull": ["$section", None]},
+            },
+            "held": {"$sum": 1},
+            "marks": {"$sum": "$present"},
+        }},
+        {"$project": {
+            "_id": 0,
+            "teacher_id": "$_id.teacher_id",
+            "department": "$_id.department",
+            "semester": "$_id.semester",
+            "subject": "$_id.subject",
+            "section": "$_id.section",
+            "held": 1,
+            "marks": 1,
+        }},
+        {"$out": "session_summary"},
+    ], allowDiskUse=True).to_list(length=None)
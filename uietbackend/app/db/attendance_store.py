@@ -0,0 +1,353 @@
+# app/db/attendance_store.py
+"""Attendance storage, in one of two layouts chosen by ATTENDANCE_LAYOUT.
+
+rows:    one `attendance` document per student per session (the original).
+buckets: one `attendance_buckets` document per session, _id = session ID,
+         holding {subject, teacher_id, otp, count} and a compact `marks`
+         array of {r: roll_no, t: marked_at, v: visitor_id, lat, lng}.
+
+Routers go through the helpers below so they work on either layout. The
+helpers that return pipeline stages expect session documents (from otps /
+otps_archive) as their input.
+"""
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.core.config import ATTENDANCE_LAYOUT
+from app.db.database import attendance, attendance_buckets
+from app.utils.time_utils import ist_string
+
+LAYOUT = ATTENDANCE_LAYOUT  # read at call time so tools can switch it
+
+
+def _buckets():
+    return LAYOUT == "buckets"
+
+
+async def create_session(otp_doc):
+    """Create the empty bucket for a new session (no-op for rows)."""
+    if _buckets():
+        await attendance_buckets.insert_one({
+            "_id": otp_doc["_id"],
+            "subject": otp_doc["subject"].strip().lower(),
+            "teacher_id": otp_doc["teacher_id"],
+            "otp": otp_doc["otp"],
+            "count": 0,
+            "marks": [],
+        })
+
+
+async def insert_mark(session_doc, roll_no, student_name, subject, visitor_id, marked_at, lat, lng):
+    """Store one mark; returns False if the student already has one for this session."""
+    if not _buckets():
+        try:
+            await attendance.insert_one({
+                "roll_no": roll_no,
+                "student_name": student_name,
+                "subject": subject,
+                "otp": session_doc["otp"],
+                "session_id": session_doc["_id"],
+                "visitor_id": visitor_id,
+                "marked_at": marked_at,
+                "lat": lat,
+                "lng": lng
+            })
+        except DuplicateKeyError:
+            return False
+        return True
+
+    entry = {"r": roll_no, "t": marked_at, "v": visitor_id, "lat": lat, "lng": lng}
+    # the roll_no guard in the filter makes the append atomic per student
+    query = {"_id": session_doc["_id"], "marks.r": {"$ne": roll_no}}
+    update = {"$push": {"marks": entry}, "$inc": {"count": 1}}
+    result = await attendance_buckets.update_one(query, update)
+    if result.matched_count:
+        return True
+    try:
+        # bucket missing (session created before the switch): create it with this mark
+        await attendance_buckets.update_one(query, {
+            **update,
+            "$setOnInsert": {"subject": subject, "teacher_id": session_doc["teacher_id"], "otp": session_doc["otp"]},
+        }, upsert=True)
+        return True
+    except DuplicateKeyError:
+        # either the bucket now exists (lost a creation race) or the mark is there
+        result = await attendance_buckets.update_one(query, update)
+        return bool(result.matched_count)
+
+
+async def insert_marks(marks):
+    """Store a batch of marks, each a tuple of insert_mark's arguments; returns
+    one flag per mark, False where the student already had a mark for that session."""
+    if not _buckets():
+        docs = [{
+            "roll_no": roll_no,
+            "student_name": student_name,
+            "subject": subject,
+            "otp": session_doc["otp"],
+            "session_id": session_doc["_id"],
+            "visitor_id": visitor_id,
+            "marked_at": marked_at,
+            "lat": lat,
+            "lng": lng
+        } for session_doc, roll_no, student_name, subject, visitor_id, marked_at, lat, lng in marks]
+        stored = [True] * len(docs)
+        if not docs:
+            return stored
+        try:
+            await attendance.insert_many(docs, ordered=False)
+        except BulkWriteError as exc:
+            for error in exc.details["writeErrors"]:
+                if error["code"] != 11000:
+                    raise
+                stored[error["index"]] = False
+        return stored
+
+    # one guarded $push per session; if any of its students is already there
+    # (or the bucket is missing) fall back to one atomic append per mark
+    by_session = {}
+    for i, mark in enumerate(marks):
+        by_session.setdefault(mark[0]["_id"], []).append(i)
+    stored = [False] * len(marks)
+    for session_id, indexes in by_session.items():
+        entries = [{"r": marks[i][1], "t": marks[i][5], "v": marks[i][4], "lat": marks[i][6], "lng": marks[i][7]}
+                   for i in indexes]
+        result = await attendance_buckets.update_one(
+            {"_id": session_id, "marks.r": {"$nin": [e["r"] for e in entries]}},
+            {"$push": {"marks": {"$each": entries}}, "$inc": {"count": len(entries)}},
+        )
+        for i in indexes:
+            stored[i] = bool(result.matched_count) or await insert_mark(*marks[i])
+    return stored
+
+
+def mark_check_lookups(session_id, roll_no, visitor_id, since):
+    """$lookup stages adding `already_marked` and `recent` (same device within the window)."""
+    if not _buckets():
+        return [
+            {"$lookup": {
+                "from": "attendance",
+                "pipeline": [
+                    {"$match": {"session_id": session_id, "roll_no": roll_no}},
+                    {"$limit": 1},
+                    {"$project": {"_id": 1}},
+                ],
+                "as": "already_marked",
+            }},
+            {"$lookup": {
+                "from": "attendance",
+                "pipeline": [
+                    {"$match": {"roll_no": roll_no, "visitor_id": visitor_id, "marked_at": {"$gte": since}}},
+                    {"$limit": 1},
+                    {"$project": {"_id": 1}},
+                ],
+                "as": "recent",
+            }},
+        ]
+    return [
+        {"$lookup": {
+            "from": "attendance_buckets",
+            "pipeline": [
+                {"$match": {"_id": session_id, "marks.r": roll_no}},
+                {"$project": {"_id": 1}},
+            ],
+            "as": "already_marked",
+        }},
+        {"$lookup": {
+            "from": "attendance_buckets",
+            "pipeline": [
+                {"$match": {"marks": {"$elemMatch": {"r": roll_no, "v": visitor_id, "t": {"$gte": since}}}}},
+                {"$limit": 1},
+                {"$project": {"_id": 1}},
+            ],
+            "as": "recent",
+        }},
+    ]
+
+
+def marks_between(roll_nos, since, until):
+    """Cursor over {session_id, roll_no, visitor_id, marked_at} for the given
+    students' marks with marked_at in since..until."""
+    if not _buckets():
+        return attendance.find(
+            {"roll_no": {"$in": roll_nos}, "marked_at": {"$gte": since, "$lte": until}},
+            {"_id": 0, "session_id": 1, "roll_no": 1, "visitor_id": 1, "marked_at": 1},
+        )
+    in_range = {"r": {"$in": roll_nos}, "t": {"$gte": since, "$lte": until}}
+    return attendance_buckets.aggregate([
+        {"$match": {"marks": {"$elemMatch": in_range}}},
+        {"$unwind": "$marks"},
+        {"$match": {f"marks.{k}": v for k, v in in_range.items()}},
+        {"$project": {"_id": 0, "session_id": "$_id", "roll_no": "$marks.r", "visitor_id": "$marks.v",
+                      "marked_at": "$marks.t"}},
+    ])
+
+
+def _marked_at(field, ist):
+    return ist_string(field) if ist else field
+
+
+def student_marks(roll_no, subject=None, ist=False):
+    """Cursor over {subject, marked_at} for one student; with `ist`, marked_at
+    comes back as IST text formatted by the server."""
+    if not _buckets():
+        query = {"roll_no": roll_no}
+        if subject:
+            query["subject"] = subject
+        if ist:
+            return attendance.aggregate([
+                {"$match": query},
+                {"$project": {"_id": 0, "subject": 1, "marked_at": ist_string("$marked_at")}},
+            ])
+        return attendance.find(query, {"_id": 0, "subject": 1, "marked_at": 1})
+
+    match = {"marks.r": roll_no}
+    if subject:
+        match["subject"] = subject
+    return attendance_buckets.aggregate([
+        {"$match": match},
+        {"$project": {
+            "subject": 1,
+            "marks": {"$filter": {"input": "$marks", "cond": {"$eq": ["$$this.r", roll_no]}}},
+        }},
+        {"$unwind": "$marks"},
+        {"$project": {"_id": 0, "subject": 1, "marked_at": _marked_at("$marks.t", ist)}},
+    ])
+
+
+def _student_names():
+    return [
+        {"$lookup": {"from": "approved_students", "localField": "roll_no", "foreignField": "roll_no", "as": "student"}},
+        {"$addFields": {"student_name": {"$ifNull": [{"$arrayElemAt": ["$student.full_name", 0]}, "Unknown"]}}},
+        {"$project": {"student": 0}},
+    ]
+
+
+def session_marks(session_ids, ist=False):
+    """Cursor over {student_name, roll_no, subject, marked_at} for the given sessions
+    (marked_at as IST text with `ist`)."""
+    if not _buckets():
+        query = {"session_id": {"$in": session_ids}}
+        if ist:
+            return attendance.aggregate([
+                {"$match": query},
+                {"$project": {"_id": 0, "student_name": 1, "roll_no": 1, "subject": 1,
+                              "marked_at": ist_string("$marked_at")}},
+            ])
+        return attendance.find(query, {"_id": 0, "student_name": 1, "roll_no": 1, "subject": 1, "marked_at": 1})
+    return attendance_buckets.aggregate([
+        {"$match": {"_id": {"$in": session_ids}}},
+        {"$unwind": "$marks"},
+        {"$project": {"_id": 0, "roll_no": "$marks.r", "subject": 1, "marked_at": _marked_at("$marks.t", ist)}},
+    ] + _student_names())
+
+
+def present_count_stages():
+    """Stages adding `present`, the number of marks, to each session document."""
+    if not _buckets():
+        return [
+            {"$lookup": {
+                "from": "attendance",
+                "localField": "_id",
+                "foreignField": "session_id",
+                "pipeline": [{"$project": {"_id": 1}}],
+                "as": "marks",
+            }},
+            {"$addFields": {"present": {"$size": "$marks"}}},
+            {"$project": {"marks": 0}},
+        ]
+    return [
+        {"$lookup": {
+            "from": "attendance_buckets",
+            "localField": "_id",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"count": 1}}],
+            "as": "bucket",
+        }},
+        {"$addFields": {"present": {"$ifNull": [{"$arrayElemAt": ["$bucket.count", 0]}, 0]}}},
+        {"$project": {"bucket": 0}},
+    ]
+
+
+def session_rows_stages(ist=False):
+    """Stages turning session documents into {student_name, roll_no, subject, marked_at} rows
+    (marked_at as IST text with `ist`)."""
+    if not _buckets():
+        return [
+            {"$lookup": {"from": "attendance", "localField": "_id", "foreignField": "session_id", "as": "marks"}},
+            {"$unwind": "$marks"},
+            {"$project": {
+                "_id": 0,
+                "roll_no": "$marks.roll_no",
+                "subject": "$marks.subject",
+                "marked_at": _marked_at("$marks.marked_at", ist),
+            }},
+        ] + _student_names()
+    return [
+        {"$lookup": {"from": "attendance_buckets", "localField": "_id", "foreignField": "_id", "as": "bucket"}},
+        {"$unwind": "$bucket"},
+        {"$unwind": "$bucket.marks"},
+        {"$project": {
+            "_id": 0,
+            "roll_no": "$bucket.marks.r",
+            "subject": "$bucket.subject",
+            "marked_at": _marked_at("$bucket.marks.t", ist),
+        }},
+    ] + _student_names()
+
+
+def session_mark_stages():
+    """Stages turning session documents into one document per mark, keeping the
+    session's fields and adding roll_no, marked_at, lat and lng."""
+    if not _buckets():
+        return [
+            {"$lookup": {
+                "from": "attendance",
+                "localField": "_id",
+                "foreignField": "session_id",
+                "pipeline": [{"$project": {"_id": 0, "roll_no": 1, "marked_at": 1, "lat": 1, "lng": 1}}],
+                "as": "mark",
+            }},
+            {"$unwind": "$mark"},
+            {"$addFields": {"roll_no": "$mark.roll_no", "marked_at": "$mark.marked_at",
+                            "lat": "$mark.lat", "lng": "$mark.lng"}},
+            {"$project": {"mark": 0}},
+        ]
+    return [
+        {"$lookup": {
+            "from": "attendance_buckets",
+            "localField": "_id",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"_id": 0, "marks": 1}}],
+            "as": "bucket",
+        }},
+        {"$unwind": "$bucket"},
+        {"$unwind": "$bucket.marks"},
+        {"$addFields": {"roll_no": "$bucket.marks.r", "marked_at": "$bucket.marks.t",
+                        "lat": "$bucket.marks.lat", "lng": "$bucket.marks.lng"}},
+        {"$project": {"bucket": 0}},
+    ]
+
+
+def student_subject_totals(*stages, marked_range=None):
+    """Aggregation over all marks (or those with marked_at in `marked_range`)
+    grouped by (roll_no, subject), followed by `stages`."""
+    if not _buckets():
+        return attendance.aggregate([
+            *([{"$match": {"marked_at": marked_range}}] if marked_range else []),
+            {"$group": {
+                "_id": {"roll_no": "$roll_no", "subject": {"$toLower": "$subject"}},
+                "attended": {"$sum": 1},
+                "last_marked_at": {"$max": "$marked_at"},
+            }},
+            *stages,
+        ], allowDiskUse=True)
+    return attendance_buckets.aggregate([
+        *([{"$match": {"marks.t": marked_range}}] if marked_range else []),
+        {"$unwind": "$marks"},
+        *([{"$match": {"marks.t": marked_range}}] if marked_range else []),
+        {"$group": {
+            "_id": {"roll_no": "$marks.r", "subject": "$subject"},
+            "attended": {"$sum": 1},
+            "last_marked_at": {"$max": "$marks.t"},
+        }},
+        *stages,
+    ], allowDiskUse=True)
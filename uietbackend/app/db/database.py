@@ -1,17 +1,210 @@
-from pymongo import MongoClient
-from app.core.config import MONGO_URI
+import contextvars
+from contextlib import contextmanager
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+from app.core.metrics import command_metrics, CommandMetrics
+from app.core.config import (
+    MONGO_URI, MONGO_DB_NAME, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME_MS, MONGO_WAIT_QUEUE_TIMEOUT_MS, MONGO_ACCESS_PROFILES,
+    MONGO_HOT_WRITE_POOL_SIZE, MONGO_HOT_WRITE_TIMEOUT_MS, MONGO_HOT_WRITE_W, MONGO_HOT_WRITE_JOURNAL,
+    MONGO_INTERACTIVE_POOL_SIZE, MONGO_INTERACTIVE_TIMEOUT_MS, MONGO_INTERACTIVE_READ_PREFERENCE,
+    MONGO_REPORT_URI, MONGO_REPORT_POOL_SIZE, MONGO_REPORT_TIMEOUT_MS, MONGO_REPORT_READ_PREFERENCE,
+    MONGO_REPORT_MAX_STALENESS_SECONDS,
+)
+
+# The client is created in the app lifespan (see app/main.py), never at import
+# time, so importing a router does not open sockets and every worker process
+# gets its own pool.
+client = None
+db = None
+_transactions = None  # whether the server supports transactions; asked once per connection
+
+_client_factory = AsyncIOMotorClient
+
+
+def _write_concern(w):
+    return int(w) if w.isdigit() else w
+
+
+def _timeout(ms):
+    # timeoutMS bounds each operation end to end, including the wait for a
+    # pooled connection, so it replaces waitQueueTimeoutMS; 0 means no budget
+    return {"timeoutMS": ms} if ms else {"waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS}
+
+
+def _staleness(read_preference, seconds):
+    return {} if read_preference == "primary" else {"maxStalenessSeconds": seconds}
+
+
+# Access profiles. Every route declares one (access_profile below), so heavy
+# report reads get their own small pool, may go to a secondary and have a long
+# time budget, while markAttendance keeps a pool of its own, a short budget and
+# a cheap write concern. "default" is the client everything used before:
+# admin writes and transactions, logins, registration and the background workers.
+PROFILES = {
+    "default": {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    },
+    "hot-write": {
+        "maxPoolSize": MONGO_HOT_WRITE_POOL_SIZE,
+        "readPreference": "primary",
+        "w": _write_concern(MONGO_HOT_WRITE_W),
+        "journal": MONGO_HOT_WRITE_JOURNAL,
+        **_timeout(MONGO_HOT_WRITE_TIMEOUT_MS),
+    },
+    "interactive-read": {
+        "maxPoolSize": MONGO_INTERACTIVE_POOL_SIZE,
+        "readPreference": MONGO_INTERACTIVE_READ_PREFERENCE,
+        "w": "majority",
+        **_timeout(MONGO_INTERACTIVE_TIMEOUT_MS),
+    },
+    "report": {
+        "host": MONGO_REPORT_URI,
+        "maxPoolSize": MONGO_REPORT_POOL_SIZE,
+        "readPreference": MONGO_REPORT_READ_PREFERENCE,
+        **_staleness(MONGO_REPORT_READ_PREFERENCE, MONGO_REPORT_MAX_STALENESS_SECONDS),
+        "w": "majority",
+        **_timeout(MONGO_REPORT_TIMEOUT_MS),
+    },
+}
+
+_profile = contextvars.ContextVar("mongo_access_profile", default="default")
+_profile_dbs = {}  # profile name -> database, for profiles other than "default"
+
+
+def set_client_factory(factory):
+    """Swap the driver, e.g. for the in-memory stand-in (app.db.standin.use) in tests."""
+    global _client_factory
+    _client_factory = factory
+
+
+def _new_client(name):
+    options = dict(PROFILES[name])
+    host = options.pop("host", None) or MONGO_URI
+    listener = command_metrics if name == "default" else CommandMetrics(name)
+    return _client_factory(
+        host,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        event_listeners=[listener],
+        **options,
+    )
+
+
+def connect():
+    global client, db
+    if client is None:
+        client = _new_client("default")
+        db = client[MONGO_DB_NAME]
+    return db
+
+
+def profile_db(name):
+    """Database handle of an access profile; its client is created on first use."""
+    if db is None:
+        raise RuntimeError("Database is not connected; connect() runs in the app lifespan")
+    if name == "default" or not MONGO_ACCESS_PROFILES:
+        return db
+    if name not in _profile_dbs:
+        _profile_dbs[name] = _new_client(name)[MONGO_DB_NAME]
+    return _profile_dbs[name]
+
+
+def current_db():
+    """Database handle of the profile the current request (or task) runs under."""
+    return profile_db(_profile.get())
+
+
+def access_profile(name):
+    """Route dependency that runs the request's queries under profile `name`.
+
+    Each request is handled in its own task, so setting the context variable
+    here does not leak into other requests; tasks the handler starts inherit it.
+    """
+    if name not in PROFILES:
+        raise ValueError(f"Unknown access profile {name!r}")
+
+    async def dependency():
+        _profile.set(name)
+    return dependency
+
+
+@contextmanager
+def using(name):
+    """Run a block of code (e.g. in a script or background task) under profile `name`."""
+    if name not in PROFILES:
+        raise ValueError(f"Unknown access profile {name!r}")
+    token = _profile.set(name)
+    try:
+        yield
+    finally:
+        _profile.reset(token)
+
+
+async def supports_transactions():
+    """True if the server can run multi-document transactions (a replica set or mongos).
+
+    Approvals move documents between collections in a transaction, so on a
+    standalone mongod they cannot run at all.
+    """
+    global _transactions
+    if _transactions is None:
+        try:
+            hello = await db.command("hello")
+        except NotImplementedError:  # the in-memory stand-in has no hello (nor transactions)
+            hello = {}
+        except PyMongoError:
+            return False  # unreachable for now; ask again next time
+        _transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+    return _transactions
+
+
+def close():
+    global client, db, _transactions
+    _transactions = None
+    for profile in _profile_dbs.values():
+        profile.client.close()
+    _profile_dbs.clear()
+    if client is not None:
+        client.close()
+    client = None
+    db = None
+
+
+class _Collection:
+    """Resolves to the named collection under the current access profile."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(current_db()[self.name], attr)
 
-client = MongoClient(MONGO_URI)
-db = client["uietattendance"]
 
 # collections
-pending_students = db["pending_students"]
-approved_students = db["approved_students"]
-rejected_students = db["rejected_students"]
+pending_students = _Collection("pending_students")
+approved_students = _Collection("approved_students")
+rejected_students = _Collection("rejected_students")
+
+pending_teachers = _Collection("pending_teachers")
+approved_teachers = _Collection("approved_teachers")
+rejected_teachers = _Collection("rejected_teachers")
+
+otps = _Collection("otps")
+otps_archive = _Collection("otps_archive")
+active_otp_codes = _Collection("active_otp_codes")
+attendance = _Collection("attendance")
+attendance_buckets = _Collection("attendance_buckets")
+
+attendance_summary = _Collection("attendance_summary")
+session_summary = _Collection("session_summary")
+
+defaulter_reports = _Collection("defaulter_reports")
+defaulter_rows = _Collection("defaulter_rows")
 
-pending_teachers = db["pending_teachers"]
-approved_teachers = db["approved_teachers"]
-rejected_teachers = db["rejected_teachers"]
+subjects = _Collection("subjects")
 
-otps = db["otps"]
-attendance = db["attendance"]
\ No newline at end of file
+email_outbox = _Collection("email_outbox")
+rate_limits = _Collection("rate_limits")
+collection_versions = _Collection("collection_versions")
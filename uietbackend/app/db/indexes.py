@@ -0,0 +1,216 @@
+# app/db/indexes.py
+import logging
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from app.core.config import OTP_ARCHIVE_RETENTION_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Indexes backing every query the routers run. Unique indexes mark the cases
+# where a duplicate document is a bug, not just a slow query.
+INDEXES = {
+    "pending_students": [
+        IndexModel([("roll_no", ASCENDING)], name="roll_no"),
+        IndexModel([("department", ASCENDING), ("semester", ASCENDING), ("section", ASCENDING), ("_id", ASCENDING)], name="department_semester_section_id"),
+    ],
+    "approved_students": [
+        IndexModel([("roll_no", ASCENDING)], name="roll_no_unique", unique=True),
+        IndexModel([("department", ASCENDING), ("semester", ASCENDING), ("section", ASCENDING), ("_id", ASCENDING)], name="department_semester_section_id"),
+    ],
+    "rejected_students": [
+        IndexModel([("roll_no", ASCENDING)], name="roll_no"),
+        IndexModel([("department", ASCENDING), ("semester", ASCENDING), ("section", ASCENDING), ("_id", ASCENDING)], name="department_semester_section_id"),
+    ],
+    "pending_teachers": [
+        IndexModel([("employee_id", ASCENDING)], name="employee_id"),
+        IndexModel([("subject", ASCENDING), ("_id", ASCENDING)], name="subject_id"),
+    ],
+    "approved_teachers": [
+        IndexModel([("employee_id", ASCENDING)], name="employee_id_unique", unique=True),
+        IndexModel([("subject", ASCENDING), ("_id", ASCENDING)], name="subject_id"),
+    ],
+    "rejected_teachers": [
+        IndexModel([("employee_id", ASCENDING)], name="employee_id"),
+        IndexModel([("subject", ASCENDING), ("_id", ASCENDING)], name="subject_id"),
+    ],
+    "otps": [
+        IndexModel([("otp", ASCENDING), ("end_time", DESCENDING)], name="otp_end_time"),
+        IndexModel(
+            [("teacher_id", ASCENDING), ("start_time", DESCENDING), ("_id", DESCENDING)],
+            name="teacher_id_start_time_id",
+        ),
+        IndexModel([("end_time", ASCENDING)], name="end_time"),
+    ],
+    "otps_archive": [
+        IndexModel([("otp", ASCENDING)], name="otp"),
+        IndexModel(
+            [("teacher_id", ASCENDING), ("start_time", DESCENDING), ("_id", DESCENDING)],
+            name="teacher_id_start_time_id",
+        ),
+    ] + ([
+        IndexModel(
+            [("end_time", ASCENDING)],
+            name="end_time_ttl",
+            expireAfterSeconds=OTP_ARCHIVE_RETENTION_DAYS * 86400,
+        ),
+    ] if OTP_ARCHIVE_RETENTION_DAYS > 0 else []),
+    "active_otp_codes": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "attendance": [
+        # one mark per student per session; records from before session IDs are exempt
+        IndexModel(
+            [("session_id", ASCENDING), ("roll_no", ASCENDING)],
+            name="session_id_roll_no_unique",
+            unique=True,
+            partialFilterExpression={"session_id": {"$exists": True}},
+        ),
+        IndexModel(
+            [("roll_no", ASCENDING), ("visitor_id", ASCENDING), ("marked_at", DESCENDING)],
+            name="roll_no_visitor_id_marked_at",
+        ),
+        IndexModel([("roll_no", ASCENDING), ("subject", ASCENDING)], name="roll_no_subject"),
+        IndexModel([("otp", ASCENDING)], name="otp"),  # session ID backfill of old records
+    ],
+    "attendance_buckets": [
+        IndexModel([("marks.r", ASCENDING), ("subject", ASCENDING)], name="marks_r_subject"),
+        IndexModel(
+            [("marks.r", ASCENDING), ("marks.v", ASCENDING), ("marks.t", DESCENDING)],
+            name="marks_r_marks_v_marks_t",
+        ),
+    ],
+    "attendance_summary": [
+        IndexModel([("roll_no", ASCENDING), ("subject", ASCENDING)], name="roll_no_subject_unique", unique=True),
+    ],
+    "session_summary": [
+        IndexModel(
+            [("teacher_id", ASCENDING), ("department", ASCENDING), ("semester", ASCENDING),
+             ("subject", ASCENDING), ("section", ASCENDING)],
+            name="teacher_id_department_semester_subject_section_unique",
+            unique=True,
+        ),
+        IndexModel(
+            [("department", ASCENDING), ("semester", ASCENDING), ("subject", ASCENDING), ("section", ASCENDING)],
+            name="department_semester_subject_section",
+        ),
+    ],
+    "defaulter_reports": [
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING)], name="status_created_at"),
+        # at most one build in progress, across all workers
+        IndexModel([("status", ASCENDING)], name="status_building_unique", unique=True,
+                   partialFilterExpression={"status": "building"}),
+    ],
+    "defaulter_rows": [
+        # pages are keyset on _id within a report; filters are applied on the fetched rows
+        IndexModel([("report_id", ASCENDING), ("_id", ASCENDING)], name="report_id_id"),
+    ],
+    "subjects": [
+        IndexModel(
+            [("key", ASCENDING), ("department", ASCENDING), ("semester", ASCENDING)],
+            name="key_department_semester_unique",
+            unique=True,
+        ),
+    ],
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "email_outbox": [
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt_at"),
+        IndexModel([("status", ASCENDING), ("locked_until", ASCENDING)], name="status_locked_until"),
+    ],
+}
+
+# Indexes replaced by the ones above; dropped at startup if present.
+OBSOLETE_INDEXES = {
+    "otps": ["teacher_id_start_time"],
+    # OTP codes repeat across sessions, so uniqueness is per session now
+    "attendance": ["roll_no_otp_unique"],
+    # summaries are kept per department and semester too
+    "session_summary": ["teacher_id_subject_section_unique", "subject_section"],
+}
+
+# One representative filter per query shape the routers issue.
+QUERY_SHAPES = [
+    ("pending_students", {"roll_no": "0"}),
+    ("approved_students", {"roll_no": "0"}),
+    ("pending_teachers", {"employee_id": "X"}),
+    ("approved_teachers", {"employee_id": "X"}),
+    ("otps", {"otp": "X"}),
+    ("otps", {"otp": {"$in": ["X"]}, "start_time": {"$lte": datetime(1970, 1, 1)}, "end_time": {"$gte": datetime(1970, 1, 1)}}),
+    ("otps", {"teacher_id": "X"}),
+    ("otps", {"teacher_id": "X", "start_time": {"$gte": datetime(1970, 1, 1)}}),
+    ("otps", {"end_time": {"$lt": datetime(1970, 1, 1)}}),
+    ("otps_archive", {"teacher_id": "X", "start_time": {"$gte": datetime(1970, 1, 1)}}),
+    ("otps_archive", {"otp": {"$in": ["X"]}, "start_time": {"$lte": datetime(1970, 1, 1)}, "end_time": {"$gte": datetime(1970, 1, 1)}}),
+    ("attendance", {"roll_no": "0"}),
+    ("attendance", {"roll_no": "0", "subject": "x"}),
+    ("attendance", {"session_id": ObjectId(), "roll_no": "0"}),
+    ("attendance", {"roll_no": "0", "visitor_id": "x", "marked_at": {"$gte": datetime(1970, 1, 1)}}),
+    ("attendance", {"session_id": {"$in": [ObjectId()]}}),
+    ("attendance", {"roll_no": {"$in": ["0"]}, "marked_at": {"$gte": datetime(1970, 1, 1), "$lte": datetime(1970, 1, 1)}}),
+    ("attendance_buckets", {"marks.r": "0"}),
+    ("attendance_buckets", {"marks.r": "0", "subject": "x"}),
+    ("attendance_buckets", {"marks": {"$elemMatch": {"r": "0", "v": "x", "t": {"$gte": datetime(1970, 1, 1)}}}}),
+    ("attendance_buckets", {"marks": {"$elemMatch": {"r": {"$in": ["0"]}, "t": {"$gte": datetime(1970, 1, 1), "$lte": datetime(1970, 1, 1)}}}}),
+    ("attendance_summary", {"roll_no": "0"}),
+    ("session_summary", {"teacher_id": "X"}),
+    ("session_summary", {"department": "X", "semester": 1, "subject": {"$in": ["x"]}, "section": {"$in": ["A", None]}}),
+    ("defaulter_reports", {"status": "ready"}),
+    ("defaulter_rows", {"report_id": ObjectId(), "percentage": {"$lt": 75}}),
+]
+
+
+async def ensure_indexes(db):
+    for name, index_names in OBSOLETE_INDEXES.items():
+        existing = await db[name].index_information()
+        for index_name in index_names:
+            if index_name in existing:
+                await db[name].drop_index(index_name)
+    for name, models in INDEXES.items():
+        try:
+            await db[name].create_indexes(models)
+        except OperationFailure as exc:
+            # e.g. existing duplicates block a unique index; keep serving
+            logger.error("Could not create indexes on %s: %s", name, exc)
+
+
+def _plan_stages(plan):
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    if "queryPlan" in plan:  # slot-based engine wraps the classic plan
+        stages += _plan_stages(plan["queryPlan"])
+    return stages
+
+
+async def find_collscans(db):
+    """Return the (collection, filter) query shapes whose winning plan is a COLLSCAN.
+
+    The check is advisory: a query that cannot be explained is logged and
+    skipped, and a client without explain (e.g. mongomock) skips it entirely.
+    """
+    collscans = []
+    for name, query in QUERY_SHAPES:
+        cursor = db[name].find(query)
+        if not hasattr(cursor, "explain"):
+            logger.info("Skipping the COLLSCAN check: %s cannot explain queries", type(cursor).__name__)
+            return []
+        try:
+            explained = await cursor.explain()
+            stages = _plan_stages(explained["queryPlanner"]["winningPlan"])
+        except Exception as exc:
+            logger.error("Could not explain query on %s %s: %s", name, query, exc)
+            continue
+        if "COLLSCAN" in stages:
+            collscans.append((name, query))
+    return collscans
+
+
+async def bootstrap_indexes(db):
+    await ensure_indexes(db)
+    for name, query in await find_collscans(db):
+        logger.warning("Query on %s still plans to a COLLSCAN: %s", name, query)
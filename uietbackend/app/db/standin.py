@@ -0,0 +1,125 @@
+# app/db/standin.py
+"""In-process stand-in for mongod, for tests and benchmarks.
+
+mongomock_motor (requirements-dev.txt) provides the Motor API in memory but
+lacks server features the queries here rely on. install() adds the ones
+they use:
+
+- $unionWith (sessions are read from otps and otps_archive)
+- $lookup with a sub-pipeline, with or without localField/foreignField
+  (markAttendance's duplicate checks, present counts); `let` is not supported
+- the timezone argument of $dateToString (IST text in teacher views)
+- bulk_write with pymongo 4 operation objects, raising BulkWriteError with
+  per-index writeErrors as the server does
+
+Transactions, change streams and explain are still missing: routes needing
+them fail under the stand-in. Never used by the app itself.
+"""
+import pytz
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import BulkWriteResult
+
+from app.db import database
+
+_installed = False
+
+
+def _union_with(in_collection, db, options):
+    if isinstance(options, str):
+        options = {"coll": options}
+    other = db.get_collection(options["coll"]).aggregate(options.get("pipeline", []))
+    return list(in_collection) + list(other)
+
+
+def _lookup(original):
+    def handle(in_collection, db, options):
+        if "pipeline" not in options:
+            return original(in_collection, db, options)
+        if "let" in options:
+            raise NotImplementedError("$lookup with 'let' is not supported by the stand-in")
+        foreign = db.get_collection(options["from"])
+        for doc in in_collection:
+            pipeline = options["pipeline"]
+            if "localField" in options:
+                value = doc
+                for part in options["localField"].split("."):
+                    value = value.get(part) if isinstance(value, dict) else None
+                match = {"$in": value} if isinstance(value, list) else value
+                pipeline = [{"$match": {options["foreignField"]: match}}] + pipeline
+            doc[options["as"]] = list(foreign.aggregate(pipeline))
+        return in_collection
+    return handle
+
+
+def _date_operator(original):
+    def handle(self, operator, values):
+        if operator == "$dateToString" and isinstance(values, dict) and "timezone" in values:
+            value = self.parse(values["date"])
+            if value is None:
+                return None
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=pytz.utc)
+            return value.astimezone(pytz.timezone(values["timezone"])).strftime(values["format"])
+        return original(self, operator, values)
+    return handle
+
+
+def _bulk_write(self, requests, ordered=True, bypass_document_validation=False, session=None):
+    result = {"nInserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "nUpserted": 0,
+              "upserted": [], "writeErrors": [], "writeConcernErrors": []}
+    for index, op in enumerate(requests):
+        try:
+            if isinstance(op, InsertOne):
+                self.insert_one(op._doc)
+                result["nInserted"] += 1
+                continue
+            if isinstance(op, (DeleteOne, DeleteMany)):
+                delete = self.delete_one if isinstance(op, DeleteOne) else self.delete_many
+                result["nRemoved"] += delete(op._filter).deleted_count
+                continue
+            if isinstance(op, ReplaceOne):
+                outcome = self.replace_one(op._filter, op._doc, upsert=op._upsert)
+            elif isinstance(op, (UpdateOne, UpdateMany)):
+                update = self.update_one if isinstance(op, UpdateOne) else self.update_many
+                outcome = update(op._filter, op._doc, upsert=op._upsert, array_filters=op._array_filters)
+            else:
+                raise NotImplementedError(f"{type(op).__name__} is not supported by the stand-in")
+        except DuplicateKeyError as exc:
+            result["writeErrors"].append({"index": index, "code": 11000, "errmsg": str(exc), "op": op})
+            if ordered:
+                break
+            continue
+        if outcome.upserted_id is not None:
+            result["nUpserted"] += 1
+            result["upserted"].append({"index": index, "_id": outcome.upserted_id})
+        else:
+            result["nMatched"] += outcome.matched_count
+            result["nModified"] += outcome.modified_count
+    if result["writeErrors"]:
+        raise BulkWriteError(result)
+    return BulkWriteResult(result, True)
+
+
+def install():
+    """Teach mongomock the server features listed above (idempotent)."""
+    global _installed
+    if _installed:
+        return
+    from mongomock import aggregate, collection
+
+    aggregate._PIPELINE_HANDLERS["$unionWith"] = _union_with
+    aggregate._PIPELINE_HANDLERS["$lookup"] = _lookup(aggregate._PIPELINE_HANDLERS["$lookup"])
+    aggregate._Parser._handle_date_operator = _date_operator(aggregate._Parser._handle_date_operator)
+    collection.Collection.bulk_write = _bulk_write
+    _installed = True
+
+
+def use():
+    """Point every access profile at one fresh in-memory server; returns its client."""
+    from mongomock_motor import AsyncMongoMockClient
+
+    install()
+    client = AsyncMongoMockClient()
+    database.set_client_factory(lambda *args, **kwargs: client)
+    return client
@@ -0,0 +1,13 @@
+# app/db/versions.py
+from app.db.database import collection_versions
+
+
+async def bump(*names, session=None):
+    """Record that the named collections changed (used for ETags and cache reloads)."""
+    for name in names:
+        await collection_versions.update_one({"_id": name}, {"$inc": {"version": 1}}, upsert=True, session=session)
+
+
+async def get_version(name):
+    doc = await collection_versions.find_one({"_id": name})
+    return doc["version"] if doc else 0
@@ -1,11 +1,154 @@
-from fastapi import FastAPI
+import time
+
+STARTED = time.perf_counter()  # before the imports below, so cold start includes them
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pymongo.errors import PyMongoError
 from .api import admin, register
 from .api import auth
 from app.api import teacher, student, subjects
-from app.core.config import URL
+from app.core.config import (
+    URL, MONGO_ENSURE_INDEXES, OUTBOX_WORKER_ENABLED, OTP_ARCHIVE_ENABLED, LOG_LEVEL,
+    APP_ROLE, WARMUP_CONNECTIONS, LIVE_FEED_BACKEND, validate_config, serves_http, runs_background,
+)
+from app.core.outbox import start_outbox_worker, stop_outbox_worker
+from app.core.otp_sessions import start_otp_archiver, stop_otp_archiver, backfill_session_ids_once
+from app.core.subject_catalog import subject_catalog, start_subject_reloader, stop_subject_reloader
+from app.core.live_feed import start_change_stream_relay, stop_change_stream_relay
+from app.db import database
+from app.db.indexes import bootstrap_indexes
+from app.core import metrics
+from app.core.logging_utils import log_event
+from app.core.otp_cache import otp_cache
+
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+logger = logging.getLogger("app.requests")
+startup_logger = logging.getLogger("app.startup")
+
+
+startup_seconds = metrics.Gauge("app_startup_seconds", "Time spent in each cold-start phase of this worker", ("phase",))
+IMPORTED = time.perf_counter()
+
+
+@contextmanager
+def _phase(timings, name):
+    started = time.perf_counter()
+    yield
+    timings[name] = time.perf_counter() - started
+
+
+async def warm_up(db, timings):
+    """Open pool connections and fill caches before the first request arrives."""
+    with _phase(timings, "warm_pool"):
+        pings = [db.command("ping") for _ in range(max(1, WARMUP_CONNECTIONS))]
+        if serves_http():
+            # markAttendance has a pool of its own; the read profiles just get their clients up
+            hot_write = database.profile_db("hot-write")
+            pings += [hot_write.command("ping") for _ in range(max(1, WARMUP_CONNECTIONS))]
+            pings += [database.profile_db(name).command("ping") for name in ("interactive-read", "report")]
+        await asyncio.gather(*pings)
+    with _phase(timings, "warm_subjects"):
+        await subject_catalog.refresh()
+    if serves_http():
+        with _phase(timings, "warm_otp_cache"):
+            await otp_cache.warm()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    validate_config()
+    timings = {"import": IMPORTED - STARTED}
+    with _phase(timings, "connect"):
+        db = database.connect()
+    if MONGO_ENSURE_INDEXES and APP_ROLE != "readonly":
+        with _phase(timings, "indexes"):
+            await bootstrap_indexes(db)
+    await warm_up(db, timings)
+    if serves_http() and not await database.supports_transactions():
+        startup_logger.warning("MongoDB does not support transactions (not a replica set); "
+                               "approvals, rejections and auto-approved imports will answer 503")
+    start_subject_reloader()
+    if serves_http() and LIVE_FEED_BACKEND == "changestream":
+        start_change_stream_relay()
+    if runs_background() and OUTBOX_WORKER_ENABLED:
+        start_outbox_worker()
+    if runs_background() and OTP_ARCHIVE_ENABLED:
+        start_otp_archiver()
+    backfill = asyncio.create_task(backfill_session_ids_once()) if runs_background() else None
+    timings["total"] = time.perf_counter() - STARTED
+    for phase, seconds in timings.items():
+        startup_seconds.set(phase, value=seconds)
+    log_event(startup_logger, "startup", sample_rate=1, role=APP_ROLE,
+              **{f"{phase}_ms": round(seconds * 1000, 1) for phase, seconds in timings.items()})
+    try:
+        yield
+    finally:
+        # uvicorn has stopped accepting and drained in-flight requests by now
+        if backfill is not None:
+            backfill.cancel()
+            await asyncio.gather(backfill, return_exceptions=True)
+        await stop_otp_archiver()
+        await stop_outbox_worker()
+        await stop_subject_reloader()
+        await stop_change_stream_relay()
+        database.close()
+        log_event(startup_logger, "shutdown", sample_rate=1, role=APP_ROLE)
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    stats = metrics.RequestStats()
+    token = metrics.current_request.set(stats)
+    metrics.http_in_flight.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.http_in_flight.dec()
+        metrics.current_request.reset(token)
+        # label by the route template, not the raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        route = route.path if route is not None else "unmatched"
+        metrics.http_requests.inc(request.method, route, str(status))
+        metrics.http_request_duration.observe(request.method, route, value=elapsed)
+        metrics.request_db_time.observe(route, value=stats.db_seconds)
+        metrics.request_round_trips.observe(route, value=stats.round_trips)
+        log_event(
+            logger, "request",
+            method=request.method, route=route, status=status,
+            duration_ms=round(elapsed * 1000, 2),
+            db_ms=round(stats.db_seconds * 1000, 2), db_round_trips=stats.round_trips,
+        )
+
+
+@app.exception_handler(PyMongoError)
+async def database_timeout(request: Request, exc: PyMongoError):
+    # an access profile's time budget ran out; anything else stays a 500
+    if exc.timeout:
+        return JSONResponse({"detail": "The database did not respond in time"}, status_code=503,
+                            headers={"Retry-After": "5"})
+    raise exc
+
+
+if APP_ROLE == "readonly":
+    @app.middleware("http")
+    async def reject_writes(request: Request, call_next):
+        # logins only read, so they stay available
+        if request.method in ("POST", "PUT", "PATCH", "DELETE") and not request.url.path.startswith("/login/"):
+            return JSONResponse({"detail": "This instance is read-only"}, status_code=503, headers={"Retry-After": "30"})
+        return await call_next(request)
 
 
 app.add_middleware(
@@ -24,6 +167,23 @@ app.include_router(student.router)
 app.include_router(subjects.router)
 
 
+otp_cache_entries = metrics.Gauge("otp_cache_entries", "Entries in the active-OTP cache")
+otp_cache_lookups = metrics.Counter("otp_cache_lookups_total", "Active-OTP cache lookups by result", ("result",))
+
+
+@metrics.add_collector
+def _collect_otp_cache():
+    stats = otp_cache.stats()
+    otp_cache_entries.set(value=stats["entries"])
+    for result in ("hits", "negative_hits", "misses"):
+        otp_cache_lookups.set(result, value=stats[result])
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
-def root():
+async def root():
     return {"message": "College Management API success"}
@@ -0,0 +1,44 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Responses. Registration records are returned as stored (minus _id), so
+# they stay plain mappings; the envelopes around them are typed.
+
+Record = Dict[str, Any]
+
+class RecordPage(BaseModel):
+    items: List[Record]
+    next_cursor: Optional[str]
+    total: int
+
+class DefaulterReport(BaseModel):
+    report_id: str
+    label: Optional[str] = None
+    from_date: Optional[str] = None
+    to_date: Optional[str] = None
+    created_at: datetime
+    status: str
+    students: Optional[int] = None
+    rows: Optional[int] = None
+    threshold: Optional[float] = None
+    defaulters: Optional[int] = None
+    elapsed_ms: Optional[float] = None
+
+class DefaulterRow(BaseModel):
+    department: Optional[str]
+    semester: Optional[int]
+    section: Optional[str]
+    roll_no: str
+    student_name: Optional[str]
+    subject: str
+    attended: int
+    held: int
+    percentage: float
+
+class DefaulterPage(BaseModel):
+    report: DefaulterReport
+    threshold: float
+    items: List[DefaulterRow]
+    next_cursor: Optional[str]
+    total: int
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, EmailStr, constr
+from pydantic import BaseModel, EmailStr, constr, field_validator
 from datetime import date
+from typing import Dict, List, Optional
 
 class StudentRegister(BaseModel):
     full_name: str
@@ -13,3 +14,45 @@ class StudentRegister(BaseModel):
     course: str
     semester: int
     section: str
+
+    @field_validator("department", "section")
+    @classmethod
+    def _class_code(cls, value):
+        # matched exactly against sessions and report filters, which are upper-cased too
+        return value.strip().upper()
+
+
+# Responses. Times are IST text ("YYYY-MM-DD HH:MM:SS"), formatted by the query.
+class AttendanceMark(BaseModel):
+    subject: str
+    marked_at: Optional[str]
+
+class OtpWindow(BaseModel):
+    subject: str
+    start_time: str
+    end_time: str
+
+class SubjectAttendance(BaseModel):
+    subject: str
+    attended: int
+    held: int
+    percentage: Optional[float]
+
+class StudentProfile(BaseModel):
+    full_name: Optional[str]
+    email: Optional[str]
+    department: Optional[str]
+    semester: Optional[int]
+    section: Optional[str]
+    roll_no: Optional[str]
+
+class BatchMarkResult(BaseModel):
+    index: int  # position in the submitted batch
+    roll_no: str
+    status: str  # "marked", or why the mark was not stored
+    session_id: Optional[str] = None
+    distance_m: Optional[float] = None
+
+class BatchMarkResponse(BaseModel):
+    counts: Dict[str, int]
+    results: List[BatchMarkResult]
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr, constr
 from datetime import date
+from typing import List, Optional
 
 class TeacherRegister(BaseModel):
     full_name: str
@@ -10,3 +11,51 @@ class TeacherRegister(BaseModel):
     address: str
     employee_id: str
     subject: str
+
+
+# Responses. Times are IST text ("YYYY-MM-DD HH:MM:SS"), formatted by the query.
+class GeneratedOtp(BaseModel):
+    otp: str
+    session_id: str
+    subject: str
+    valid_till: str
+
+class SessionMark(BaseModel):
+    student_name: Optional[str]
+    roll_no: str
+    subject: Optional[str]
+    marked_at: Optional[str]
+
+class SessionItem(BaseModel):
+    session_id: str
+    otp: str
+    subject: str
+    start_time: str
+    end_time: str
+    present: int
+
+class SessionPage(BaseModel):
+    items: List[SessionItem]
+    next_cursor: Optional[str]
+
+class SummaryItem(BaseModel):
+    date: Optional[str] = None  # only when grouped by date
+    subject: str
+    sessions: int
+    present: int
+
+class SummaryPage(BaseModel):
+    items: List[SummaryItem]
+    next_cursor: Optional[str]
+
+class SessionTotals(BaseModel):
+    department: Optional[str] = None
+    semester: Optional[int] = None
+    subject: str
+    section: Optional[str] = None
+    held: int
+    marks: int
+
+class TeacherProfile(BaseModel):
+    full_name: Optional[str]
+    email: Optional[str]
@@ -0,0 +1,71 @@
+"""Production entry point.
+
+    cd uietbackend
+    python -m app.server --workers 4                 # HTTP + background workers in every process
+    python -m app.server --role api --workers 4      # HTTP only
+    python -m app.server --role worker               # outbox/archiver only, no HTTP
+
+Worker processes are spawned, not forked, and each builds its own Mongo
+client in the app lifespan, where it also warms the pool and caches before
+uvicorn starts accepting connections. SIGTERM stops accepting, waits up to
+--graceful-timeout for in-flight requests, then runs the lifespan shutdown.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import sys
+
+
+async def run_worker():
+    from app.main import app
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    async with app.router.lifespan_context(app):
+        await stop.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--role", choices=["all", "api", "readonly", "worker"], default=os.getenv("APP_ROLE", "all"))
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--graceful-timeout", type=float, default=float(os.getenv("GRACEFUL_TIMEOUT", "20")),
+                        help="seconds to let in-flight requests finish on shutdown")
+    parser.add_argument("--access-log", action="store_true", help="uvicorn access log (the app already logs a sample)")
+    args = parser.parse_args(argv)
+
+    # children read the role from the environment when they import the config
+    os.environ["APP_ROLE"] = args.role
+    from app.core.config import LOG_LEVEL, validate_config
+
+    try:
+        validate_config(args.role)
+    except RuntimeError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+
+    if args.role == "worker":
+        asyncio.run(run_worker())
+        return 0
+
+    import uvicorn
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        lifespan="on",
+        timeout_graceful_shutdown=args.graceful_timeout,
+        access_log=args.access_log,
+        log_level=LOG_LEVEL.lower(),
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 # app/utils/otp_utils.py
-import random
+import secrets
 import string
 
 def generate_otp(length=6):
     chars = string.ascii_uppercase + string.digits
-    return ''.join(random.choices(chars, k=length))
+    return ''.join(secrets.choice(chars) for _ in range(length))
@@ -0,0 +1,33 @@
+# app/utils/time_utils.py
+from datetime import datetime, time, timedelta
+import pytz
+
+IST = pytz.timezone('Asia/Kolkata')
+
+
+def ist_date_range(from_date=None, to_date=None):
+    """Mongo range filter (UTC) covering whole IST days from_date..to_date."""
+    query = {}
+    if from_date:
+        query["$gte"] = IST.localize(datetime.combine(from_date, time.min)).astimezone(pytz.utc)
+    if to_date:
+        query["$lt"] = IST.localize(datetime.combine(to_date + timedelta(days=1), time.min)).astimezone(pytz.utc)
+    return query or None
+
+
+# How the API shows times; the same pattern in Python and in $dateToString.
+IST_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def ist_string(expr):
+    """Aggregation expression rendering a stored UTC date as IST text (null stays null)."""
+    return {"$dateToString": {"format": IST_FORMAT, "date": expr, "timezone": "Asia/Kolkata"}}
+
+
+def format_ist(value):
+    """IST text of one datetime (naive values are UTC, as pymongo returns them)."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=pytz.utc)
+    return value.astimezone(IST).strftime(IST_FORMAT)
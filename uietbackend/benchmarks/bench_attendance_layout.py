@@ -0,0 +1,142 @@
+"""Storage size and latency of the row vs the session-bucketed attendance layout.
+
+For each layout, writes --sessions sessions of --class-size marks through
+app.db.attendance_store.insert_mark (with the given concurrency), then
+reports collection and index size from collStats and the latency of the
+reads the routers issue: a student's history, a teacher's marks for a batch
+of sessions, and the per-session present counts.
+
+    cd uietbackend
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_attendance_layout --sessions 300 --class-size 60
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("MONGO_DB_NAME", "uietattendance_bench")
+
+import pytz
+from bson import ObjectId
+
+from app.db import attendance_store, database
+from app.db.indexes import ensure_indexes
+from benchmarks.stats import summarize, print_table
+
+LAT, LNG = 30.7650, 76.7860
+SUBJECTS = ["dsa", "vlsi", "emt", "networks", "ai"]
+
+
+async def seed(db, args):
+    for name in ("approved_students", "otps", "attendance", "attendance_buckets"):
+        await db.drop_collection(name)
+    await ensure_indexes(db)
+    await db.approved_students.insert_many([
+        {"roll_no": f"L{i:05d}", "full_name": f"Student {i}", "section": "A", "semester": 5}
+        for i in range(args.class_size)
+    ])
+    start = datetime.utcnow().replace(tzinfo=pytz.utc) - timedelta(days=args.sessions)
+    sessions = []
+    for n in range(args.sessions):
+        begins = start + timedelta(days=n)
+        sessions.append({
+            "_id": ObjectId(),
+            "otp": f"{n:06d}",
+            "subject": SUBJECTS[n % len(SUBJECTS)],
+            "teacher_id": "LAYOUT",
+            "start_time": begins,
+            "end_time": begins + timedelta(minutes=10),
+            "location": {"lat": LAT, "lng": LNG},
+        })
+    await db.otps.insert_many(sessions)
+    return sessions
+
+
+async def timed(samples, coro):
+    started = time.perf_counter()
+    result = await coro
+    samples.append((time.perf_counter() - started) * 1000)
+    return result
+
+
+async def run(layout, db, sessions, args):
+    attendance_store.LAYOUT = layout
+    collection = "attendance_buckets" if layout == "buckets" else "attendance"
+    await db[collection].delete_many({})
+    rng = random.Random(args.seed)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    rows = []
+
+    writes = []
+
+    async def mark(session, i):
+        async with semaphore:
+            await timed(writes, attendance_store.insert_mark(
+                session, f"L{i:05d}", f"Student {i}", session["subject"], f"device-{i}",
+                session["start_time"] + timedelta(seconds=rng.randint(0, 599)), LAT, LNG,
+            ))
+
+    for session in sessions:
+        await attendance_store.create_session(session)
+        await asyncio.gather(*(mark(session, i) for i in range(args.class_size)))
+    rows.append({"layout": layout, "op": "insert_mark", **summarize(writes)})
+
+    student_reads = []
+    for i in range(args.class_size):
+        await timed(student_reads, attendance_store.student_marks(f"L{i:05d}").to_list(length=None))
+    rows.append({"layout": layout, "op": "student_marks", **summarize(student_reads)})
+
+    teacher_reads = []
+    session_ids = [s["_id"] for s in sessions]
+    for offset in range(0, len(session_ids), args.page):
+        await timed(teacher_reads, attendance_store.session_marks(session_ids[offset:offset + args.page]).to_list(length=None))
+    rows.append({"layout": layout, "op": "session_marks", **summarize(teacher_reads)})
+
+    count_reads = []
+    for offset in range(0, len(session_ids), args.page):
+        await timed(count_reads, db.otps.aggregate(
+            [{"$match": {"_id": {"$in": session_ids[offset:offset + args.page]}}}]
+            + attendance_store.present_count_stages()
+        ).to_list(length=None))
+    rows.append({"layout": layout, "op": "present_counts", **summarize(count_reads)})
+
+    stats = await db.command("collStats", collection)
+    size = {
+        "layout": layout,
+        "documents": stats["count"],
+        "size_kb": round(stats["size"] / 1024, 1),
+        "storage_kb": round(stats["storageSize"] / 1024, 1),
+        "index_kb": round(stats["totalIndexSize"] / 1024, 1),
+    }
+    return rows, size
+
+
+async def main(args):
+    db = database.connect()
+    try:
+        sessions = await seed(db, args)
+        latency_rows, size_rows = [], []
+        for layout in ("rows", "buckets"):
+            rows, size = await run(layout, db, sessions, args)
+            latency_rows.extend(rows)
+            size_rows.append(size)
+        print_table(size_rows, ["layout", "documents", "size_kb", "storage_kb", "index_kb"])
+        print()
+        print_table(latency_rows, ["layout", "op", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+        if not args.keep:
+            await database.client.drop_database(db.name)
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--class-size", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=60)
+    parser.add_argument("--page", type=int, default=20, help="sessions per teacher read")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database afterwards")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,126 @@
+"""Time to build a defaulter report for a synthetic term.
+
+Seeds --sections sections of --class-size students, --sessions sessions per
+subject per section and a mark for each student with probability
+--attendance, then times app.core.defaulters.build_report against the
+per-student approach it replaces (one history query and one sessions
+count per student and subject).
+
+    cd uietbackend
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_defaulter_report --sections 50 --sessions 40
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("MONGO_DB_NAME", "uietattendance_bench")
+
+import pytz
+from bson import ObjectId
+
+from app.core import defaulters
+from app.core.subject_catalog import subject_catalog
+from app.db import attendance_store, database
+from app.db.indexes import ensure_indexes
+from benchmarks.stats import print_table
+
+SUBJECTS = ["DSA", "VLSI", "EMT", "NETWORKS", "AI"]
+
+
+def section_name(n):
+    return f"S{n:03d}"
+
+
+async def seed(db, args):
+    for name in ("approved_students", "otps", "otps_archive", "attendance", "attendance_buckets",
+                 "defaulter_reports", "defaulter_rows", "subjects"):
+        await db.drop_collection(name)
+    await ensure_indexes(db)
+    await subject_catalog.refresh()
+    rng = random.Random(args.seed)
+    start = datetime.utcnow().replace(tzinfo=pytz.utc) - timedelta(days=120)
+
+    students = []
+    for s in range(args.sections):
+        for i in range(args.class_size):
+            students.append({"roll_no": f"{s:03d}{i:03d}", "full_name": f"Student {s}-{i}", "department": "ECE",
+                             "semester": 5, "section": section_name(s)})
+    await db.approved_students.insert_many(students)
+
+    marks = 0
+    for s in range(args.sections):
+        sessions, rows, buckets = [], [], []
+        rolls = [f"{s:03d}{i:03d}" for i in range(args.class_size)]
+        for subject in SUBJECTS:
+            for n in range(args.sessions):
+                begins = start + timedelta(days=n * 2, hours=SUBJECTS.index(subject))
+                session = {"_id": ObjectId(), "otp": f"{n:06d}", "subject": subject, "teacher_id": f"T{subject}",
+                           "department": "ECE", "semester": 5, "section": section_name(s), "start_time": begins, "end_time": begins + timedelta(minutes=10)}
+                sessions.append(session)
+                present = [r for r in rolls if rng.random() < args.attendance]
+                marks += len(present)
+                if args.layout == "rows":
+                    rows.extend({"roll_no": r, "student_name": r, "subject": subject.lower(), "otp": session["otp"],
+                                 "session_id": session["_id"], "visitor_id": r, "marked_at": begins} for r in present)
+                else:
+                    buckets.append({"_id": session["_id"], "subject": subject.lower(), "teacher_id": session["teacher_id"],
+                                    "otp": session["otp"], "count": len(present),
+                                    "marks": [{"r": r, "t": begins, "v": r} for r in present]})
+        await db.otps.insert_many(sessions)
+        if rows:
+            await db.attendance.insert_many(rows)
+        if buckets:
+            await db.attendance_buckets.insert_many(buckets)
+    return students, marks
+
+
+async def per_student(db, students):
+    """The approach the report replaces: a round trip per student and subject."""
+    for student in students:
+        await attendance_store.student_marks(student["roll_no"]).to_list(length=None)
+        for subject in SUBJECTS:
+            await db.otps.count_documents({"department": student["department"], "semester": student["semester"],
+                                           "subject": subject, "section": {"$in": [student["section"], None]}})
+
+
+async def main(args):
+    attendance_store.LAYOUT = args.layout
+    db = database.connect()
+    try:
+        students, marks = await seed(db, args)
+        print(f"{len(students)} students, {marks} marks ({args.layout} layout)")
+        rows = []
+
+        started = time.perf_counter()
+        report = await defaulters.build_report()
+        rows.append({"approach": "build_report", "seconds": round(time.perf_counter() - started, 2),
+                     "rows": report["rows"], "defaulters": report["defaulters"]})
+
+        sample = students[:args.per_student_sample]
+        started = time.perf_counter()
+        await per_student(db, sample)
+        elapsed = (time.perf_counter() - started) * len(students) / max(1, len(sample))
+        rows.append({"approach": f"per_student (extrapolated from {len(sample)})", "seconds": round(elapsed, 2),
+                     "rows": "", "defaulters": ""})
+
+        print_table(rows, ["approach", "seconds", "rows", "defaulters"])
+        if not args.keep:
+            await database.client.drop_database(db.name)
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--layout", choices=["rows", "buckets"], default="rows")
+    parser.add_argument("--sections", type=int, default=50)
+    parser.add_argument("--class-size", type=int, default=60)
+    parser.add_argument("--sessions", type=int, default=40, help="per subject per section")
+    parser.add_argument("--attendance", type=float, default=0.8, help="probability a student marks a session")
+    parser.add_argument("--per-student-sample", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark database")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,148 @@
+"""Latency of markAttendance before and after the single-round-trip path.
+
+Seeds a scratch database, then has every student submit a mark for one
+active OTP with the given concurrency, once through the legacy five-query
+sequence and once through app.api.student.mark_attendance. Each student
+submits twice at the same moment to mimic a double-tapped button.
+
+    cd uietbackend
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_mark_attendance --students 500 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("MONGO_DB_NAME", "uietattendance_bench")
+
+import pytz
+from fastapi import HTTPException, Request
+from pymongo.errors import DuplicateKeyError
+
+from app.api import student
+from app.core.otp_cache import otp_cache
+from app.core.rate_limit import rate_limiter
+from app.db import database
+from app.db.indexes import ensure_indexes
+from benchmarks.stats import summarize, print_table
+
+OTP = "BENCH1"
+LAT, LNG = 30.7650, 76.7860
+
+
+async def legacy_mark_attendance(req):
+    """The pre-redesign sequence: five dependent round trips, check-then-insert."""
+    roll_no = req.roll_no.upper()
+    subject = req.subject.strip().lower()
+    student_doc = await database.approved_students.find_one({"roll_no": roll_no})
+    if not student_doc:
+        raise HTTPException(status_code=404, detail="Student not found")
+    otp_doc = await database.otps.find_one({"otp": req.otp})
+    if not otp_doc:
+        raise HTTPException(status_code=404, detail="Invalid OTP")
+    now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
+    if await database.attendance.find_one({"roll_no": roll_no, "otp": req.otp}):
+        raise HTTPException(status_code=400, detail="Attendance already marked")
+    student.haversine_distance(req.lat, req.lng, otp_doc["location"]["lat"], otp_doc["location"]["lng"])
+    if await database.attendance.find_one({
+        "roll_no": roll_no,
+        "visitor_id": req.visitorId,
+        "marked_at": {"$gte": now_utc - timedelta(minutes=50)},
+    }):
+        raise HTTPException(status_code=400, detail="Attendance already marked from this device recently (within 50 minutes)")
+    await database.attendance.insert_one({
+        "roll_no": roll_no,
+        "student_name": student_doc["full_name"],
+        "subject": subject,
+        "otp": req.otp,
+        "visitor_id": req.visitorId,
+        "marked_at": now_utc,
+        "lat": req.lat,
+        "lng": req.lng,
+    })
+    return {"message": "Attendance marked successfully"}
+
+
+async def current_mark_attendance(req):
+    # called directly, so the session_claims dependency is not resolved: no token
+    request = Request({"type": "http", "headers": [], "client": ("127.0.0.1", 0)})
+    return await student.mark_attendance(req, request, claims=None)
+
+
+async def seed(db, students):
+    await db.drop_collection("approved_students")
+    await db.drop_collection("otps")
+    await db.drop_collection("attendance")
+    await ensure_indexes(db)
+    await db.approved_students.insert_many([
+        {"roll_no": f"B{i:05d}", "full_name": f"Student {i}", "section": "A", "semester": 5}
+        for i in range(students)
+    ])
+    now = datetime.utcnow().replace(tzinfo=pytz.utc)
+    await db.otps.insert_one({
+        "otp": OTP,
+        "subject": "DSA",
+        "teacher_id": "BENCH",
+        "start_time": now - timedelta(minutes=1),
+        "end_time": now + timedelta(hours=1),
+        "location": {"lat": LAT, "lng": LNG},
+    })
+
+
+async def run(label, handler, db, students, concurrency):
+    await db.attendance.delete_many({})
+    otp_cache.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    outcomes = {}
+
+    async def one(i):
+        req = student.MarkAttendanceRequest(
+            roll_no=f"B{i:05d}", otp=OTP, subject="dsa", visitorId=f"device-{i}", lat=LAT, lng=LNG
+        )
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await handler(req)
+                outcome = "200"
+            except HTTPException as exc:
+                outcome = str(exc.status_code)
+            except DuplicateKeyError as exc:  # the legacy path's check-then-insert race
+                outcome = type(exc).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(students) for _ in range(2)))
+    elapsed = time.perf_counter() - started
+
+    row = {"path": label, **summarize(latencies)}
+    row["req/s"] = round(len(latencies) / elapsed, 1)
+    row["records"] = await db.attendance.count_documents({})
+    row["outcomes"] = " ".join(f"{k}:{v}" for k, v in sorted(outcomes.items()))
+    return row
+
+
+async def main(args):
+    rate_limiter.enabled = False  # both paths are measured without the limiter in front
+    db = database.connect()
+    try:
+        await seed(db, args.students)
+        rows = [
+            await run("before", legacy_mark_attendance, db, args.students, args.concurrency),
+            await run("after", current_mark_attendance, db, args.students, args.concurrency),
+        ]
+        print_table(rows, ["path", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms", "req/s", "records", "outcomes"])
+        if not args.keep:
+            await database.client.drop_database(db.name)
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database afterwards")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,195 @@
+"""Cost of formatting and encoding the attendance history responses.
+
+Seeds one student with --history marks (and a teacher's --sessions sessions of
+--class-size marks), then times the student and teacher view-attendance paths
+both ways:
+
+  python: raw datetimes from the store, patched to UTC, converted with
+          astimezone(IST) + strftime row by row, then jsonable_encoder and
+          JSONResponse (what the routes did before)
+  server: marked_at formatted by $dateToString in the query, then validated and
+          dumped to JSON bytes through the typed response model (what FastAPI
+          does for a response_model with the default response class)
+
+Each op reports the query and the encode step separately. With --encode-only
+the query is skipped and both encoders run on --history synthetic rows, so the
+Python-side cost can be compared without a database.
+
+    cd uietbackend
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_view_serialization --history 5000
+    python -m benchmarks.bench_view_serialization --encode-only --history 5000
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+os.environ.setdefault("MONGO_DB_NAME", "uietattendance_bench")
+
+import pytz
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.schemas.student import AttendanceMark
+from app.schemas.teacher import SessionMark
+from app.utils.time_utils import IST, format_ist
+from benchmarks.stats import summarize, print_table
+
+SUBJECTS = ["dsa", "vlsi", "emt", "networks", "ai"]
+STUDENT_MARKS = TypeAdapter(List[AttendanceMark])
+SESSION_MARKS = TypeAdapter(List[SessionMark])
+
+
+def python_student(records):
+    result = []
+    for r in records:
+        marked_at = r.get("marked_at")
+        if marked_at and marked_at.tzinfo is None:
+            marked_at = marked_at.replace(tzinfo=pytz.utc)
+        result.append({
+            "subject": r["subject"],
+            "marked_at": marked_at.astimezone(IST).strftime("%Y-%m-%d %H:%M:%S") if marked_at else None,
+        })
+    return JSONResponse(jsonable_encoder(result)).body
+
+
+def python_teacher(records):
+    result = []
+    for r in records:
+        result.append({
+            "student_name": r.get("student_name"),
+            "roll_no": r.get("roll_no"),
+            "subject": r.get("subject"),
+            "marked_at": format_ist(r.get("marked_at")),
+        })
+    return JSONResponse(jsonable_encoder(result)).body
+
+
+def server_student(records):
+    return STUDENT_MARKS.dump_json(STUDENT_MARKS.validate_python(records))
+
+
+def server_teacher(records):
+    return SESSION_MARKS.dump_json(SESSION_MARKS.validate_python(records))
+
+
+def timed_encode(samples, encode, records):
+    started = time.perf_counter()
+    body = encode(records)
+    samples.append((time.perf_counter() - started) * 1000)
+    return body
+
+
+async def timed_query(samples, cursor):
+    started = time.perf_counter()
+    records = await cursor.to_list(length=None)
+    samples.append((time.perf_counter() - started) * 1000)
+    return records
+
+
+def synthetic(args):
+    start = datetime(2025, 1, 1)
+    raw = [{"student_name": "Student 0", "roll_no": "100000", "subject": SUBJECTS[i % len(SUBJECTS)],
+            "marked_at": start + timedelta(hours=i)} for i in range(args.history)]
+    formatted = [{**r, "marked_at": format_ist(r["marked_at"])} for r in raw]
+    return raw, formatted
+
+
+def encode_only(args):
+    raw, formatted = synthetic(args)
+    rows = []
+    for op, ways in (("student_view", (python_student, server_student)),
+                     ("teacher_view", (python_teacher, server_teacher))):
+        for way, encode, records in (("python", ways[0], raw), ("server", ways[1], formatted)):
+            samples = []
+            for _ in range(args.repeat):
+                timed_encode(samples, encode, records)
+            rows.append({"op": op, "way": way, "step": "encode", **summarize(samples)})
+    print_table(rows, ["op", "way", "step", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+
+
+async def seed(db, args):
+    for name in ("approved_students", "otps", "attendance", "attendance_buckets"):
+        await db.drop_collection(name)
+    await db.approved_students.insert_many([
+        {"roll_no": f"{100000 + i}", "full_name": f"Student {i}", "section": "A", "semester": 5}
+        for i in range(args.class_size)
+    ])
+    start = datetime.utcnow().replace(tzinfo=pytz.utc) - timedelta(days=365)
+    history = [{
+        "roll_no": "100000", "student_name": "Student 0", "subject": SUBJECTS[i % len(SUBJECTS)],
+        "session_id": ObjectId(), "visitor_id": "device-0", "marked_at": start + timedelta(hours=i),
+    } for i in range(args.history)]
+    session_ids = [ObjectId() for _ in range(args.sessions)]
+    marks = [{
+        "roll_no": f"{100000 + i}", "student_name": f"Student {i}", "subject": "dsa",
+        "session_id": session_id, "visitor_id": f"device-{i}", "marked_at": start + timedelta(days=n, seconds=i),
+    } for n, session_id in enumerate(session_ids) for i in range(1, args.class_size)]
+    await db.attendance.insert_many(history + marks)
+    await db.attendance.create_index("roll_no")
+    await db.attendance.create_index("session_id")
+    return session_ids
+
+
+async def with_database(args):
+    from app.db import attendance_store, database
+
+    db = database.connect()
+    try:
+        session_ids = await seed(db, args)
+        ops = (
+            ("student_view", lambda ist: attendance_store.student_marks("100000", ist=ist),
+             python_student, server_student),
+            ("teacher_view", lambda ist: attendance_store.session_marks(session_ids, ist=ist),
+             python_teacher, server_teacher),
+        )
+        rows = []
+        for layout in ("rows", "buckets"):
+            attendance_store.LAYOUT = layout
+            if layout == "buckets":
+                await migrate_to_buckets(db)
+            for op, query, before, after in ops:
+                for way, ist, encode in (("python", False, before), ("server", True, after)):
+                    queries, encodes = [], []
+                    for _ in range(args.repeat):
+                        records = await timed_query(queries, query(ist))
+                        timed_encode(encodes, encode, records)
+                    rows.append({"layout": layout, "op": op, "way": way, "step": "query", **summarize(queries)})
+                    rows.append({"layout": layout, "op": op, "way": way, "step": "encode", **summarize(encodes)})
+        print_table(rows, ["layout", "op", "way", "step", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+        if not args.keep:
+            await database.client.drop_database(db.name)
+    finally:
+        database.close()
+
+
+async def migrate_to_buckets(db):
+    buckets = {}
+    async for mark in db.attendance.find({}):
+        bucket = buckets.setdefault(mark["session_id"], {
+            "_id": mark["session_id"], "subject": mark["subject"], "teacher_id": "BENCH",
+            "otp": "000000", "count": 0, "marks": [],
+        })
+        bucket["marks"].append({"r": mark["roll_no"], "t": mark["marked_at"], "v": mark["visitor_id"]})
+        bucket["count"] += 1
+    await db.attendance_buckets.insert_many(list(buckets.values()))
+    await db.attendance_buckets.create_index("marks.r")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=int, default=2000, help="marks in the student's history")
+    parser.add_argument("--sessions", type=int, default=50, help="sessions in the teacher's view")
+    parser.add_argument("--class-size", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--encode-only", action="store_true", help="skip the database, compare the encoders only")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database afterwards")
+    args = parser.parse_args()
+    if args.encode_only:
+        encode_only(args)
+    else:
+        asyncio.run(with_database(args))
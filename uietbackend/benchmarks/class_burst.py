@@ -0,0 +1,286 @@
+"""Replay the class-start burst against the FastAPI app and check for regressions.
+
+A teacher calls /teacher/generate-otp, then every student of the section
+calls /student/check-otp/{otp} followed by /student/markAttendance, spread
+over --ramp-seconds with at most --concurrency requests in flight. Requests
+go straight to the ASGI app (no sockets). The database is seeded with
+--students approved students and several semesters of attendance history
+first.
+
+Reports p50/p95/p99 latency, throughput, error counts and Mongo round trips
+per request for every endpoint. With --baseline the run is compared against
+a stored result and the process exits with status 1 on a regression, or 2
+when the baseline file is missing.
+
+    cd uietbackend
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.class_burst --save-baseline benchmarks/baselines/class_burst.json
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.class_burst --baseline benchmarks/baselines/class_burst.json
+
+Latencies depend on the machine and the mongod, so no baseline is committed.
+CI produces one per runner: a job on the main branch runs with
+--save-baseline and keeps the file as a build artifact, and pull-request jobs
+on the same runner type fetch that artifact and run with --baseline. A
+missing artifact then fails the job instead of silently passing.
+
+Needs requirements-dev.txt on top of requirements.txt. --stand-in runs
+against the in-memory server of app.db.standin instead of mongod. It has no
+command monitoring, so round trips are not reported, and its latencies say
+nothing about mongod: use it to check the harness, not for baselines.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("MONGO_DB_NAME", "uietattendance_bench")
+os.environ.setdefault("OUTBOX_WORKER_ENABLED", "false")
+os.environ.setdefault("AUTH_SECRET", "class-burst")
+# every simulated student gets its own X-Forwarded-For address
+os.environ.setdefault("RATE_LIMIT_TRUST_FORWARDED", "true")
+
+import httpx
+import pytz
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from app.core.config import SUBJECTS
+from app.db import attendance_store, database
+from app.main import app
+from scripts.migrate_attendance_layout import to_buckets
+from benchmarks.stats import summarize, print_table
+
+LAT, LNG = 30.7650, 76.7860
+SECTIONS = "ABCDEFGHIJ"
+
+current_endpoint = contextvars.ContextVar("current_endpoint", default=None)
+
+
+class RoundTripCounter(monitoring.CommandListener):
+    """Counts commands sent to the server per endpoint being replayed."""
+
+    def __init__(self):
+        self.counts = {}
+
+    def started(self, event):
+        endpoint = current_endpoint.get()
+        if endpoint is not None:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+async def seed(db, args):
+    for name in await db.list_collection_names():
+        await db.drop_collection(name)
+
+    rng = random.Random(args.seed)
+    students = []
+    for i in range(args.students):
+        students.append({
+            "roll_no": f"{i:06d}",
+            "full_name": f"Student {i}",
+            "email": f"student{i}@example.com",
+            "dob": "2004-01-01",
+            "department": "ECE",
+            "semester": 5,
+            "section": SECTIONS[i % len(SECTIONS)],
+        })
+    await db.approved_students.insert_many(students)
+    await db.approved_teachers.insert_one({
+        "employee_id": "BURST1", "full_name": "Burst Teacher", "email": "t@example.com", "dob": "1980-01-01",
+    })
+
+    # past semesters of sessions for the burst section, ~85% turnout each
+    section_rolls = [s["roll_no"] for s in students if s["section"] == "A"]
+    start = datetime.utcnow().replace(tzinfo=pytz.utc) - timedelta(days=180 * args.history_semesters)
+    batch = []
+    for semester in range(args.history_semesters):
+        for subject in SUBJECTS:
+            for n in range(args.sessions_per_subject):
+                begins = start + timedelta(days=180 * semester + n * 3, hours=rng.randint(3, 10))
+                session = {
+                    "_id": ObjectId(),
+                    "otp": "".join(rng.choices("ABCDEFGHJKLMNPQRSTUVWXYZ23456789", k=6)),
+                    "subject": subject,
+                    "teacher_id": "BURST1",
+                    "start_time": begins,
+                    "end_time": begins + timedelta(minutes=10),
+                    "location": {"lat": LAT, "lng": LNG},
+                    "section": "A",
+                    "department": "ECE",
+                    "semester": 5,
+                }
+                await db.otps.insert_one(session)
+                for roll_no in section_rolls:
+                    if rng.random() < 0.85:
+                        batch.append({
+                            "roll_no": roll_no,
+                            "student_name": f"Student {int(roll_no)}",
+                            "subject": subject.lower(),
+                            "otp": session["otp"],
+                            "session_id": session["_id"],
+                            "visitor_id": f"device-{roll_no}",
+                            "marked_at": begins + timedelta(minutes=rng.randint(0, 9)),
+                            "lat": LAT,
+                            "lng": LNG,
+                        })
+                if len(batch) >= 5000:
+                    await db.attendance.insert_many(batch, ordered=False)
+                    batch = []
+    if batch:
+        await db.attendance.insert_many(batch, ordered=False)
+    if attendance_store.LAYOUT == "buckets":
+        await to_buckets(db)
+        await db.attendance.delete_many({})
+    return section_rolls
+
+
+async def replay(client, section_rolls, args, counter):
+    latencies = {}
+    statuses = {}
+    rng = random.Random(args.seed + 1)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def call(endpoint, method, url, **kwargs):
+        async with semaphore:
+            token = current_endpoint.set(endpoint)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                status = response.status_code
+            except Exception as exc:
+                response = None
+                status = type(exc).__name__
+            finally:
+                current_endpoint.reset(token)
+            latencies.setdefault(endpoint, []).append((time.perf_counter() - started) * 1000)
+            statuses.setdefault(endpoint, {}).setdefault(status, 0)
+            statuses[endpoint][status] += 1
+            return response
+
+    started = time.perf_counter()
+    response = await call("generate-otp", "POST", "/teacher/generate-otp", json={
+        "employee_id": "BURST1", "subject": "DSA", "duration_minutes": 10, "lat": LAT, "lng": LNG,
+        "department": "ECE", "semester": 5, "section": "A",
+    })
+    otp = response.json()["otp"]
+
+    async def student(roll_no):
+        await asyncio.sleep(rng.uniform(0, args.ramp_seconds))
+        headers = {"X-Forwarded-For": f"10.{int(roll_no) // 65536}.{int(roll_no) // 256 % 256}.{int(roll_no) % 256}"}
+        await call("check-otp", "GET", f"/student/check-otp/{otp}", headers=headers)
+        await call("markAttendance", "POST", "/student/markAttendance", headers=headers, json={
+            "roll_no": roll_no,
+            "otp": otp,
+            "subject": "DSA",
+            "visitorId": f"device-{roll_no}-burst",
+            "lat": LAT + rng.uniform(-0.0003, 0.0003),
+            "lng": LNG + rng.uniform(-0.0003, 0.0003),
+        })
+
+    await asyncio.gather(*(student(r) for r in section_rolls))
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for endpoint, samples in latencies.items():
+        row = summarize(samples)
+        row["req_per_s"] = round(len(samples) / elapsed, 1)
+        errors = sum(n for s, n in statuses[endpoint].items() if not (isinstance(s, int) and s < 400))
+        row["errors"] = errors
+        row["round_trips_per_req"] = (
+            round(counter.counts.get(endpoint, 0) / len(samples), 2) if counter is not None else None
+        )
+        results[endpoint] = row
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for endpoint, base in baseline.items():
+        row = results.get(endpoint)
+        if row is None:
+            regressions.append(f"{endpoint}: missing from this run")
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if row[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{endpoint}: {metric} {row[metric]} > baseline {base[metric]} (+{tolerance:.0%})")
+        if base.get("round_trips_per_req") is not None and row["round_trips_per_req"] is not None:
+            if row["round_trips_per_req"] > base["round_trips_per_req"] + 0.05:
+                regressions.append(
+                    f"{endpoint}: round trips {row['round_trips_per_req']} > baseline {base['round_trips_per_req']}"
+                )
+        if row["errors"] > base["errors"]:
+            regressions.append(f"{endpoint}: errors {row['errors']} > baseline {base['errors']}")
+    return regressions
+
+
+async def main(args):
+    if args.baseline and not os.path.exists(args.baseline):
+        print(f"error: no baseline at {args.baseline}; create one with --save-baseline", file=sys.stderr)
+        return 2
+    attendance_store.LAYOUT = args.layout
+    counter = None
+    if args.stand_in:
+        from app.db import standin
+        standin.use()
+    else:
+        counter = RoundTripCounter()
+        database.set_client_factory(
+            lambda *a, **kw: AsyncIOMotorClient(*a, **{**kw, "event_listeners": kw.get("event_listeners", []) + [counter]})
+        )
+
+    async with app.router.lifespan_context(app):
+        print(f"seeding {args.students} students, {args.history_semesters} semesters of history ...", file=sys.stderr)
+        section_rolls = await seed(database.db, args)
+        if counter is not None:
+            counter.counts.clear()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results = await replay(client, section_rolls, args, counter)
+        if not args.keep and not args.stand_in:
+            await database.client.drop_database(database.db.name)
+
+    rows = [{"endpoint": endpoint, **row} for endpoint, row in results.items()]
+    print_table(rows, ["endpoint", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms", "req_per_s", "errors", "round_trips_per_req"])
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline) or ".", exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=2000, help="approved students across %d sections" % len(SECTIONS))
+    parser.add_argument("--history-semesters", type=int, default=2)
+    parser.add_argument("--sessions-per-subject", type=int, default=30, help="past sessions per subject per semester")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--ramp-seconds", type=float, default=5.0, help="spread of student arrivals")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--layout", choices=["rows", "buckets"], default=attendance_store.LAYOUT,
+                        help="attendance storage layout (default: ATTENDANCE_LAYOUT)")
+    parser.add_argument("--stand-in", action="store_true", help="use mongomock_motor instead of MONGO_URI")
+    parser.add_argument("--baseline", help="fail when this run regresses against the stored result")
+    parser.add_argument("--save-baseline", help="write this run's results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed latency increase over baseline")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database afterwards")
+    sys.exit(asyncio.run(main(parser.parse_args())))
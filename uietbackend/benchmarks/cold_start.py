@@ -0,0 +1,87 @@
+"""Cold start and shutdown time of the production server.
+
+Starts `python -m app.server` --runs times, polls / until it answers, and
+reports the time to first successful response, the per-phase startup
+breakdown the workers export as app_startup_seconds, and the time from
+SIGTERM to exit.
+
+    cd uietbackend
+    MONGO_URI=mongodb://localhost:27017 ADMIN_ID=a ADMIN_PASSWORD=b AUTH_SECRET=x \\
+        python -m benchmarks.cold_start --workers 2 --runs 5
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.stats import summarize, print_table
+
+
+def startup_phases(base_url):
+    phases = {}
+    for line in httpx.get(f"{base_url}/metrics").text.splitlines():
+        if line.startswith("app_startup_seconds{"):
+            labels, value = line.rsplit(" ", 1)
+            phase = labels.split('phase="', 1)[1].split('"', 1)[0]
+            phases[phase] = round(float(value) * 1000, 1)
+    return phases
+
+
+def run_once(args):
+    env = {**os.environ, "OUTBOX_WORKER_ENABLED": "false", "OTP_ARCHIVE_ENABLED": "false"}
+    command = [sys.executable, "-m", "app.server", "--role", args.role,
+               "--port", str(args.port), "--workers", str(args.workers)]
+    base_url = f"http://127.0.0.1:{args.port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"server exited with status {process.returncode} before becoming ready")
+            try:
+                if httpx.get(base_url + "/", timeout=0.5).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.perf_counter() - started > args.timeout:
+                raise RuntimeError("server did not become ready in time")
+            time.sleep(0.02)
+        ready = time.perf_counter() - started
+        phases = startup_phases(base_url)
+    finally:
+        stopping = time.perf_counter()
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=60)
+    return ready, time.perf_counter() - stopping, phases
+
+
+def main(args):
+    ready_ms, shutdown_ms, phase_rows = [], [], []
+    for run in range(args.runs):
+        ready, shutdown, phases = run_once(args)
+        ready_ms.append(ready * 1000)
+        shutdown_ms.append(shutdown * 1000)
+        phase_rows.append({"run": run + 1, **phases})
+
+    columns = ["run"] + sorted({k for row in phase_rows for k in row if k != "run"})
+    print("startup phases of the worker that answered (ms)")
+    print_table(phase_rows, columns)
+    print()
+    print_table([
+        {"measure": "time_to_ready", **summarize(ready_ms)},
+        {"measure": "shutdown", **summarize(shutdown_ms)},
+    ], ["measure", "count", "p50_ms", "p95_ms", "max_ms"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--role", choices=["all", "api", "readonly"], default="api")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60)
+    main(parser.parse_args())
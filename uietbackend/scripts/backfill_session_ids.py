@@ -0,0 +1,29 @@
+"""Stamp session_id on attendance records written before sessions had IDs.
+
+A record belongs to the OTP session with the same code whose validity window
+contains its marked_at time. Safe to re-run: only records without a
+session_id are touched. Background workers run this once on their first
+start (see app.core.otp_sessions.backfill_session_ids_once); the script is
+for re-running it by hand, e.g. after restoring older records.
+
+    cd uietbackend
+    python -m scripts.backfill_session_ids
+"""
+import asyncio
+
+from app.core.otp_sessions import backfill_session_ids
+from app.db import database
+
+
+async def main(batch_size=500):
+    db = database.connect()
+    try:
+        updated = await backfill_session_ids(batch_size)
+        orphans = await db.attendance.count_documents({"session_id": {"$exists": False}})
+        print(f"updated {updated} records; {orphans} records matched no session")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
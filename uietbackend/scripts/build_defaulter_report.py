@@ -0,0 +1,36 @@
+"""Build a defaulter report snapshot, e.g. from cron at the end of a term.
+
+The snapshot is then served by GET /admin/reports/defaulters/{report_id}.
+
+    cd uietbackend
+    python -m scripts.build_defaulter_report --from 2025-07-21 --to 2025-11-28 --label "2025 odd semester"
+"""
+import argparse
+import asyncio
+from datetime import date
+
+from app.core.defaulters import build_report
+from app.core.subject_catalog import subject_catalog
+from app.db import database
+
+
+async def main(args):
+    database.connect()
+    try:
+        await subject_catalog.refresh()
+        with database.using("report"):
+            report = await build_report(args.from_date, args.to_date, args.label)
+        if report is None:
+            raise SystemExit("a defaulter report is already being built")
+        print(f"report {report['_id']}: {report['students']} students, {report['rows']} rows, "
+              f"{report['defaulters']} below {report['threshold']:g}% in {report['elapsed_ms']} ms")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--from", dest="from_date", type=date.fromisoformat)
+    parser.add_argument("--to", dest="to_date", type=date.fromisoformat)
+    parser.add_argument("--label")
+    asyncio.run(main(parser.parse_args()))
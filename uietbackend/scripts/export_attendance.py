@@ -0,0 +1,40 @@
+"""Export the full attendance history for analytics.
+
+Writes one row per mark, joined with its session and student, under --out
+as semester=<n>/subject=<key>/part-0.parquet (or .csv.gz with --format csv
+or without pyarrow). Semester and department come from the session; for
+sessions created before generate-otp recorded them they come from the
+student's current record, so such marks of a student who has since moved
+up are filed under the new semester. Read it back with e.g.
+
+    pyarrow.dataset.dataset(out, partitioning="hive")
+
+    cd uietbackend
+    python -m scripts.export_attendance --out /data/attendance --from 2025-07-21
+"""
+import argparse
+import asyncio
+import json
+from datetime import date
+
+from app.core.bulk_export import export_attendance, formats
+from app.db import database
+
+
+async def main(args):
+    database.connect()
+    try:
+        with database.using("report"):
+            manifest = await export_attendance(args.out, args.format, args.from_date, args.to_date)
+        print(json.dumps(manifest, indent=2))
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument("--format", choices=formats(), default=formats()[0])
+    parser.add_argument("--from", dest="from_date", type=date.fromisoformat)
+    parser.add_argument("--to", dest="to_date", type=date.fromisoformat)
+    asyncio.run(main(parser.parse_args()))
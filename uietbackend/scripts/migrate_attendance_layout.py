@@ -0,0 +1,106 @@
+"""Copy attendance between the row and the session-bucketed layouts.
+
+--to buckets (default) groups every attendance record that has a session_id
+into one attendance_buckets document per session, merged on _id so re-runs
+replace buckets rather than duplicate them. Run scripts.backfill_session_ids
+first; records without a session_id are counted and left out.
+
+--to rows expands buckets back into attendance records (names are taken from
+approved_students) for rolling back; records already present are skipped.
+
+Neither direction deletes the source collection. Set ATTENDANCE_LAYOUT once
+the copy is done and drop the old collection after checking the app.
+
+    cd uietbackend
+    python -m scripts.migrate_attendance_layout --to buckets
+"""
+import argparse
+import asyncio
+
+from pymongo.errors import BulkWriteError
+
+from app.db import database
+
+
+async def to_buckets(db):
+    await db.attendance.aggregate([
+        {"$match": {"session_id": {"$exists": True}}},
+        {"$sort": {"session_id": 1, "marked_at": 1}},
+        {"$group": {
+            "_id": "$session_id",
+            "subject": {"$first": {"$toLower": "$subject"}},
+            "otp": {"$first": "$otp"},
+            "count": {"$sum": 1},
+            "marks": {"$push": {
+                "r": "$roll_no", "t": "$marked_at", "v": "$visitor_id", "lat": "$lat", "lng": "$lng",
+            }},
+        }},
+        {"$lookup": {"from": "otps", "localField": "_id", "foreignField": "_id", "as": "live"}},
+        {"$lookup": {"from": "otps_archive", "localField": "_id", "foreignField": "_id", "as": "archived"}},
+        {"$addFields": {"teacher_id": {"$first": {"$concatArrays": ["$live.teacher_id", "$archived.teacher_id"]}}}},
+        {"$project": {"live": 0, "archived": 0}},
+        {"$merge": {"into": "attendance_buckets", "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ], allowDiskUse=True).to_list(length=None)
+
+    buckets = await db.attendance_buckets.count_documents({})
+    skipped = await db.attendance.count_documents({"session_id": {"$exists": False}})
+    return buckets, skipped
+
+
+async def to_rows(db, batch_size=1000):
+    rows = db.attendance_buckets.aggregate([
+        {"$unwind": "$marks"},
+        {"$lookup": {"from": "approved_students", "localField": "marks.r", "foreignField": "roll_no", "as": "student"}},
+        {"$project": {
+            "_id": 0,
+            "roll_no": "$marks.r",
+            "student_name": {"$ifNull": [{"$arrayElemAt": ["$student.full_name", 0]}, "Unknown"]},
+            "subject": 1,
+            "otp": 1,
+            "session_id": "$_id",
+            "visitor_id": "$marks.v",
+            "marked_at": "$marks.t",
+            "lat": "$marks.lat",
+            "lng": "$marks.lng",
+        }},
+    ], allowDiskUse=True, batchSize=batch_size)
+
+    inserted = 0
+    batch = []
+
+    async def flush():
+        nonlocal inserted
+        try:
+            result = await db.attendance.insert_many(batch, ordered=False)
+            inserted += len(result.inserted_ids)
+        except BulkWriteError as exc:
+            # the unique (session_id, roll_no) index rejects rows that already exist
+            inserted += exc.details["nInserted"]
+
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            await flush()
+            batch = []
+    if batch:
+        await flush()
+    return inserted
+
+
+async def main(to):
+    db = database.connect()
+    try:
+        if to == "buckets":
+            buckets, skipped = await to_buckets(db)
+            print(f"attendance_buckets: {buckets} sessions; {skipped} records without a session_id left out")
+        else:
+            inserted = await to_rows(db)
+            print(f"attendance: {inserted} records inserted")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--to", choices=["buckets", "rows"], default="buckets")
+    asyncio.run(main(parser.parse_args().to))
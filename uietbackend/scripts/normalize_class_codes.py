@@ -0,0 +1,44 @@
+"""Upper-case department and section on records stored before they were normalised.
+
+Registration, roster import and generate-otp now store both upper-cased and
+trimmed, and sessions, summaries and report filters are matched exactly, so
+"cse" on an older record would never meet "CSE" on a newer one. Safe to
+re-run: only values that change are written. Run scripts.rebuild_summaries
+afterwards so session_summary picks up the new department of older sessions.
+
+    cd uietbackend
+    python -m scripts.normalize_class_codes
+"""
+import asyncio
+
+from app.db import database
+
+COLLECTIONS = {
+    "pending_students": ("department", "section"),
+    "approved_students": ("department", "section"),
+    "rejected_students": ("department", "section"),
+    "otps": ("department", "section"),
+    "otps_archive": ("department", "section"),
+    "subjects": ("department",),
+}
+
+
+async def main():
+    db = database.connect()
+    try:
+        for name, fields in COLLECTIONS.items():
+            updated = 0
+            for field in fields:
+                normalised = {"$toUpper": {"$trim": {"input": f"${field}"}}}
+                result = await db[name].update_many(
+                    {field: {"$type": "string"}, "$expr": {"$ne": [f"${field}", normalised]}},
+                    [{"$set": {field: normalised}}],
+                )
+                updated += result.modified_count
+            print(f"{name}: {updated} updates")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
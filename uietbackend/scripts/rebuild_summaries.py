@@ -0,0 +1,27 @@
+"""Recompute attendance_summary and session_summary from the raw collections.
+
+Run after fixing attendance or otps data by hand, or after
+scripts.backfill_session_ids.
+
+    cd uietbackend
+    python -m scripts.rebuild_summaries
+"""
+import asyncio
+
+from app.core.summaries import rebuild_summaries
+from app.db import database
+
+
+async def main():
+    db = database.connect()
+    try:
+        await rebuild_summaries()
+        students = await db.attendance_summary.count_documents({})
+        sessions = await db.session_summary.count_documents({})
+        print(f"attendance_summary: {students} rows; session_summary: {sessions} rows")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,22 @@
+import asyncio
+import pytest
+from app.core.otp_cache import otp_cache
+from app.db import database, standin
+from app.db.indexes import INDEXES
+
+
+@pytest.fixture
+def db():
+    """A fresh in-memory database (app.db.standin) with the attendance indexes."""
+    standin.use()
+    connected = database.connect()
+
+    async def create_indexes():
+        for name in ("attendance", "attendance_buckets"):
+            await connected[name].create_indexes(INDEXES[name])
+
+    asyncio.run(create_indexes())
+    otp_cache.clear()
+    yield connected
+    otp_cache.clear()
+    database.close()
@@ -0,0 +1,52 @@
+import asyncio
+import httpx
+import pytest
+from app.api import admin
+from app.core.session_tokens import issue_token
+from app.main import app
+
+ADMIN = {"Authorization": f"Bearer {issue_token('admin', 'admin', 'Admin')}"}
+
+
+def _post(path, headers=None):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post(path, headers=headers or {})
+    return asyncio.run(run())
+
+
+def test_single_decisions_need_an_admin_token():
+    assert _post("/admin/approve/student/101").status_code == 401
+    teacher = {"Authorization": f"Bearer {issue_token('teacher', 'T1', 'Teacher')}"}
+    assert _post("/admin/reject/teacher/T1", teacher).status_code == 403
+
+
+def test_without_transactions_a_decision_is_503_and_moves_nothing(db):
+    asyncio.run(db.pending_students.insert_one({"roll_no": "101", "full_name": "Asha", "email": "a@x.com"}))
+
+    response = _post("/admin/approve/student/101", ADMIN)
+
+    assert response.status_code == 503
+    assert "transactions" in response.json()["detail"]
+    assert asyncio.run(db.pending_students.count_documents({})) == 1
+    assert asyncio.run(db.approved_students.count_documents({})) == 0
+
+
+@pytest.mark.parametrize("counts, status, message", [
+    ({"approved": 1}, 200, "Student approved"),
+    ({"already_approved": 1}, 409, "Student already approved"),
+    ({"not_found": 1}, 404, "Student not found"),
+])
+def test_single_approve_goes_through_the_bulk_move(monkeypatch, counts, status, message):
+    calls = []
+
+    async def bulk_move(kind, outcome, data):
+        calls.append((kind, outcome, data.ids))
+        return {"counts": counts, "results": []}
+
+    monkeypatch.setattr(admin, "_bulk_move", bulk_move)
+    response = _post("/admin/approve/student/101", ADMIN)
+
+    assert calls == [("student", "approved", ["101"])]
+    assert response.status_code == status
+    assert message in response.text
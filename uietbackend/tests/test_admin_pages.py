@@ -0,0 +1,67 @@
+import asyncio
+import httpx
+from app.core.session_tokens import issue_token
+from app.db.versions import bump
+from app.main import app
+
+ADMIN = {"Authorization": f"Bearer {issue_token('admin', 'admin', 'Admin')}"}
+URL = "/admin/page/approved/students"
+
+
+async def _seed(db):
+    await db.approved_students.insert_many([
+        {"roll_no": str(100 + i), "full_name": f"Student {i}", "dob": "2004-01-01",
+         "department": "CSE" if i % 3 else "ECE", "semester": 3, "section": "A"}
+        for i in range(10)
+    ])
+
+
+def _client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", headers=ADMIN)
+
+
+def test_pages_follow_the_cursor_through_a_filter(db):
+    async def run():
+        await _seed(db)
+        pages, after = [], None
+        async with _client() as client:
+            while True:
+                params = {"limit": 3, "department": "cse", **({"after": after} if after else {})}
+                response = await client.get(URL, params=params)
+                assert response.status_code == 200
+                pages.append(response.json())
+                after = response.json()["next_cursor"]
+                if after is None:
+                    break
+            bad_cursor = await client.get(URL, params={"after": "nope"})
+        return pages, bad_cursor
+
+    pages, bad_cursor = asyncio.run(run())
+    rolls = [item["roll_no"] for page in pages for item in page["items"]]
+    assert rolls == ["101", "102", "104", "105", "107", "108"]
+    assert [len(page["items"]) for page in pages] == [3, 3]
+    assert all(page["total"] == 6 for page in pages)
+    assert all("dob" not in item for page in pages for item in page["items"])
+    assert bad_cursor.status_code == 400
+
+
+def test_etag_answers_304_until_the_collection_is_bumped(db):
+    async def run():
+        await _seed(db)
+        async with _client() as client:
+            first = await client.get(URL, params={"limit": 5})
+            etag = first.headers["ETag"]
+            unchanged = await client.get(URL, params={"limit": 5}, headers={"If-None-Match": etag})
+            other_page = await client.get(URL, params={"limit": 4}, headers={"If-None-Match": etag})
+            await db.approved_students.insert_one({"roll_no": "200", "full_name": "New", "dob": "2004-01-01"})
+            await bump("approved_students")
+            changed = await client.get(URL, params={"limit": 5}, headers={"If-None-Match": etag})
+        return first, unchanged, other_page, changed
+
+    first, unchanged, other_page, changed = asyncio.run(run())
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "private, no-cache"
+    assert unchanged.status_code == 304 and unchanged.content == b""
+    assert other_page.status_code == 200
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]
+    assert changed.json()["total"] == 11
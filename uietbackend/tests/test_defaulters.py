@@ -0,0 +1,34 @@
+from app.core import defaulters
+from app.core.subject_catalog import SubjectCatalog
+
+
+def test_held_sessions_are_counted_per_department(monkeypatch):
+    # DSA is taught in both CSE and ECE semester 3; only the ECE sessions
+    # count towards an ECE student
+    monkeypatch.setattr(defaulters, "subject_catalog", SubjectCatalog(["DSA"]))
+    students = [
+        {"roll_no": "1", "full_name": "Asha", "department": "CSE", "semester": 3, "section": "A"},
+        {"roll_no": "2", "full_name": "Ravi", "department": "ECE", "semester": 3, "section": "A"},
+    ]
+    held = {
+        ("CSE", 3, "dsa", "A"): 10,
+        ("CSE", 3, "dsa", None): 2,
+        ("ECE", 3, "dsa", "A"): 4,
+        ("ECE", 5, "dsa", "A"): 7,
+    }
+    attended = {("1", "dsa"): 9, ("2", "dsa"): 3}
+
+    rows = {row["roll_no"]: row for row in defaulters.report_rows("r", students, held, attended)}
+
+    assert rows["1"]["held"] == 12
+    assert rows["1"]["percentage"] == 75.0
+    assert rows["2"]["held"] == 4
+    assert rows["2"]["percentage"] == 75.0
+
+
+def test_subject_not_held_for_the_class_has_no_row(monkeypatch):
+    monkeypatch.setattr(defaulters, "subject_catalog", SubjectCatalog(["DSA", "VLSI"]))
+    students = [{"roll_no": "1", "full_name": "Asha", "department": "CSE", "semester": 3, "section": "B"}]
+    held = {("CSE", 3, "dsa", "A"): 10, ("ECE", 3, "vlsi", "B"): 5}
+
+    assert list(defaulters.report_rows("r", students, held, {})) == []
@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+import pytest
+import pytz
+from bson import ObjectId
+from app.api import student
+from app.db import attendance_store
+from app.main import app
+
+LAT, LNG = 30.7650, 76.7860
+
+
+@pytest.fixture(params=["rows", "buckets"])
+def layout(request, monkeypatch):
+    monkeypatch.setattr(attendance_store, "LAYOUT", request.param)
+    monkeypatch.setattr(student.rate_limiter, "enabled", False)
+    return request.param
+
+
+async def _seed(db, *codes):
+    await db.approved_students.insert_one({"roll_no": "101", "full_name": "Asha", "department": "CSE", "semester": 3})
+    now = datetime.now(pytz.utc)
+    sessions = []
+    for code in codes:
+        session = {
+            "_id": ObjectId(), "otp": code, "subject": "DSA", "teacher_id": "T1",
+            "start_time": now - timedelta(minutes=1), "end_time": now + timedelta(minutes=10),
+            "location": {"lat": LAT, "lng": LNG}, "department": "CSE", "semester": 3, "section": None,
+        }
+        await db.otps.insert_one(session)
+        await attendance_store.create_session(session)
+        sessions.append(session)
+    return sessions
+
+
+async def _stored(db, session):
+    if attendance_store.LAYOUT == "buckets":
+        bucket = await db.attendance_buckets.find_one({"_id": session["_id"]})
+        return len(bucket["marks"]) if bucket else 0
+    return await db.attendance.count_documents({"session_id": session["_id"]})
+
+
+def _mark(client, otp):
+    return client.post("/student/markAttendance", json={
+        "roll_no": "101", "subject": "DSA", "otp": otp, "visitorId": "device-1", "lat": LAT, "lng": LNG,
+    })
+
+
+def _client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_same_otp_twice_is_already_marked(db, layout):
+    async def run():
+        session, = await _seed(db, "111111")
+        async with _client() as client:
+            first = await _mark(client, "111111")
+            second = await _mark(client, "111111")
+        return first, second, await _stored(db, session)
+
+    first, second, stored = asyncio.run(run())
+    assert first.status_code == 200
+    assert second.status_code == 400
+    assert second.json()["detail"] == "Attendance already marked"
+    assert stored == 1
+
+
+def test_same_device_in_another_session_is_refused(db, layout):
+    async def run():
+        earlier, later = await _seed(db, "111111", "222222")
+        async with _client() as client:
+            first = await _mark(client, "111111")
+            second = await _mark(client, "222222")
+        return first, second, await _stored(db, earlier), await _stored(db, later)
+
+    first, second, earlier, later = asyncio.run(run())
+    assert first.status_code == 200
+    assert second.status_code == 400
+    assert second.json()["detail"] == "Attendance already marked from this device recently (within 50 minutes)"
+    assert (earlier, later) == (1, 0)
+
+
+def test_concurrent_double_tap_stores_one_mark(db, layout, monkeypatch):
+    # both submits pass the duplicate check before either inserts, so only
+    # the store's uniqueness (DuplicateKeyError) can turn the second away
+    check = student._student_and_marks
+    barrier = None
+
+    async def check_together(*args):
+        found = await check(*args)
+        await barrier.wait()
+        return found
+
+    monkeypatch.setattr(student, "_student_and_marks", check_together)
+
+    async def run():
+        nonlocal barrier
+        barrier = asyncio.Barrier(2)
+        session, = await _seed(db, "111111")
+        async with _client() as client:
+            responses = await asyncio.gather(_mark(client, "111111"), _mark(client, "111111"))
+        return responses, await _stored(db, session)
+
+    responses, stored = asyncio.run(run())
+    assert sorted(r.status_code for r in responses) == [200, 400]
+    assert [r.json()["detail"] for r in responses if r.status_code == 400] == ["Attendance already marked"]
+    assert stored == 1
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytz
+from app.core import otp_cache as otp_cache_module
+from app.core.otp_cache import OtpCache
+
+
+class FakeOtps:
+    """Stands in for the otps collection and counts queries."""
+
+    def __init__(self, *docs):
+        self.docs = list(docs)
+        self.queries = 0
+
+    async def find_one(self, query, sort=None):
+        self.queries += 1
+        await asyncio.sleep(0)  # let concurrent callers pile up on the same load
+        return next((d for d in self.docs if d["otp"] == query["otp"]), None)
+
+
+def _session(otp, minutes=10):
+    now = datetime.now(pytz.utc)
+    return {"otp": otp, "start_time": now, "end_time": now + timedelta(minutes=minutes)}
+
+
+def test_unknown_code_is_cached_for_the_negative_ttl(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(otp_cache_module, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    fake = FakeOtps()
+    monkeypatch.setattr(otp_cache_module, "otps", fake)
+    cache = OtpCache(negative_ttl=5)
+
+    async def run():
+        results = [await cache.get("123456"), await cache.get("123456")]
+        fake.docs.append(_session("123456"))  # generated on another worker
+        clock[0] += 4
+        results.append(await cache.get("123456"))
+        clock[0] += 2
+        results.append(await cache.get("123456"))
+        return results
+
+    first, cached, still_cached, reloaded = asyncio.run(run())
+    assert first is None and cached is None and still_cached is None
+    assert reloaded["otp"] == "123456"
+    assert fake.queries == 2
+    assert cache.stats()["negative_hits"] == 2
+
+
+def test_expired_session_is_kept_only_for_the_negative_ttl(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(otp_cache_module, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    fake = FakeOtps(_session("123456", minutes=-1))
+    monkeypatch.setattr(otp_cache_module, "otps", fake)
+    cache = OtpCache(negative_ttl=5)
+
+    async def run():
+        await cache.get("123456")
+        clock[0] += 6
+        await cache.get("123456")
+
+    asyncio.run(run())
+    assert fake.queries == 2
+
+
+def test_concurrent_misses_share_one_query(monkeypatch):
+    fake = FakeOtps(_session("654321"))
+    monkeypatch.setattr(otp_cache_module, "otps", fake)
+    cache = OtpCache()
+
+    async def run():
+        return await asyncio.gather(*(cache.get("654321") for _ in range(20)))
+
+    docs = asyncio.run(run())
+    assert fake.queries == 1
+    assert all(doc["otp"] == "654321" for doc in docs)
+    assert cache.stats()["misses"] == 20
@@ -0,0 +1,116 @@
+import asyncio
+import smtplib
+from datetime import datetime, timedelta
+import pytz
+from app.core.outbox import OutboxWorker, queue_emails
+
+
+class FakeConnection:
+    """Records deliveries; failures maps an address to the errors its next sends raise."""
+
+    is_open = False
+
+    def __init__(self):
+        self.sent = []
+        self.failures = {}
+
+    def send(self, to, subject, message):
+        errors = self.failures.get(to)
+        if errors:
+            raise errors.pop(0)
+        self.sent.append(to)
+
+    def close(self):
+        pass
+
+
+def _worker(**options):
+    return OutboxWorker(connection_factory=FakeConnection, backoff_seconds=60, **options)
+
+
+def _utc(value):
+    return value if value.tzinfo else value.replace(tzinfo=pytz.utc)
+
+
+async def _make_due(db):
+    await db.email_outbox.update_many({"status": "pending"}, {"$set": {"next_attempt_at": datetime.now(pytz.utc)}})
+
+
+def test_claim_leases_due_messages_to_one_worker(db):
+    async def run():
+        now = datetime.now(pytz.utc)
+        await queue_emails([("a@x.com", "s", "m"), ("b@x.com", "s", "m")])
+        await db.email_outbox.insert_many([
+            {"to": "later@x.com", "status": "pending", "attempts": 1, "next_attempt_at": now + timedelta(hours=1)},
+            {"to": "crashed@x.com", "status": "sending", "attempts": 0, "next_attempt_at": now,
+             "locked_until": now - timedelta(seconds=1)},
+            {"to": "busy@x.com", "status": "sending", "attempts": 0, "next_attempt_at": now,
+             "locked_until": now + timedelta(minutes=5)},
+        ])
+        first, second = _worker(), _worker()
+        lease_id, batch = await first._claim_batch()
+        _, nothing = await second._claim_batch()
+        leased = await db.email_outbox.find({"lease_id": lease_id}).to_list(length=None)
+        return batch, nothing, leased
+
+    batch, nothing, leased = asyncio.run(run())
+    assert sorted(doc["to"] for doc in batch) == ["a@x.com", "b@x.com", "crashed@x.com"]
+    assert nothing == []
+    assert sorted(doc["to"] for doc in leased) == ["a@x.com", "b@x.com", "crashed@x.com"]
+    assert all(doc["status"] == "sending" for doc in leased)
+
+
+def test_sent_message_is_marked_sent_and_released(db):
+    async def run():
+        await queue_emails([("a@x.com", "s", "m")])
+        worker = _worker()
+        sent = await worker.drain_once()
+        return sent, worker.connection.sent, await db.email_outbox.find_one({"to": "a@x.com"})
+
+    sent, delivered, doc = asyncio.run(run())
+    assert sent == 1 and delivered == ["a@x.com"]
+    assert doc["status"] == "sent"
+    assert "lease_id" not in doc and "locked_until" not in doc
+
+
+def test_temporary_failure_backs_off_then_fails_after_max_attempts(db):
+    async def run():
+        await queue_emails([("a@x.com", "s", "m")])
+        worker = _worker(max_attempts=3)
+        worker.connection.failures["a@x.com"] = [smtplib.SMTPDataError(451, b"try later") for _ in range(3)]
+        states = []
+        for _ in range(3):
+            before = datetime.now(pytz.utc)
+            await worker.drain_once()
+            doc = await db.email_outbox.find_one({"to": "a@x.com"})
+            states.append((doc["status"], doc["attempts"], (_utc(doc["next_attempt_at"]) - before).total_seconds()))
+            assert await worker.drain_once() == 0  # not due again yet
+            await _make_due(db)
+        return states
+
+    states = asyncio.run(run())
+    assert [(status, attempts) for status, attempts, _ in states] == [("pending", 1), ("pending", 2), ("failed", 3)]
+    assert [round(delay / 60) for _, _, delay in states[:2]] == [1, 2]
+
+
+def test_rejected_recipient_fails_at_once_but_4xx_is_retried(db):
+    async def run():
+        await queue_emails([("gone@x.com", "s", "m"), ("busy@x.com", "s", "m")])
+        worker = _worker()
+        worker.connection.failures["gone@x.com"] = [smtplib.SMTPRecipientsRefused({"gone@x.com": (550, b"no such user")})]
+        worker.connection.failures["busy@x.com"] = [smtplib.SMTPRecipientsRefused({"busy@x.com": (452, b"mailbox full")})]
+        await worker.drain_once()
+        return {doc["to"]: (doc["status"], doc["attempts"]) async for doc in db.email_outbox.find({})}
+
+    assert asyncio.run(run()) == {"gone@x.com": ("failed", 1), "busy@x.com": ("pending", 1)}
+
+
+def test_dropped_connection_is_retried_once_in_the_same_pass(db):
+    async def run():
+        await queue_emails([("a@x.com", "s", "m")])
+        worker = _worker()
+        worker.connection.failures["a@x.com"] = [smtplib.SMTPServerDisconnected("idle timeout")]
+        sent = await worker.drain_once()
+        return sent, (await db.email_outbox.find_one({"to": "a@x.com"}))["status"]
+
+    assert asyncio.run(run()) == (1, "sent")
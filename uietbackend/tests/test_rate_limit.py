@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from app.core import rate_limit
+from app.core.rate_limit import AdmissionControl, LocalBackend, RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_bucket_allows_the_burst_then_refills_at_the_rate(clock):
+    backend = LocalBackend()
+
+    async def run():
+        waits = [await backend.take("k", rate=0.5, burst=3) for _ in range(4)]
+        clock[0] += 2  # one token back at 0.5/s
+        waits.append(await backend.take("k", rate=0.5, burst=3))
+        waits.append(await backend.take("k", rate=0.5, burst=3))
+        return waits
+
+    assert asyncio.run(run()) == [0, 0, 0, 2.0, 0, 2.0]
+
+
+def test_idle_bucket_refills_only_up_to_the_burst(clock):
+    backend = LocalBackend()
+
+    async def run():
+        for _ in range(3):
+            await backend.take("k", rate=1, burst=3)
+        clock[0] += 60
+        return [await backend.take("k", rate=1, burst=3) for _ in range(4)]
+
+    assert asyncio.run(run()) == [0, 0, 0, 1.0]
+
+
+def test_limiter_answers_429_with_the_longest_retry_after(clock):
+    limiter = RateLimiter(LocalBackend(), {"ip": (10, 100), "visitor": (0.1, 1)}, enabled=True)
+
+    async def run():
+        await limiter.check(ip="1.2.3.4", visitor="device-1")
+        await limiter.check(ip="1.2.3.4", visitor="device-1")
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(run())
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "10"
+
+
+def test_limiter_skips_missing_keys_and_can_be_disabled(clock):
+    strict = {"visitor": (0.1, 1)}
+
+    async def run(limiter, **keys):
+        for _ in range(3):
+            await limiter.check(**keys)
+
+    asyncio.run(run(RateLimiter(LocalBackend(), strict, enabled=True), visitor=None))
+    asyncio.run(run(RateLimiter(LocalBackend(), strict, enabled=False), visitor="device-1"))
+
+
+def test_admission_sheds_with_503_once_the_queue_wait_runs_out():
+    admission = AdmissionControl(max_concurrent=1, queue_seconds=0.05)
+    release = None
+    app = FastAPI()
+
+    @app.get("/work", dependencies=[Depends(admission)])
+    async def work():
+        await release.wait()
+        return {"ok": True}
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            holding = asyncio.create_task(client.get("/work"))
+            await asyncio.sleep(0.01)
+            shed = await client.get("/work")
+            release.set()
+            held = await holding
+            after = await client.get("/work")
+        return held, shed, after
+
+    held, shed, after = asyncio.run(run())
+    assert held.status_code == 200
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "1"
+    assert after.status_code == 200  # the slot was given back
@@ -0,0 +1,61 @@
+import asyncio
+from types import SimpleNamespace
+import httpx
+import pytest
+from app.core import session_tokens
+from app.core.session_tokens import issue_token, verify_token
+from app.main import app
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(session_tokens, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def _get(path, token=None):
+    async def run():
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get(path, headers=headers)
+    return asyncio.run(run())
+
+
+def test_issued_token_verifies_with_its_claims(clock):
+    claims = verify_token(issue_token("student", "101", "Asha", department="CSE", semester=3))
+    assert claims["role"] == "student" and claims["sub"] == "101" and claims["name"] == "Asha"
+    assert claims["department"] == "CSE" and claims["semester"] == 3
+    assert claims["exp"] - claims["iat"] == session_tokens.AUTH_TOKEN_TTL_SECONDS
+
+
+def test_token_expires_after_its_ttl(clock):
+    token = issue_token("student", "101", "Asha")
+    clock[0] += session_tokens.AUTH_TOKEN_TTL_SECONDS - 1
+    assert verify_token(token) is not None
+    clock[0] += 2
+    assert verify_token(token) is None
+
+
+def test_tampered_token_is_rejected(clock):
+    token = issue_token("student", "101", "Asha")
+    payload, _, signature = token.partition(".")
+    forged = session_tokens._b64encode(
+        session_tokens._b64decode(payload).replace(b'"student"', b'"admin"')
+    )
+    assert verify_token(f"{forged}.{signature}") is None
+    assert verify_token(f"{payload}.{signature[:-2]}xx") is None
+    assert verify_token(payload) is None
+    assert verify_token("not a token") is None
+
+
+def test_token_for_another_student_is_403():
+    response = _get("/student/profile/102", issue_token("student", "101", "Asha"))
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Token does not match this account"
+
+
+def test_admin_routes_need_an_admin_token():
+    assert _get("/admin/subjects").status_code == 401
+    assert _get("/admin/subjects", issue_token("teacher", "T1", "Teacher")).status_code == 403
+    assert _get("/admin/subjects", "forged.token").status_code == 401
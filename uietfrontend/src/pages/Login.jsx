@@ -30,11 +30,12 @@ export default function Login() {
         ? { roll_no: userId.trim().toUpperCase(), dob }
         : { employee_id: userId.trim().toUpperCase(), dob };
 
-      await api.post(url, payload);
+      const res = await api.post(url, payload);
 
       // 🧹 Clear old data & store fresh
       localStorage.removeItem("role");
       localStorage.removeItem("userId");
+      localStorage.setItem("token", res.data.token);
       localStorage.setItem("role", role);
       localStorage.setItem("userId", userId.trim().toUpperCase());
 
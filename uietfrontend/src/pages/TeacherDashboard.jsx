@@ -26,6 +26,9 @@ const SUBJECTS = ["EMT", "VLSI", "DSA", "CE", "DSP", "MICROPROCESSOR", "NETWORKS
 export default function TeacherDashboard() {
   const [subject, setSubject] = useState("");
   const [duration, setDuration] = useState(5);
+  const [department, setDepartment] = useState("");
+  const [semester, setSemester] = useState("");
+  const [section, setSection] = useState("");
   const [otpList, setOtpList] = useState([]);
   const [attendanceList, setAttendanceList] = useState([]);
   const [loading, setLoading] = useState(false);
@@ -92,6 +95,10 @@ export default function TeacherDashboard() {
         setMessage("❌ Please select a subject");
         return;
       }
+      if (!department || !semester) {
+        setMessage("❌ Please enter the department and semester");
+        return;
+      }
       setLoading(true);
 
       try {
@@ -102,7 +109,7 @@ export default function TeacherDashboard() {
             const lng = position.coords.longitude;
 
             // Call API with location data
-            const data = await generateOtp(employeeId, subject, duration, lat, lng);
+            const data = await generateOtp(employeeId, subject, duration, lat, lng, department, semester, section);
 
             const newOtp = {
               otp: data.otp,
@@ -235,6 +242,28 @@ export default function TeacherDashboard() {
                 <option key={sub} value={sub}>{sub}</option>
               ))}
             </select>
+            <input
+              value={department}
+              onChange={(e) => setDepartment(e.target.value.toUpperCase())}
+              placeholder="Department"
+              className="p-2 border rounded-md w-full md:w-1/6"
+              required
+            />
+            <input
+              type="number"
+              min={1}
+              value={semester}
+              onChange={(e) => setSemester(e.target.value)}
+              placeholder="Semester"
+              className="p-2 border rounded-md w-full md:w-1/6"
+              required
+            />
+            <input
+              value={section}
+              onChange={(e) => setSection(e.target.value.toUpperCase())}
+              placeholder="Section (all if blank)"
+              className="p-2 border rounded-md w-full md:w-1/6"
+            />
             <input
               type="number"
               min={1}
@@ -46,14 +46,16 @@ export const exportStudentAttendanceCSV = async (rollNo) => {
   return res.data;
 };
 
-export const generateOtp = async (employeeId, subject,durationMinutes, lat, lng) => {
+export const generateOtp = async (employeeId, subject,durationMinutes, lat, lng, department, semester, section) => {
   const res = await api.post("/teacher/generate-otp", {
     employee_id: employeeId,
     subject: subject,
     duration_minutes: durationMinutes,
     lat: lat,
-    lng: lng
-   
+    lng: lng,
+    department: department,
+    semester: Number(semester),
+    section: section || null
   });
   return res.data;
 };
@@ -85,11 +87,13 @@ export const getTodayAttendanceCount = async () => {
 api.interceptors.response.use(
   (response) => response,
   (error) => {
-    if (error.response && error.response.status === 401) {
-      // Token expired or unauthorized → optional: redirect to login
+    // a failed login is also a 401; let the login form show it instead of redirecting
+    if (error.response && error.response.status === 401 && !error.config?.url?.startsWith("/login")) {
+      // Token expired or unauthorized → back to the matching login page
+      const role = localStorage.getItem("role");
       localStorage.removeItem("token");
       localStorage.removeItem("role");
-      window.location.href = "/admin-login";
+      window.location.href = role === "admin" ? "/admin-login" : "/login";
     }
     return Promise.reject(error);
   }